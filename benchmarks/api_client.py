@@ -0,0 +1,125 @@
+from asyncio import Queue, gather, run
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Union
+
+from benchmarks.fake_api import FakeBotApiServer
+from benchmarks.utils import percentile
+from click import command, option
+from httpx import AsyncClient
+
+from chatushka.core.transports.rate_limiter import OutboundRateLimiter, Priorities
+from chatushka.core.transports.telegram_bot_api import TelegramBotApi
+
+_UNLIMITED_RATE = 1e9
+
+
+def _make_unlimited_rate_limiter() -> OutboundRateLimiter:
+    return OutboundRateLimiter(
+        global_rate=_UNLIMITED_RATE,
+        global_burst=_UNLIMITED_RATE,
+        chat_rate=_UNLIMITED_RATE,
+        chat_burst=_UNLIMITED_RATE,
+    )
+
+
+class _ClientPerCallApi(TelegramBotApi):
+    # the way requests were made before the pooled client: a new client, SSL context and connection for every call
+    async def _call_api(
+        self,
+        method: str,
+        timeout: Optional[float] = None,
+        priority: Optional[Priorities] = None,
+        **kwargs: Any,
+    ) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+        async with AsyncClient() as client:
+            response = await client.post(self._api_method_url(method), timeout=(timeout or 10) * 2, data=kwargs)
+        return self.check_api_response(response)
+
+
+async def _measure(
+    api: TelegramBotApi,
+    requests: int,
+    concurrency: int,
+) -> tuple[float, list[float]]:
+    queue: Queue[int] = Queue()
+    for number in range(requests):
+        queue.put_nowait(number)
+    latencies: list[float] = []
+
+    async def _send() -> None:
+        while not queue.empty():
+            number = queue.get_nowait()
+            started_at = perf_counter()
+            await api.send_message(chat_id=-(number % 100), text="benchmark")
+            latencies.append(perf_counter() - started_at)
+
+    started_at = perf_counter()
+    await gather(*(_send() for _ in range(concurrency)))
+    return requests / (perf_counter() - started_at), latencies
+
+
+def _report(
+    title: str,
+    rate: float,
+    latencies: list[float],
+) -> None:
+    p50, p99 = percentile(latencies, 50), percentile(latencies, 99)
+    print(f"{title:<24} {rate:10.1f} requests/s, p50 {p50 * 1000:6.2f} ms, p99 {p99 * 1000:6.2f} ms")
+
+
+async def _benchmark(
+    requests: int,
+    concurrency: int,
+    latency: float,
+    min_speedup: float,
+) -> bool:
+    server = FakeBotApiServer(latency=latency)
+    await server.start()
+    before = _ClientPerCallApi(server.token, base_url=server.url, rate_limiter=_make_unlimited_rate_limiter())
+    after = TelegramBotApi(
+        server.token,
+        max_connections=concurrency,
+        max_keepalive_connections=concurrency,
+        base_url=server.url,
+        rate_limiter=_make_unlimited_rate_limiter(),
+    )
+    try:
+        # the first round warms up both clients, imports and the server
+        await _measure(before, concurrency, concurrency)
+        await _measure(after, concurrency, concurrency)
+        before_rate, before_latencies = await _measure(before, requests, concurrency)
+        after_rate, after_latencies = await _measure(after, requests, concurrency)
+    finally:
+        await before.shutdown()
+        await after.shutdown()
+        await server.close()
+    # the fake server speaks plain HTTP, with TLS to api.telegram.org every new connection costs more
+    _report("client per call:", before_rate, before_latencies)
+    _report("pooled client:", after_rate, after_latencies)
+    speedup = after_rate / before_rate
+    print(f"speedup:                 {speedup:10.2f}x, required {min_speedup:.2f}x")
+    return speedup >= min_speedup
+
+
+@command()
+@option("--requests", default=1_000, show_default=True)
+@option("--concurrency", default=16, show_default=True, help="Requests in flight at once.")
+@option("--latency", default=0.0, show_default=True, help="Latency of fake server replies, seconds.")
+@option(
+    "--min-speedup",
+    default=1.0,
+    show_default=True,
+    help="Required ratio of requests per second of the pooled client to a client per call.",
+)
+def main(
+    requests: int,
+    concurrency: int,
+    latency: float,
+    min_speedup: float,
+) -> None:
+    if not run(_benchmark(requests, concurrency, latency, min_speedup)):
+        raise SystemExit("Pooled client is slower than required")
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
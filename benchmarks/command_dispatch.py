@@ -0,0 +1,154 @@
+from asyncio import run
+from random import Random
+from time import perf_counter
+from typing import Awaitable, Callable, Hashable, Optional
+
+from click import command, option
+
+from chatushka import ChatushkaBot
+from chatushka.core.matchers import CommandsMatcher
+from chatushka.core.matchers.base import MatcherBase
+from chatushka.core.matchers.routing import RoutingTable
+from chatushka.core.models import MatchedToken
+from chatushka.core.transports.models import Message, Update
+
+_REPEATS = 3
+_WORDS = ("hello", "there", "how", "are", "you", "doing", "today", "friends")
+
+
+class _ScanningCommandsMatcher(CommandsMatcher):
+    # the way commands were matched before the index: every registered token is checked against the whole text
+    async def _match_tokens(
+        self,
+        update: Update,
+    ) -> list[MatchedToken]:
+        return await MatcherBase._match_tokens(self, update)  # pylint: disable=protected-access
+
+    async def _check(
+        self,
+        token: Hashable,
+        update: Update,
+    ) -> Optional[MatchedToken]:
+        if not update.message or not update.message.text:
+            return None
+        words = tuple(word for word in update.message.text.split(" ") if word)
+        for i, word in enumerate(words):
+            if not self.case_sensitive:
+                word = word.lower()
+            if token == word:
+                return MatchedToken(
+                    token=token,
+                    args=tuple(words[i + 1 :]),  # noqa
+                )
+        return None
+
+
+async def _command_handler(
+    message: Message,  # noqa, pylint: disable=unused-argument
+) -> None:
+    return None
+
+
+def _make_updates(
+    count: int,
+    commands: int,
+    seed: int = 0,
+) -> list[Update]:
+    random = Random(seed)
+    updates = []
+    for number in range(count):
+        words = [random.choice(_WORDS) for _ in range(random.randrange(1, 12))]
+        if number % 2:
+            # every other message is a command to a random registered handler with a couple of arguments
+            words[:0] = [f"/Command{random.randrange(commands)}", *words[:2]]
+        updates.append(
+            Update(
+                update_id=number,
+                message={
+                    "message_id": number,
+                    "from": {"id": number % 100, "is_bot": False, "first_name": "user"},
+                    "chat": {"id": -(number % 10), "type": "supergroup"},
+                    "text": " ".join(words),
+                },
+            )
+        )
+    return updates
+
+
+def _make_bot(
+    matcher: CommandsMatcher,
+    commands: int,
+) -> ChatushkaBot:
+    for number in range(commands):
+        matcher.add_handler((f"command{number}", f"cmd{number}"), _command_handler)
+    bot = ChatushkaBot(token="0:benchmark")
+    bot.add_matcher(matcher)
+    bot.routing = RoutingTable(bot)
+    return bot
+
+
+async def _measure(
+    resolve: Callable[[Update], Awaitable[list]],
+    updates: list[Update],
+) -> tuple[float, int]:
+    best = float("inf")
+    matched = 0
+    for _ in range(_REPEATS):
+        matched = 0
+        started_at = perf_counter()
+        for update in updates:
+            matched += len(await resolve(update))
+        best = min(best, (perf_counter() - started_at) / len(updates))
+    return best, matched
+
+
+async def _benchmark(
+    commands: int,
+    updates_count: int,
+    min_speedup: float,
+) -> bool:
+    updates = _make_updates(updates_count, commands)
+    scanning = _ScanningCommandsMatcher(prefixes=("/", "!"), postfixes="@chatushka_bot")
+    _make_bot(scanning, commands)
+    indexed = CommandsMatcher(prefixes=("/", "!"), postfixes="@chatushka_bot")
+    bot = _make_bot(indexed, commands)
+
+    async def _scan(update: Update) -> list[MatchedToken]:
+        return await scanning.match(bot.api, update)
+
+    async def _match(update: Update) -> list[MatchedToken]:
+        return await indexed.match(bot.api, update)
+
+    scan, scan_matched = await _measure(_scan, updates)
+    match, match_matched = await _measure(_match, updates)
+    resolve, resolve_matched = await _measure(bot.routing.resolve, updates)
+    if not scan_matched == match_matched == resolve_matched:
+        raise SystemExit(f"Matched commands differ: {scan_matched}, {match_matched}, {resolve_matched}")
+    tokens = len(scanning.handlers)
+    print(f"{commands} commands, {tokens} tokens with prefix and postfix variations, {scan_matched} matches")
+    print(f"token scan:               {scan * 1e6:8.2f} us/update")
+    print(f"matcher hash lookup:      {match * 1e6:8.2f} us/update ({scan / match:.1f}x)")
+    print(f"routing table resolve:    {resolve * 1e6:8.2f} us/update ({scan / resolve:.1f}x)")
+    return scan / resolve >= min_speedup
+
+
+@command()
+@option("--commands", default=300, show_default=True, help="Registered commands, each with an alias.")
+@option("--updates", default=1_000, show_default=True)
+@option(
+    "--min-speedup",
+    default=10.0,
+    show_default=True,
+    help="Required ratio of the token scan time to the routing table resolve time.",
+)
+def main(
+    commands: int,
+    updates: int,
+    min_speedup: float,
+) -> None:
+    if not run(_benchmark(commands, updates, min_speedup)):
+        raise SystemExit("Command resolution is slower than required")
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
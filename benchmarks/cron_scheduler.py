@@ -0,0 +1,128 @@
+from asyncio import ensure_future, run, sleep
+from collections import Counter
+from time import perf_counter, time
+from typing import Awaitable, Callable, Optional
+
+from benchmarks.utils import max_rss_mb, percentile
+from click import command, option
+
+from chatushka.core.matchers import CronMatcher
+from chatushka.core.matchers.cron import CronScheduler
+
+_EVERY_SECOND = "* * * * * *"
+_LAG_PROBE_INTERVAL = 0.01
+
+
+class _Fires:
+    def __init__(self) -> None:
+        self.times: list[float] = []
+
+    def make_handler(self) -> Callable[[], Awaitable[None]]:
+        async def _handler() -> None:
+            self.times.append(time())
+
+        return _handler
+
+
+async def _probe_loop_lag(
+    lags: list[float],
+) -> None:
+    while True:
+        started_at = perf_counter()
+        await sleep(_LAG_PROBE_INTERVAL)
+        lags.append(perf_counter() - started_at - _LAG_PROBE_INTERVAL)
+
+
+def _report(
+    title: str,
+    jobs: int,
+    duration: float,
+    setup: float,
+    fires: _Fires,
+    lags: list[float],
+    rss_before: float,
+) -> None:
+    phases = [moment % 1 for moment in fires.times]
+    windows = Counter(int(moment * 10) for moment in fires.times)
+    print(f"{title}:")
+    print(f"  setup of {jobs} jobs:    {setup * 1000:.1f} ms")
+    print(f"  fires:                {len(fires.times)} in {duration:.0f} s, expected about {jobs * int(duration)}")
+    p50, p99 = percentile(phases, 50), percentile(phases, 99)
+    print(f"  phase in second:      p50 {p50 * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms")
+    print(f"  max fires per 100 ms: {max(windows.values(), default=0)}")
+    print(f"  loop lag:             p99 {percentile(lags, 99) * 1000:.1f} ms, max {max(lags, default=0) * 1000:.1f} ms")
+    print(f"  max rss:              {rss_before:.1f} MB before, {max_rss_mb():.1f} MB after")
+
+
+async def _run_cron_matcher(
+    jobs: int,
+    duration: float,
+    spread: float,
+    jitter: float,
+) -> None:
+    fires = _Fires()
+    matcher = CronMatcher(spread=spread, jitter=jitter, scheduler=CronScheduler())
+    for _ in range(jobs):
+        matcher.add_handler(_EVERY_SECOND, fires.make_handler())
+    lags: list[float] = []
+    rss_before = max_rss_mb()
+    started_at = perf_counter()
+    await matcher.init()
+    setup = perf_counter() - started_at
+    probe = ensure_future(_probe_loop_lag(lags))
+    await sleep(duration)
+    probe.cancel()
+    await matcher.close()
+    _report(f"CronMatcher, spread {spread} s, jitter {jitter} s", jobs, duration, setup, fires, lags, rss_before)
+
+
+async def _run_aiocron(
+    jobs: int,
+    duration: float,
+) -> None:
+    try:
+        from aiocron import crontab  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        print("aiocron is not installed, the baseline is skipped")
+        return
+    fires = _Fires()
+    lags: list[float] = []
+    rss_before = max_rss_mb()
+    started_at = perf_counter()
+    crons = [crontab(_EVERY_SECOND, func=fires.make_handler()) for _ in range(jobs)]
+    setup = perf_counter() - started_at
+    probe = ensure_future(_probe_loop_lag(lags))
+    await sleep(duration)
+    probe.cancel()
+    for cron in crons:
+        cron.stop()
+    _report("aiocron, a timer per job", jobs, duration, setup, fires, lags, rss_before)
+
+
+@command()
+@option("--jobs", default=10_000, show_default=True)
+@option("--duration", default=5.0, show_default=True, help="Seconds to run every-second jobs for.")
+@option("--spread", default=0.9, show_default=True, help="Spread of job offsets within a second, seconds.")
+@option("--jitter", default=0.0, show_default=True, help="Random delay of every fire, seconds.")
+@option("--baseline/--no-baseline", default=False, show_default=True, help="Also run the same jobs on aiocron.")
+def main(
+    jobs: int,
+    duration: float,
+    spread: float,
+    jitter: float,
+    baseline: bool,
+) -> None:
+    async def _main(
+        baseline_jobs: Optional[int],
+    ) -> None:
+        await _run_cron_matcher(jobs, duration, spread=0, jitter=0)
+        if spread or jitter:
+            await _run_cron_matcher(jobs, duration, spread=spread, jitter=jitter)
+        if baseline_jobs:
+            await _run_aiocron(baseline_jobs, duration)
+
+    run(_main(jobs if baseline else None))
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
@@ -0,0 +1,271 @@
+from asyncio import AbstractServer, CancelledError, Event, StreamReader, StreamWriter, Task
+from asyncio import TimeoutError as AsyncTimeoutError
+from asyncio import current_task, gather, sleep, start_server, wait_for
+from collections import Counter, deque
+from http import HTTPStatus
+from itertools import count, islice
+from json import dumps
+from logging import getLogger
+from random import Random
+from time import monotonic, time
+from typing import Any, Callable, Iterable, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+from chatushka.core.transports.webhook import read_http_request
+
+logger = getLogger(__name__)
+
+BOT_USER = {
+    "id": 1_000_000,
+    "is_bot": True,
+    "first_name": "Benchmark",
+    "username": "benchmark_bot",
+    "can_join_groups": True,
+    "can_read_all_group_messages": True,
+}
+ADMIN_USER = {"id": 1, "is_bot": False, "first_name": "Admin"}
+
+_MAX_UPDATES_LIMIT = 100
+
+
+def _encode_response(
+    status: HTTPStatus,
+    payload: Any,
+) -> bytes:
+    body = dumps(payload).encode()
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: keep-alive\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+def _ok(
+    result: Any,
+) -> tuple[HTTPStatus, Any]:
+    return HTTPStatus.OK, {"ok": True, "result": result}
+
+
+class FakeBotApiServer:
+    def __init__(
+        self,
+        token: str = "0:benchmark",
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0,
+        jitter: float = 0,
+        error_rate: float = 0,
+        retry_after_rate: float = 0,
+        retry_after: float = 1,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.token = token
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.retry_after_rate = retry_after_rate
+        self.retry_after = retry_after
+        self.requests: Counter[str] = Counter()
+        self.injected_errors: Counter[str] = Counter()
+        # the next requests of a method answered with 429 regardless of retry_after_rate
+        self.retry_after_replies: Counter[str] = Counter()
+        self.replies_latencies: list[float] = []
+        self.last_messages: deque[dict[str, str]] = deque(maxlen=100)
+        self.delivered = 0
+        self._random = Random(seed)
+        self._updates: deque[dict[str, Any]] = deque()
+        self._delivered_at: dict[tuple[int, int], float] = {}
+        self._has_updates: Optional[Event] = None
+        self._messages_ids = count(10_000_000)
+        self._jokes_ids = count()
+        self._server: Optional[AbstractServer] = None
+        self._connections: set[Task] = set()  # type: ignore
+        self._methods: dict[str, Callable[[dict[str, str]], Any]] = {
+            "getme": self._get_me,
+            "getupdates": self._get_updates,
+            "sendmessage": self._send_message,
+            "getchatadministrators": self._get_chat_administrators,
+            "restrictchatmember": self._succeed,
+            "pinchatmessage": self._succeed,
+            "unpinchatmessage": self._succeed,
+            "unpinallchatmessages": self._succeed,
+            "setwebhook": self._succeed,
+            "deletewebhook": self._succeed,
+        }
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def jokes_url(self) -> str:
+        return f"{self.url}/jokes"
+
+    @property
+    def pending(self) -> int:
+        return len(self._updates)
+
+    def put_updates(
+        self,
+        updates: Iterable[dict[str, Any]],
+    ) -> None:
+        self._updates.extend(updates)
+        if self._has_updates:
+            self._has_updates.set()
+
+    async def start(self) -> None:
+        self._has_updates = Event()
+        if self._updates:
+            self._has_updates.set()
+        self._server = await start_server(self._handle_connection, self.host, self.port)
+        self.host, self.port = self._server.sockets[0].getsockname()[:2]
+
+    async def close(self) -> None:
+        if not self._server:
+            return
+        self._server.close()
+        for task in self._connections:
+            task.cancel()
+        await gather(*self._connections, return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+
+    async def _handle_connection(
+        self,
+        reader: StreamReader,
+        writer: StreamWriter,
+    ) -> None:
+        task = current_task()
+        self._connections.add(task)  # type: ignore
+        try:
+            while request := await read_http_request(reader):
+                url = urlsplit(request.path)
+                params = dict(parse_qsl(url.query)) | dict(parse_qsl(request.body.decode()))
+                status, payload = await self._handle_request(url.path, params)
+                writer.write(_encode_response(status, payload))
+                await writer.drain()
+        except (ConnectionError, CancelledError) as err:
+            logger.debug(repr(err))
+        finally:
+            self._connections.discard(task)  # type: ignore
+            writer.close()
+
+    async def _handle_request(
+        self,
+        path: str,
+        params: dict[str, str],
+    ) -> tuple[HTTPStatus, Any]:
+        if path == "/jokes":
+            await self._delay()
+            return HTTPStatus.OK, {"content": f"Joke #{next(self._jokes_ids)}"}
+        prefix, _, method = path.rpartition("/")
+        method = method.lower()
+        if prefix != f"/bot{self.token}" or method not in self._methods:
+            return HTTPStatus.NOT_FOUND, {"ok": False, "error_code": 404, "description": "Not Found"}
+        self.requests[method] += 1
+        if method not in ("getme", "getupdates"):
+            await self._delay()
+            if error := self._inject_error(method):
+                return error
+        return await self._methods[method](params)
+
+    async def _delay(self) -> None:
+        if delay := self.latency + self._random.uniform(0, self.jitter):
+            await sleep(delay)
+
+    def _inject_error(
+        self,
+        method: str,
+    ) -> Optional[tuple[HTTPStatus, Any]]:
+        chance = self._random.random()
+        is_forced = self.retry_after_replies[method] > 0
+        if is_forced:
+            self.retry_after_replies[method] -= 1
+        if is_forced or chance < self.retry_after_rate:
+            self.injected_errors[f"{method}:429"] += 1
+            return HTTPStatus.TOO_MANY_REQUESTS, {
+                "ok": False,
+                "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after},
+            }
+        if chance < self.retry_after_rate + self.error_rate:
+            self.injected_errors[f"{method}:500"] += 1
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {
+                "ok": False,
+                "error_code": 500,
+                "description": "Internal Server Error: injected",
+            }
+        return None
+
+    async def _get_me(
+        self,
+        params: dict[str, str],  # noqa, pylint: disable=unused-argument
+    ) -> tuple[HTTPStatus, Any]:
+        return _ok(BOT_USER)
+
+    async def _get_updates(
+        self,
+        params: dict[str, str],
+    ) -> tuple[HTTPStatus, Any]:
+        offset = int(params.get("offset", 0))
+        limit = min(int(params.get("limit", _MAX_UPDATES_LIMIT)), _MAX_UPDATES_LIMIT)
+        while self._updates and self._updates[0]["update_id"] < offset:
+            self._updates.popleft()
+        if not self._updates and (timeout := float(params.get("timeout", 0))):
+            self._has_updates.clear()  # type: ignore
+            try:
+                await wait_for(self._has_updates.wait(), timeout=timeout)  # type: ignore
+            except AsyncTimeoutError:
+                return _ok([])
+        batch = list(islice(self._updates, limit))
+        now = monotonic()
+        for update in batch:
+            if message := update.get("message"):
+                key = (message["chat"]["id"], message["message_id"])
+                if key not in self._delivered_at:
+                    self._delivered_at[key] = now
+                    self.delivered += 1
+            else:
+                self.delivered += 1
+        return _ok(batch)
+
+    async def _send_message(
+        self,
+        params: dict[str, str],
+    ) -> tuple[HTTPStatus, Any]:
+        chat_id = int(params["chat_id"])
+        self.last_messages.append(params)
+        if reply_to := params.get("reply_to_message_id"):
+            if (delivered_at := self._delivered_at.get((chat_id, int(reply_to)))) is not None:
+                self.replies_latencies.append(monotonic() - delivered_at)
+        return _ok(
+            {
+                "message_id": next(self._messages_ids),
+                "from": BOT_USER,
+                "chat": {"id": chat_id, "type": "supergroup"},
+                "date": int(time()),
+                "text": params.get("text", ""),
+            }
+        )
+
+    async def _get_chat_administrators(
+        self,
+        params: dict[str, str],  # noqa, pylint: disable=unused-argument
+    ) -> tuple[HTTPStatus, Any]:
+        return _ok(
+            [
+                {"status": "creator", "user": ADMIN_USER},
+                {"status": "administrator", "user": BOT_USER, "can_restrict_members": True},
+            ]
+        )
+
+    async def _succeed(
+        self,
+        params: dict[str, str],  # noqa, pylint: disable=unused-argument
+    ) -> tuple[HTTPStatus, Any]:
+        return _ok(True)
@@ -0,0 +1,137 @@
+from asyncio import run
+from inspect import iscoroutinefunction, signature
+from time import perf_counter
+from typing import Any, Hashable, Optional
+
+from click import command, option
+
+from chatushka.core.matchers.base import MatcherBase
+from chatushka.core.transports.models import Message, Update
+from chatushka.core.transports.telegram_bot_api import TelegramBotApi
+
+_REPEATS = 5
+_TOKEN = "benchmark"
+
+
+class _Matcher(MatcherBase):
+    pass
+
+
+class _ReflectiveMatcher(MatcherBase):
+    # the way handlers were called before call plans: the signature is inspected on every invocation
+    async def call(
+        self,
+        api: TelegramBotApi,
+        token: Hashable,
+        update: Optional[Update] = None,
+        kwargs: Optional[dict[str, Any]] = None,
+        args: Optional[tuple[str, ...]] = None,
+    ) -> None:
+        if not kwargs:
+            kwargs = {}
+        kwargs = kwargs | dict(api=api, update=update, token=token, args=args)
+        handlers = self.handlers.get(token)
+        if not handlers:
+            return
+        for handler in handlers:
+            sig = signature(handler)
+            sig_kwargs = {param: kwargs.get(param) for param in sig.parameters if param in kwargs}
+            if update and update.message is not None and "message" in sig.parameters:
+                sig_kwargs["message"] = update.message
+            if iscoroutinefunction(handler):
+                await handler(**sig_kwargs)  # type: ignore
+                continue
+            handler(**sig_kwargs)
+
+
+async def _api_message_args_handler(
+    api: TelegramBotApi,  # noqa, pylint: disable=unused-argument
+    message: Message,  # noqa, pylint: disable=unused-argument
+    args: tuple[str, ...],  # noqa, pylint: disable=unused-argument
+) -> None:
+    return None
+
+
+async def _matched_handler(
+    message: Message,  # noqa, pylint: disable=unused-argument
+    matched: tuple[str, ...],  # noqa, pylint: disable=unused-argument
+) -> None:
+    return None
+
+
+def _update_token_handler(
+    update: Update,  # noqa, pylint: disable=unused-argument
+    token: str,  # noqa, pylint: disable=unused-argument
+) -> None:
+    return None
+
+
+async def _no_arguments_handler() -> None:
+    return None
+
+
+_HANDLERS = (_api_message_args_handler, _matched_handler, _update_token_handler, _no_arguments_handler)
+
+
+async def _measure(
+    matcher: MatcherBase,
+    api: TelegramBotApi,
+    update: Update,
+    calls: int,
+) -> float:
+    kwargs = {"matched": ("hello",)}
+    args = ("first", "second")
+    best = float("inf")
+    for _ in range(_REPEATS):
+        started_at = perf_counter()
+        for _ in range(calls):
+            await matcher.call(api, _TOKEN, update=update, kwargs=kwargs, args=args)
+        best = min(best, perf_counter() - started_at)
+    return calls * len(_HANDLERS) / best
+
+
+async def _benchmark(
+    calls: int,
+    min_speedup: float,
+) -> bool:
+    api = TelegramBotApi("0:benchmark")
+    update = Update(
+        update_id=1,
+        message={
+            "message_id": 1,
+            "from": {"id": 1, "is_bot": False, "first_name": "user"},
+            "chat": {"id": -1, "type": "supergroup"},
+            "text": "/benchmark first second",
+        },
+    )
+    reflective, planned = _ReflectiveMatcher(), _Matcher()
+    for handler in _HANDLERS:
+        reflective.add_handler(_TOKEN, handler)
+        planned.add_handler(_TOKEN, handler)
+    reflective_rate = await _measure(reflective, api, update, calls)
+    planned_rate = await _measure(planned, api, update, calls)
+    speedup = planned_rate / reflective_rate
+    print(f"{len(_HANDLERS)} handlers with different signatures, {calls} calls of each")
+    print(f"signature on every call:   {reflective_rate:12.0f} invocations/s")
+    print(f"precomputed call plans:    {planned_rate:12.0f} invocations/s ({speedup:.1f}x)")
+    return speedup >= min_speedup
+
+
+@command()
+@option("--calls", default=20_000, show_default=True)
+@option(
+    "--min-speedup",
+    default=2.0,
+    show_default=True,
+    help="Required ratio of invocations per second with call plans to invocations with a signature per call.",
+)
+def main(
+    calls: int,
+    min_speedup: float,
+) -> None:
+    if not run(_benchmark(calls, min_speedup)):
+        raise SystemExit("Handler invocations with call plans are slower than required")
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
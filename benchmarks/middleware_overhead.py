@@ -0,0 +1,122 @@
+from asyncio import run
+from time import perf_counter
+from typing import Awaitable, Callable
+
+from click import command, option
+
+from chatushka import ChatushkaBot
+from chatushka.core.executor import Invocation
+from chatushka.core.matchers import CommandsMatcher
+from chatushka.core.matchers.routing import RoutingTable
+from chatushka.core.middlewares import CALL_NEXT_TYPING, MiddlewareBase
+from chatushka.core.models import MatchedToken
+from chatushka.core.transports.models import Message, Update
+
+_REPEATS = 5
+
+
+class _PassThroughMiddleware(MiddlewareBase):
+    async def pre_dispatch(
+        self,
+        update: Update,
+    ) -> bool:
+        return True
+
+    async def post_dispatch(
+        self,
+        update: Update,
+        matched: list[MatchedToken],
+    ) -> None:
+        return None
+
+    async def around_handler(
+        self,
+        invocation: Invocation,
+        call_next: CALL_NEXT_TYPING,
+    ) -> None:
+        await call_next()
+
+
+async def _ping_handler(
+    message: Message,  # noqa, pylint: disable=unused-argument
+) -> None:
+    return None
+
+
+def _make_updates(
+    count: int,
+) -> list[Update]:
+    return [
+        Update(
+            update_id=number,
+            message={
+                "message_id": number,
+                "from": {"id": number % 100, "is_bot": False, "first_name": "user"},
+                "chat": {"id": -(number % 10), "type": "supergroup"},
+                "text": "/ping" if number % 2 else "just a message",
+            },
+        )
+        for number in range(count)
+    ]
+
+
+async def _measure(
+    process: Callable[[Update], Awaitable[object]],
+    updates: list[Update],
+) -> float:
+    best = float("inf")
+    for _ in range(_REPEATS):
+        started_at = perf_counter()
+        for update in updates:
+            await process(update)
+        best = min(best, (perf_counter() - started_at) / len(updates))
+    return best
+
+
+async def _benchmark(
+    updates_count: int,
+    threshold: float,
+) -> bool:
+    bot = ChatushkaBot(token="0:benchmark")
+    matcher = CommandsMatcher(prefixes="/")
+    matcher.add_handler("ping", _ping_handler)
+    bot.add_matcher(matcher)
+    bot.routing = RoutingTable(bot)
+    updates = _make_updates(updates_count)
+
+    async def dispatch(update: Update) -> None:
+        await bot.routing.dispatch(bot.api, update, executor=bot.executor)
+
+    baseline = await _measure(dispatch, updates)
+    empty = await _measure(bot._process_update, updates)  # pylint: disable=protected-access
+    bot.add_middleware(_PassThroughMiddleware())
+    pass_through = await _measure(bot._process_update, updates)  # pylint: disable=protected-access
+    overhead = (empty - baseline) * 1e6
+    # the bot wraps routing with metrics as well, so the overhead is an upper bound of the empty chain cost
+    print(f"routing dispatch:           {baseline * 1e6:8.2f} us/update")
+    print(f"empty middleware chain:     {empty * 1e6:8.2f} us/update ({overhead:+.2f} us)")
+    print(
+        f"pass-through middleware:    {pass_through * 1e6:8.2f} us/update ({(pass_through - baseline) * 1e6:+.2f} us)"
+    )
+    print(f"threshold:                  {threshold:8.2f} us/update")
+    return overhead <= threshold
+
+
+@command()
+@option("--updates", default=20_000, show_default=True)
+@option(
+    "--threshold",
+    default=5.0,
+    show_default=True,
+    help="Allowed overhead of update processing with an empty chain over routing dispatch, us per update.",
+)
+def main(
+    updates: int,
+    threshold: float,
+) -> None:
+    if not run(_benchmark(updates, threshold)):
+        raise SystemExit("Empty middleware chain overhead exceeds the threshold")
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
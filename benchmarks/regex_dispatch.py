@@ -0,0 +1,124 @@
+from random import Random
+from re import Pattern
+from re import compile as compile_regex
+from re import findall
+from time import perf_counter
+from typing import Any, Callable
+
+from click import command, option
+
+from chatushka.core.matchers.regex import compile_scanner, scan_patterns
+
+_REPEATS = 3
+_WORDS = ("hello", "there", "how", "are", "you", "doing", "today", "friends", "keyboard", "monkey")
+
+_FOUND_TYPING = list[tuple[str, tuple[Any, ...]]]
+
+
+def _make_patterns(
+    count: int,
+) -> list[str]:
+    # like keyword triggers of a bot, some of them overlap: key1 matches wherever key12 does
+    return [rf"\bkey{number}\w*" for number in range(count)]
+
+
+def _make_texts(
+    count: int,
+    patterns: int,
+    seed: int = 0,
+) -> list[str]:
+    random = Random(seed)
+    texts = []
+    for number in range(count):
+        words = [random.choice(_WORDS) for _ in range(random.randrange(3, 30))]
+        if number % 10 == 0:
+            # most chat messages trigger nothing
+            words.insert(random.randrange(len(words)), f"key{random.randrange(patterns)}")
+        texts.append(" ".join(words))
+    return texts
+
+
+def _compile_named_alternation(
+    patterns: dict[str, Pattern[str]],
+) -> tuple[Pattern[str], dict[str, str]]:
+    groups = {f"p{number}": token for number, token in enumerate(patterns)}
+    source = "|".join(f"(?P<{group}>{token})" for group, token in groups.items())
+    return compile_regex(source), groups
+
+
+def _measure(
+    scan: Callable[[str], _FOUND_TYPING],
+    texts: list[str],
+) -> tuple[float, list[_FOUND_TYPING]]:
+    best = float("inf")
+    results: list[_FOUND_TYPING] = []
+    for _ in range(_REPEATS):
+        started_at = perf_counter()
+        results = [scan(text) for text in texts]
+        best = min(best, (perf_counter() - started_at) / len(texts))
+    return best, results
+
+
+def _count(
+    results: list[_FOUND_TYPING],
+) -> int:
+    return sum(len(founded) for found in results for _, founded in found)
+
+
+def _benchmark(
+    patterns_count: int,
+    texts: list[str],
+) -> None:
+    tokens = _make_patterns(patterns_count)
+    patterns = {token: compile_regex(token) for token in tokens}
+    scanner = compile_scanner(patterns.values())
+    alternation, groups = _compile_named_alternation(patterns)
+
+    def _per_call(text: str) -> _FOUND_TYPING:
+        # the way patterns were matched before, relying on the cache of the re module
+        return [(token, tuple(founded)) for token in tokens if (founded := findall(token, text))]
+
+    def _precompiled(text: str) -> _FOUND_TYPING:
+        return scan_patterns(text, patterns)
+
+    def _prefiltered(text: str) -> _FOUND_TYPING:
+        return scan_patterns(text, patterns, scanner)
+
+    def _named_groups(text: str) -> _FOUND_TYPING:
+        found: dict[str, list[str]] = {}
+        for matched in alternation.finditer(text):
+            found.setdefault(groups[matched.lastgroup], []).append(matched.group())  # type: ignore
+        return [(token, tuple(founded)) for token, founded in found.items()]
+
+    per_call, expected = _measure(_per_call, texts)
+    print(f"{patterns_count} patterns, {len(texts)} messages, {_count(expected)} matches:")
+    print(f"  re.findall per pattern:   {per_call * 1e6:10.2f} us/message")
+    for title, scan, is_exact in (
+        ("precompiled patterns", _precompiled, True),
+        ("alternation prefilter", _prefiltered, True),
+        ("named groups alternation", _named_groups, False),
+    ):
+        seconds, results = _measure(scan, texts)
+        if is_exact and results != expected:
+            raise SystemExit(f"Matches of {title} differ from re.findall")
+        # a single alternation reports one pattern per position, so overlapping triggers are lost
+        lost = _count(expected) - _count(results)
+        print(
+            f"  {title + ':':<25} {seconds * 1e6:10.2f} us/message ({per_call / seconds:.1f}x)"
+            + (f", {lost} matches lost" if lost else "")
+        )
+
+
+@command()
+@option("--patterns", "patterns_counts", default=(10, 100, 1000), multiple=True, show_default=True)
+@option("--messages", default=200, show_default=True)
+def main(
+    patterns_counts: tuple[int, ...],
+    messages: int,
+) -> None:
+    for patterns_count in patterns_counts:
+        _benchmark(patterns_count, _make_texts(messages, patterns_count))
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
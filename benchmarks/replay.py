@@ -0,0 +1,170 @@
+from asyncio import ensure_future, run
+from collections import defaultdict
+from json import dumps, loads
+from logging import WARNING, basicConfig
+from pathlib import Path
+from time import monotonic, perf_counter
+from typing import Any, Optional
+
+from benchmarks.fake_api import FakeBotApiServer
+from benchmarks.utils import make_benchmark_bot, max_rss_mb, percentile, wait_for_condition
+from click import Path as PathType
+from click import argument, command, option
+
+from chatushka.core.executor import Invocation
+from chatushka.core.middlewares import CALL_NEXT_TYPING, MiddlewareBase
+from chatushka.core.models import MatchedToken
+from chatushka.core.transports.models import Update
+from chatushka.core.transports.recording import read_recorded_updates, replay_updates
+
+
+class _TimingMiddleware(MiddlewareBase):
+    def __init__(self) -> None:
+        self.updates: dict[str, list[float]] = defaultdict(list)
+        self.handlers: dict[str, list[float]] = defaultdict(list)
+        self._started_at: dict[int, float] = {}
+
+    async def pre_dispatch(
+        self,
+        update: Update,
+    ) -> bool:
+        self._started_at[id(update)] = perf_counter()
+        return True
+
+    async def post_dispatch(
+        self,
+        update: Update,
+        matched: list[MatchedToken],
+    ) -> None:
+        if (started_at := self._started_at.pop(id(update), None)) is None:
+            return
+        kinds = update.kinds
+        self.updates[kinds[0].value if kinds else "other"].append(perf_counter() - started_at)
+
+    async def around_handler(
+        self,
+        invocation: Invocation,
+        call_next: CALL_NEXT_TYPING,
+    ) -> None:
+        started_at = perf_counter()
+        try:
+            await call_next()
+        finally:
+            self.handlers[invocation.name].append(perf_counter() - started_at)
+
+
+def _summarize(
+    durations: dict[str, list[float]],
+) -> dict[str, dict[str, float]]:
+    return {
+        name: {
+            "count": len(values),
+            "p50_ms": round(percentile(values, 50) * 1000, 3),
+            "p99_ms": round(percentile(values, 99) * 1000, 3),
+        }
+        for name, values in sorted(durations.items())
+    }
+
+
+def _print_section(
+    title: str,
+    results: dict[str, dict[str, float]],
+    baseline: Optional[dict[str, dict[str, float]]],
+) -> None:
+    print(f"{title}:")
+    for name, values in results.items():
+        line = f"  {name:<48} n={values['count']:<7} p50 {values['p50_ms']:9.3f} ms  p99 {values['p99_ms']:9.3f} ms"
+        if baseline and (previous := baseline.get(name)) and previous["p50_ms"] and previous["p99_ms"]:
+            p50_change = (values["p50_ms"] / previous["p50_ms"] - 1) * 100
+            p99_change = (values["p99_ms"] / previous["p99_ms"] - 1) * 100
+            line += f"  ({p50_change:+.1f}% / {p99_change:+.1f}%)"
+        print(line)
+
+
+async def _replay(
+    paths: tuple[str, ...],
+    speed: float,
+    latency: float,
+    timeout: float,
+    telegram_limits: bool,
+) -> dict[str, Any]:
+    server = FakeBotApiServer(latency=latency)
+    await server.start()
+    bot = make_benchmark_bot(server, telegram_limits)
+    timing = _TimingMiddleware()
+    bot.add_middleware(timing)
+    serving = ensure_future(bot.serve())
+    if not await wait_for_condition(lambda: server.requests["getupdates"] > 0, timeout):
+        raise SystemExit("Bot did not start polling")
+    rss_before = max_rss_mb()
+    started_at = monotonic()
+    replayed = await replay_updates(read_recorded_updates(*paths), bot.dispatcher.put, speed=speed)
+    is_completed = await wait_for_condition(lambda: not bot.dispatcher.pending, timeout)
+    elapsed = monotonic() - started_at
+    bot._stop()  # pylint: disable=protected-access
+    await serving
+    await server.close()
+    return {
+        "updates": replayed,
+        "is_completed": is_completed,
+        "speed": speed,
+        "elapsed": round(elapsed, 3),
+        "throughput": round(replayed / elapsed, 1) if elapsed else 0.0,
+        "max_rss_mb": [round(rss_before, 1), round(max_rss_mb(), 1)],
+        "api_requests": dict(server.requests.most_common()),
+        "dispatch": _summarize(timing.updates),
+        "handlers": _summarize(timing.handlers),
+    }
+
+
+@command()
+@argument("paths", nargs=-1, required=True, type=PathType(exists=True))
+@option(
+    "--speed", default=0.0, show_default=True, help="Replay speed factor, 1 is real time and 0 is as fast as possible."
+)
+@option("--latency", default=0.0, show_default=True, help="Fake API latency, seconds.")
+@option("--timeout", default=600.0, show_default=True, help="Seconds to wait for replayed updates to be processed.")
+@option(
+    "--telegram-limits/--no-telegram-limits",
+    default=False,
+    show_default=True,
+    help="Keep the outbound rate limits of Telegram, which bound the throughput of replies.",
+)
+@option("--output", type=PathType(dir_okay=False), help="Write results as JSON to compare later runs with.")
+@option("--compare", type=PathType(exists=True, dir_okay=False), help="Results of a previous run to compare with.")
+def main(
+    paths: tuple[str, ...],
+    speed: float,
+    latency: float,
+    timeout: float,
+    telegram_limits: bool,
+    output: Optional[str],
+    compare: Optional[str],
+) -> None:
+    basicConfig(level=WARNING)
+    results = run(
+        _replay(
+            paths=paths,
+            speed=speed,
+            latency=latency,
+            timeout=timeout,
+            telegram_limits=telegram_limits,
+        )
+    )
+    baseline = loads(Path(compare).read_text()) if compare else {}
+    throughput = f"throughput:   {results['throughput']:.1f} updates/s"
+    if baseline.get("throughput"):
+        throughput += f" ({(results['throughput'] / baseline['throughput'] - 1) * 100:+.1f}%)"
+    print(f"updates:      {results['updates']}{'' if results['is_completed'] else ' (timed out)'}")
+    print(f"elapsed:      {results['elapsed']:.3f} s")
+    print(throughput)
+    print(f"max rss:      {results['max_rss_mb'][0]} MB before, {results['max_rss_mb'][1]} MB after")
+    print(f"api requests: {results['api_requests']}")
+    _print_section("dispatch by update kind", results["dispatch"], baseline.get("dispatch"))
+    _print_section("handlers", results["handlers"], baseline.get("handlers"))
+    if output:
+        Path(output).write_text(dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
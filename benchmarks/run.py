@@ -0,0 +1,163 @@
+from asyncio import ensure_future, run, sleep
+from logging import WARNING, basicConfig
+from time import monotonic
+from tracemalloc import get_traced_memory
+from tracemalloc import start as start_tracemalloc
+from tracemalloc import stop as stop_tracemalloc
+from typing import Optional
+
+from benchmarks.fake_api import FakeBotApiServer
+from benchmarks.updates import UpdatesGenerator
+from benchmarks.utils import (
+    add_benchmark_workers,
+    is_cluster_drained,
+    make_benchmark_bot,
+    max_rss_mb,
+    percentile,
+    wait_for_condition,
+)
+from click import command, option
+
+_FEED_INTERVAL = 0.01
+
+
+async def _feed(
+    server: FakeBotApiServer,
+    updates: list[dict],
+    rate: float,
+) -> None:
+    if not rate:
+        server.put_updates(updates)
+        return
+    # open loop: updates arrive on schedule regardless of how fast the bot handles them
+    started_at = monotonic()
+    sent = 0
+    while sent < len(updates):
+        due = min(len(updates), int((monotonic() - started_at) * rate) + 1)
+        if due > sent:
+            server.put_updates(updates[sent:due])
+            sent = due
+        await sleep(_FEED_INTERVAL)
+
+
+async def _benchmark(
+    updates: int,
+    chats: int,
+    users: int,
+    latency: float,
+    jitter: float,
+    error_rate: float,
+    retry_after_rate: float,
+    seed: Optional[int],
+    timeout: float,
+    trace_memory: bool,
+    telegram_limits: bool,
+    rate: float,
+    workers: int,
+) -> None:
+    server = FakeBotApiServer(
+        latency=latency,
+        jitter=jitter,
+        error_rate=error_rate,
+        retry_after_rate=retry_after_rate,
+        seed=seed,
+    )
+    await server.start()
+    bot = make_benchmark_bot(server, telegram_limits)
+    supervisor = add_benchmark_workers(bot, server, workers, telegram_limits) if workers else None
+    generated = UpdatesGenerator(chats=chats, users=users, seed=seed).generate(updates)
+    serving = ensure_future(bot.serve(broker=supervisor.broker if supervisor else None))
+    if not await wait_for_condition(lambda: server.requests["getupdates"] > 0, timeout):
+        raise SystemExit("Bot did not start polling")
+    if supervisor and not await wait_for_condition(lambda: is_cluster_drained(supervisor, 0), timeout):
+        raise SystemExit("Workers did not start")
+    if trace_memory:
+        start_tracemalloc()
+    rss_before = max_rss_mb()
+    started_at = monotonic()
+    feeding = ensure_future(_feed(server, generated, rate))
+    is_completed = await wait_for_condition(
+        lambda: server.delivered >= updates
+        and (is_cluster_drained(supervisor, updates) if supervisor else not bot.dispatcher.pending),
+        timeout,
+    )
+    elapsed = monotonic() - started_at
+    feeding.cancel()
+    traced_peak = get_traced_memory()[1] / 1024 / 1024 if trace_memory else None
+    if trace_memory:
+        stop_tracemalloc()
+    bot._stop()  # pylint: disable=protected-access
+    await serving
+    await server.close()
+
+    latencies = server.replies_latencies
+    print(f"updates:          {server.delivered}/{updates}{'' if is_completed else ' (timed out)'}")
+    print(f"elapsed:          {elapsed:.3f} s")
+    print(f"throughput:       {server.delivered / elapsed:.1f} updates/s")
+    print(f"replies:          {len(latencies)}")
+    p50, p99 = percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000
+    print(f"reply latency:    p50 {p50:.2f} ms, p99 {p99:.2f} ms")
+    print(f"max rss:          {rss_before:.1f} MB before, {max_rss_mb():.1f} MB after")
+    if traced_peak is not None:
+        print(f"traced peak:      {traced_peak:.1f} MB")
+    print(f"api requests:     {dict(server.requests.most_common())}")
+    if server.injected_errors:
+        print(f"injected errors:  {dict(server.injected_errors.most_common())}")
+
+
+@command()
+@option("--updates", default=5_000, show_default=True)
+@option("--chats", default=50, show_default=True)
+@option("--users", default=500, show_default=True)
+@option("--latency", default=0.0, show_default=True, help="Fake API latency, seconds.")
+@option("--jitter", default=0.0, show_default=True, help="Random extra latency up to this value, seconds.")
+@option("--error-rate", default=0.0, show_default=True, help="Share of requests failed with 500.")
+@option("--retry-after-rate", default=0.0, show_default=True, help="Share of requests failed with 429.")
+@option("--seed", type=int, default=42, show_default=True)
+@option("--timeout", default=120.0, show_default=True, help="Seconds to wait for all updates to be processed.")
+@option("--rate", default=0.0, show_default=True, help="Updates per second fed to the bot, 0 puts all of them at once.")
+@option("--trace-memory/--no-trace-memory", default=False, show_default=True)
+@option("--workers", default=0, show_default=True, help="Worker processes handling updates, 0 handles them in-process.")
+@option(
+    "--telegram-limits/--no-telegram-limits",
+    default=False,
+    show_default=True,
+    help="Keep the outbound rate limits of Telegram, which bound the throughput of replies.",
+)
+def main(
+    updates: int,
+    chats: int,
+    users: int,
+    latency: float,
+    jitter: float,
+    error_rate: float,
+    retry_after_rate: float,
+    seed: Optional[int],
+    timeout: float,
+    trace_memory: bool,
+    telegram_limits: bool,
+    rate: float,
+    workers: int,
+) -> None:
+    basicConfig(level=WARNING)
+    run(
+        _benchmark(
+            updates=updates,
+            chats=chats,
+            users=users,
+            latency=latency,
+            jitter=jitter,
+            error_rate=error_rate,
+            retry_after_rate=retry_after_rate,
+            seed=seed,
+            timeout=timeout,
+            trace_memory=trace_memory,
+            telegram_limits=telegram_limits,
+            rate=rate,
+            workers=workers,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
@@ -0,0 +1,85 @@
+from itertools import count
+from random import Random
+from typing import Any, Optional
+
+from benchmarks.fake_api import ADMIN_USER
+
+COMMANDS = ("/ping", "/id", "/8ball", "/luk", "/joke", "/stats", "/help", "пинг!")
+REGEX_TRIGGERS = ("А это точно сработает?", "5 это много", "Is 5 a lot", "ну и ну!", "как дела?")
+CHATTER = ("привет", "как погода", "что нового", "ok", "lol", "сегодня пятница", "hello there", "кто здесь")
+MODERATION_COMMANDS = ("/mute", "/pin", "/unpin", "/shutup")
+
+DEFAULT_MIX = {
+    "text": 0.45,
+    "command": 0.3,
+    "regex": 0.15,
+    "join": 0.05,
+    "moderation": 0.05,
+}
+
+
+class UpdatesGenerator:
+    def __init__(
+        self,
+        chats: int = 50,
+        users: int = 500,
+        mix: Optional[dict[str, float]] = None,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.chats = [-1_000_000_000_000 - number for number in range(chats)]
+        self.users = [
+            {"id": 100 + number, "is_bot": False, "first_name": f"User{number}", "last_name": "Benchmark"}
+            for number in range(users)
+        ]
+        self.mix = mix or DEFAULT_MIX
+        self._random = Random(seed)
+        self._updates_ids = count(1)
+        self._messages_ids = count(1)
+        self._last_messages: dict[int, dict[str, Any]] = {}
+        self._kinds = list(self.mix)
+        self._weights = [self.mix[kind] for kind in self._kinds]
+
+    def _message(
+        self,
+        chat_id: int,
+        user: dict[str, Any],
+        **fields: Any,
+    ) -> dict[str, Any]:
+        return {
+            "message_id": next(self._messages_ids),
+            "from": user,
+            "chat": {"id": chat_id, "type": "supergroup", "title": f"Chat {chat_id}"},
+            "date": 0,
+        } | fields
+
+    def _make_message(
+        self,
+        kind: str,
+        chat_id: int,
+    ) -> dict[str, Any]:
+        user = self._random.choice(self.users)
+        if kind == "command":
+            return self._message(chat_id, user, text=self._random.choice(COMMANDS))
+        if kind == "regex":
+            return self._message(chat_id, user, text=self._random.choice(REGEX_TRIGGERS))
+        if kind == "join":
+            return self._message(chat_id, user, new_chat_members=[user])
+        if kind == "moderation" and (replied := self._last_messages.get(chat_id)):
+            initiator = ADMIN_USER if self._random.random() < 0.5 else user
+            text = self._random.choice(MODERATION_COMMANDS)
+            return self._message(chat_id, initiator, text=text, reply_to_message=replied)
+        words = self._random.sample(CHATTER, 3)
+        return self._message(chat_id, user, text=" ".join(words))
+
+    def generate(
+        self,
+        number: int,
+    ) -> list[dict[str, Any]]:
+        updates = []
+        for kind in self._random.choices(self._kinds, weights=self._weights, k=number):
+            chat_id = self._random.choice(self.chats)
+            message = self._make_message(kind, chat_id)
+            if message.get("text") and "reply_to_message" not in message:
+                self._last_messages[chat_id] = message
+            updates.append({"update_id": next(self._updates_ids), "message": message})
+        return updates
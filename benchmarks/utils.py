@@ -0,0 +1,97 @@
+from asyncio import sleep
+from functools import partial
+from logging import WARNING
+from resource import RUSAGE_SELF, getrusage
+from statistics import quantiles
+from time import monotonic
+from typing import Callable
+
+from benchmarks.fake_api import FakeBotApiServer
+
+from chatushka.bot.internal.jokes import BobukJokesService
+from chatushka.bot.main import make_bot
+from chatushka.core.bot import ChatushkaBot
+from chatushka.core.cluster.brokers import MultiprocessingBroker
+from chatushka.core.cluster.supervisor import ClusterSupervisor
+from chatushka.core.models import EventTypes
+from chatushka.core.transports.rate_limiter import OutboundRateLimiter
+
+_POLL_INTERVAL = 0.01
+_UNLIMITED_RATE = 1e9
+
+
+def max_rss_mb() -> float:
+    return getrusage(RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(
+    values: list[float],
+    rank: int,
+) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return quantiles(values, n=100, method="inclusive")[rank - 1]
+
+
+async def wait_for_condition(
+    condition: Callable[[], bool],
+    timeout: float,
+) -> bool:
+    deadline = monotonic() + timeout
+    while not condition():
+        if monotonic() > deadline:
+            return False
+        await sleep(_POLL_INTERVAL)
+    return True
+
+
+def _make_bot(
+    token: str,
+    api_url: str,
+    jokes_url: str,
+    telegram_limits: bool,
+) -> ChatushkaBot:
+    # the jokes service is a singleton, so it has to be pointed to the fake server before the bot is made
+    BobukJokesService(url=jokes_url)
+    bot = make_bot(token, debug=False, api_url=api_url)
+    if not telegram_limits:
+        bot.api.rate_limiter = OutboundRateLimiter(
+            global_rate=_UNLIMITED_RATE,
+            global_burst=_UNLIMITED_RATE,
+            chat_rate=_UNLIMITED_RATE,
+            chat_burst=_UNLIMITED_RATE,
+        )
+    return bot
+
+
+def make_benchmark_bot(
+    server: FakeBotApiServer,
+    telegram_limits: bool,
+) -> ChatushkaBot:
+    return _make_bot(server.token, server.url, server.jokes_url, telegram_limits)
+
+
+def add_benchmark_workers(
+    bot: ChatushkaBot,
+    server: FakeBotApiServer,
+    workers: int,
+    telegram_limits: bool,
+) -> ClusterSupervisor:
+    # workers are spawned processes, so they get a picklable factory instead of the server
+    factory = partial(_make_bot, server.token, server.url, server.jokes_url, telegram_limits)
+    supervisor = ClusterSupervisor(factory, MultiprocessingBroker(workers), log_level=WARNING)
+    bot.add_handler(EventTypes.STARTUP, supervisor.start, include_in_help=False)
+    bot.add_handler(EventTypes.SHUTDOWN, supervisor.close, include_in_help=False)
+    return supervisor
+
+
+def is_cluster_drained(
+    supervisor: ClusterSupervisor,
+    delivered: int,
+) -> bool:
+    heartbeats = [state.heartbeat for state in supervisor.workers.values()]
+    if not heartbeats or not all(heartbeats):
+        return False
+    leader_pending = sum(supervisor.broker.pending(partition) for partition in supervisor.workers)
+    received = sum(heartbeat.received for heartbeat in heartbeats)  # type: ignore
+    return not leader_pending and received >= delivered and not any(heartbeat.pending for heartbeat in heartbeats)
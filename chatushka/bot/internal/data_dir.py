@@ -1,29 +1,232 @@
-from functools import lru_cache
-from typing import Any, Dict
+from array import array
+from asyncio import Future, get_running_loop
+from logging import getLogger
+from mmap import ACCESS_READ, mmap
+from os import getpid, replace, stat
+from pathlib import Path
+from random import randrange
+from shutil import copyfile
+from tempfile import gettempdir
+from time import monotonic
+from typing import NamedTuple, Optional
+from zlib import crc32
 
 from yaml import safe_load
 
 from chatushka.bot.settings import BOT_DATA_DIR
 
+logger = getLogger(__name__)
 
-@lru_cache
-def read_yaml_from_data_dir(
-    filename: str,
-) -> Dict[str, Any]:
-    if not filename.endswith("yaml"):
-        filename += ".yaml"
-    path = BOT_DATA_DIR / filename
-    with open(path, "r", encoding="utf8") as fh:
-        data = fh.read()
-    return safe_load(data)
+PACKS_CACHE_DIR = Path(gettempdir()) / "chatushka-packs"
+
+_PACK_SEPARATOR = b"\0"
+
+
+class _PackState(NamedTuple):
+    mtime_ns: int
+    size: int
+    buffer: Optional[mmap]
+    starts: array  # type: ignore
+    ends: array  # type: ignore
+
+    def entry(
+        self,
+        index: int,
+    ) -> str:
+        start, end = self.starts[index], self.ends[index]
+        return self.buffer[start:end].decode("utf8").strip()  # type: ignore
+
+
+def _index_entries(
+    buffer: mmap,
+    separator: bytes,
+) -> tuple[array, array]:  # type: ignore
+    starts, ends = array("Q"), array("Q")
+    start, size = 0, len(buffer)
+    while start < size:
+        end = buffer.find(separator, start)
+        if end == -1:
+            end = size
+        if buffer[start:end].strip():
+            starts.append(start)
+            ends.append(end)
+        start = end + len(separator)
+    return starts, ends
+
+
+class ContentPack:
+    def __init__(
+        self,
+        path: Path,
+        separator: bytes = b"\n",
+        check_interval: float = 1,
+        pack_name: Optional[str] = None,
+    ) -> None:
+        # the source is compiled into a pack in the cache dir, editing the source in place can not break mapped pages
+        self.source = path
+        self.path = PACKS_CACHE_DIR / f"{pack_name or path.stem}.{crc32(str(path).encode()):08x}.pack"
+        self.separator = separator
+        self.check_interval = check_interval
+        self._state: Optional[_PackState] = None
+        self._checked_at = 0.0
+        self._source_mtime_ns: Optional[int] = None
+        self._refreshing: Optional[Future] = None  # type: ignore
+
+    def __len__(self) -> int:
+        return len(self._get_state().starts)
+
+    def __getitem__(
+        self,
+        index: int,
+    ) -> str:
+        return self._get_state().entry(index)
+
+    def pick(self) -> str:
+        state = self._get_state()
+        if not state.starts:
+            raise IndexError(f"Content pack {self.source} is empty")
+        return state.entry(randrange(len(state.starts)))
+
+    def reload(self) -> None:
+        self._checked_at = monotonic()
+        if state := self._load():
+            self._swap(state)
+
+    async def preload(self) -> None:
+        # compiling and indexing a pack takes a while, so the first one is done off the loop too
+        state = await get_running_loop().run_in_executor(None, self._load)
+        self._checked_at = monotonic()
+        if state:
+            self._swap(state)
 
+    def close(self) -> None:
+        self._refreshing = None
+        self._swap(None)
 
-def read_txt_from_data_dir(
+    def _swap(
+        self,
+        state: Optional[_PackState],
+    ) -> None:
+        previous, self._state = self._state, state
+        if previous and previous.buffer:
+            previous.buffer.close()
+
+    def _load(self) -> Optional[_PackState]:
+        path = self._prepare()
+        file_stat = stat(path)
+        if self._state and (self._state.mtime_ns, self._state.size) == (file_stat.st_mtime_ns, file_stat.st_size):
+            return None
+        buffer = None
+        starts, ends = array("Q"), array("Q")
+        if file_stat.st_size:
+            with open(path, "rb") as fh:
+                buffer = mmap(fh.fileno(), 0, access=ACCESS_READ)
+            starts, ends = _index_entries(buffer, self.separator)
+        return _PackState(file_stat.st_mtime_ns, file_stat.st_size, buffer, starts, ends)
+
+    def _refresh(self) -> None:
+        # indexing takes about a second per million entries, so the loop keeps serving the old state meanwhile
+        self._checked_at = monotonic()
+        if self._refreshing:
+            return
+        try:
+            loop = get_running_loop()
+        except RuntimeError:
+            self.reload()
+            return
+        self._refreshing = loop.run_in_executor(None, self._load)
+        self._refreshing.add_done_callback(self._refreshed)
+
+    def _refreshed(
+        self,
+        future: Future,  # type: ignore
+    ) -> None:
+        if future.cancelled():
+            return
+        if err := future.exception():
+            logger.error(f"Unable to reload content pack {self.source}: {err!r}")
+        elif state := future.result():
+            if future is self._refreshing:
+                self._swap(state)
+            elif state.buffer:
+                # the pack was closed while it was reloaded
+                state.buffer.close()
+        if future is self._refreshing:
+            self._refreshing = None
+
+    def _prepare(self) -> Path:
+        mtime_ns = stat(self.source).st_mtime_ns
+        if mtime_ns != self._source_mtime_ns or not self.path.exists():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            compiled = self.path.with_suffix(f".{getpid()}.tmp")
+            self._compile(compiled)
+            replace(compiled, self.path)
+            self._source_mtime_ns = mtime_ns
+        return self.path
+
+    def _compile(
+        self,
+        target: Path,
+    ) -> None:
+        copyfile(self.source, target)
+
+    def _get_state(self) -> _PackState:
+        if not self._state:
+            self.reload()
+        elif monotonic() - self._checked_at >= self.check_interval:
+            self._refresh()
+        return self._state  # type: ignore
+
+
+class YamlContentPack(ContentPack):
+    def __init__(
+        self,
+        path: Path,
+        key: str,
+        check_interval: float = 1,
+    ) -> None:
+        super().__init__(
+            path,
+            separator=_PACK_SEPARATOR,
+            check_interval=check_interval,
+            pack_name=f"{path.stem}.{key}",
+        )
+        self.key = key
+
+    def _compile(
+        self,
+        target: Path,
+    ) -> None:
+        with open(self.source, "r", encoding="utf8") as fh:
+            data = safe_load(fh) or {}
+        entries = [str(entry).encode("utf8").replace(_PACK_SEPARATOR, b"") for entry in data.get(self.key) or ()]
+        with open(target, "wb") as fh:
+            fh.write(_PACK_SEPARATOR.join(entries))
+
+
+_PACKS: dict[tuple[str, Optional[str]], ContentPack] = {}
+
+
+def get_content_pack(
     filename: str,
-) -> list[str]:
-    if not filename.endswith("txt"):
-        filename += ".txt"
+    key: Optional[str] = None,
+) -> ContentPack:
+    if (pack := _PACKS.get((filename, key))) is not None:
+        return pack
     path = BOT_DATA_DIR / filename
-    with open(path, "r", encoding="utf8") as fh:
-        data = fh.read()
-    return data.strip().split("\n")
+    if path.suffix in (".yaml", ".yml"):
+        if key is None:
+            raise ValueError(f"Key is required for YAML content pack {filename}")
+        pack = YamlContentPack(path, key)
+    else:
+        pack = ContentPack(path)
+    _PACKS[(filename, key)] = pack
+    return pack
+
+
+async def preload_content_packs() -> None:
+    for pack in list(_PACKS.values()):
+        try:
+            await pack.preload()
+        except Exception:  # noqa, pylint: disable=broad-except
+            logger.exception(f"Unable to load content pack {pack.source}")
@@ -0,0 +1,55 @@
+from hashlib import blake2b
+from math import log
+from typing import Hashable, Optional
+
+_HASH_BITS = 64
+_POWERS = [2.0**-rank for rank in range(_HASH_BITS + 1)]
+
+
+class HyperLogLog:
+    def __init__(
+        self,
+        precision: int = 10,
+        registers: Optional[bytes] = None,
+    ) -> None:
+        if not 4 <= precision <= 16:
+            raise ValueError(f"Precision {precision} is out of [4, 16] range")
+        self.precision = precision
+        self.registers = bytearray(registers) if registers else bytearray(1 << precision)
+        if len(self.registers) != 1 << precision:
+            raise ValueError(f"Expected {1 << precision} registers, got {len(self.registers)}")
+        self._rest_bits = _HASH_BITS - precision
+        self._rest_mask = (1 << self._rest_bits) - 1
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def add(
+        self,
+        value: Hashable,
+    ) -> bool:
+        hashed = int.from_bytes(blake2b(str(value).encode(), digest_size=8).digest(), "big")
+        index = hashed >> self._rest_bits
+        rank = self._rest_bits - (hashed & self._rest_mask).bit_length() + 1
+        if rank <= self.registers[index]:
+            return False
+        self.registers[index] = rank
+        return True
+
+    def count(self) -> int:
+        size = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / size) * size * size / sum(_POWERS[rank] for rank in self.registers)
+        if estimate <= 2.5 * size and (zeros := self.registers.count(0)):
+            estimate = size * log(size / zeros)
+        return round(estimate)
+
+    def merge(
+        self,
+        other: "HyperLogLog",
+    ) -> None:
+        if other.precision != self.precision:
+            raise ValueError("Unable to merge sketches with different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.registers)
@@ -0,0 +1,125 @@
+from asyncio import CancelledError, Event, Task, ensure_future, sleep
+from collections import deque
+from contextlib import suppress
+from logging import getLogger
+from time import monotonic
+from typing import Optional
+
+from httpx import AsyncClient
+
+from chatushka.bot.settings import BOBUK_JOKES_URL
+from chatushka.core.services.base import ServiceWrapperBase
+
+logger = getLogger(__name__)
+
+_RETRY_DELAY = 1
+
+
+class BobukJokesService(ServiceWrapperBase):
+    def __init__(
+        self,
+        url: str = BOBUK_JOKES_URL,
+        capacity: int = 32,
+        low_water_mark: int = 8,
+        recent_size: int = 256,
+        failures_threshold: int = 5,
+        cooldown: float = 60,
+        timeout: float = 10,
+    ) -> None:
+        super().__init__()
+        self.healthz_name = "bobuk_jokes"
+        self.url = url
+        self.capacity = capacity
+        self.low_water_mark = low_water_mark
+        self.failures_threshold = failures_threshold
+        self.cooldown = cooldown
+        self.timeout = timeout
+        self._jokes: deque[str] = deque()
+        self._recent: deque[int] = deque(maxlen=recent_size)
+        self._recent_hashes: set[int] = set()
+        self._failures = 0
+        self._opened_until = 0.0
+        self._client: Optional[AsyncClient] = None
+        self._refill_needed: Optional[Event] = None
+        self._refilling: Optional[Task] = None  # type: ignore
+
+    def __len__(self) -> int:
+        return len(self._jokes)
+
+    @property
+    def is_circuit_open(self) -> bool:
+        return self._opened_until > monotonic()
+
+    async def startup_event_handler(self) -> None:
+        self._client = AsyncClient(timeout=self.timeout)
+        self._refill_needed = Event()
+        self._refill_needed.set()
+        self._refilling = ensure_future(self._refill_loop())
+
+    async def shutdown_event_handler(self) -> None:
+        if self._refilling:
+            self._refilling.cancel()
+            with suppress(CancelledError):
+                await self._refilling
+            self._refilling = None
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    async def health_check(self) -> None:
+        if self.is_circuit_open:
+            raise RuntimeError(f"{self.url} is unavailable")
+
+    def pop(self) -> Optional[str]:
+        joke = self._jokes.popleft() if self._jokes else None
+        if len(self._jokes) < self.low_water_mark and self._refill_needed:
+            self._refill_needed.set()
+        return joke
+
+    def _remember(
+        self,
+        joke: str,
+    ) -> bool:
+        joke_hash = hash(joke)
+        if joke_hash in self._recent_hashes:
+            return False
+        if len(self._recent) == self._recent.maxlen:
+            self._recent_hashes.discard(self._recent[0])
+        self._recent.append(joke_hash)
+        self._recent_hashes.add(joke_hash)
+        return True
+
+    async def _fetch(self) -> str:
+        response = await self._client.get(self.url)  # type: ignore
+        response.raise_for_status()
+        return response.json()["content"]
+
+    async def _refill(self) -> None:
+        duplicates = 0
+        while len(self._jokes) < self.capacity and duplicates < self.capacity:
+            if self.is_circuit_open:
+                await sleep(self._opened_until - monotonic())
+                continue
+            try:
+                joke = await self._fetch()
+            except Exception as err:  # noqa, pylint: disable=broad-except
+                self._failures += 1
+                logger.debug(f"Unable to fetch joke: {err}")
+                if self._failures >= self.failures_threshold:
+                    logger.warning(f"{self.url} is unavailable, pause for {self.cooldown} seconds")
+                    self._opened_until = monotonic() + self.cooldown
+                    self._failures = 0
+                else:
+                    await sleep(_RETRY_DELAY)
+                continue
+            self._failures = 0
+            if not self._remember(joke):
+                duplicates += 1
+                continue
+            self._jokes.append(joke)
+
+    async def _refill_loop(self) -> None:
+        while True:
+            await self._refill_needed.wait()  # type: ignore
+            self._refill_needed.clear()  # type: ignore
+            await self._refill()
@@ -1,9 +1,12 @@
 from datetime import datetime, timedelta, timezone
 from enum import Enum
+from html import escape
 from random import choice
 
+from chatushka.bot.internal.scheduled_actions import SEND_MESSAGE_ACTION, get_unmute_key
 from chatushka.bot.settings import get_settings
 from chatushka.core.matchers import CommandsMatcher
+from chatushka.core.services.scheduler import ActionsScheduler
 from chatushka.core.transports.models import ChatPermissions, Message, User
 from chatushka.core.transports.telegram_bot_api import TelegramBotApi
 
@@ -13,6 +16,7 @@ RESTRICT_PERMISSION = ChatPermissions(
     can_send_polls=False,
     can_send_other_messages=False,
 )
+MUTE_EXPIRED_MESSAGE = '🧐 <a href="tg://user?id={user}">{name}</a> снова с нами.'
 settings = get_settings()
 mute_matcher = CommandsMatcher(
     prefixes=settings.command_prefixes,
@@ -44,30 +48,40 @@ async def send_mute_request(
     restrict_time: timedelta,
 ) -> None:
     text_tmpl = choice(MuteMessages.ACCIDENT.value)
+    until_date = datetime.now(tz=timezone.utc) + restrict_time
     is_success = await api.restrict_chat_member(
         chat_id=message.chat.id,
         user_id=restrict_user.id,
         permissions=RESTRICT_PERMISSION,
-        until_date=datetime.now(tz=timezone.utc) + restrict_time,
+        until_date=until_date,
     )
     if is_success:
         await api.send_message(
             chat_id=message.chat.id,
             text=text_tmpl.format(
                 user=restrict_user.id,
-                name=restrict_user.readable_name,
+                name=escape(restrict_user.readable_name),
                 time=int(restrict_time.total_seconds() // 60),
             ),
         )
+        await ActionsScheduler().schedule(
+            SEND_MESSAGE_ACTION,
+            dict(
+                chat_id=message.chat.id,
+                text=MUTE_EXPIRED_MESSAGE.format(user=restrict_user.id, name=escape(restrict_user.readable_name)),
+            ),
+            due_at=until_date.timestamp(),
+            key=get_unmute_key(message.chat.id, restrict_user.id),
+        )
         return
     text_tmpl = choice(MuteMessages.LOOSER.value)
     await api.send_message(
         chat_id=message.chat.id,
         text=text_tmpl.format(
             looser_id=initiator.id,
-            looser_name=initiator.readable_name,
+            looser_name=escape(initiator.readable_name),
             victim_id=restrict_user.id,
-            victim_name=restrict_user.readable_name,
+            victim_name=escape(restrict_user.readable_name),
         ),
         reply_to_message_id=message.message_id,
     )
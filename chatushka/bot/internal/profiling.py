@@ -0,0 +1,11 @@
+from functools import lru_cache
+
+from chatushka.bot.settings import get_settings
+from chatushka.core.profiling import RuntimeProfiler
+
+settings = get_settings()
+
+
+@lru_cache
+def get_profiler() -> RuntimeProfiler:
+    return RuntimeProfiler(settings.profiles_dir)
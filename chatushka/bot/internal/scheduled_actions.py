@@ -0,0 +1,52 @@
+from typing import Optional
+
+from chatushka.core.services.scheduler import ActionsScheduler
+from chatushka.core.transports.telegram_bot_api import TelegramBotApi
+
+SEND_MESSAGE_ACTION = "send_message"
+UNPIN_MESSAGE_ACTION = "unpin_message"
+
+
+def get_unpin_key(
+    chat_id: int,
+    message_id: int,
+) -> str:
+    return f"unpin:{chat_id}:{message_id}"
+
+
+def get_unmute_key(
+    chat_id: int,
+    user_id: int,
+) -> str:
+    return f"unmute:{chat_id}:{user_id}"
+
+
+async def _send_message(
+    api: TelegramBotApi,
+    chat_id: int,
+    text: str,
+    reply_to_message_id: Optional[int] = None,
+) -> None:
+    await api.send_message(
+        chat_id=chat_id,
+        text=text,
+        reply_to_message_id=reply_to_message_id,
+    )
+
+
+async def _unpin_message(
+    api: TelegramBotApi,
+    chat_id: int,
+    message_id: int,
+) -> None:
+    await api.unpin_chat_message(
+        chat_id=chat_id,
+        message_id=message_id,
+    )
+
+
+def add_scheduled_actions(
+    scheduler: ActionsScheduler,
+) -> None:
+    scheduler.add_action(SEND_MESSAGE_ACTION, _send_message)
+    scheduler.add_action(UNPIN_MESSAGE_ACTION, _unpin_message)
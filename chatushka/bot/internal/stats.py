@@ -0,0 +1,323 @@
+from asyncio import CancelledError, Task, ensure_future, sleep
+from collections import Counter, OrderedDict
+from contextlib import suppress
+from datetime import datetime, timezone
+from logging import getLogger
+from typing import Any, Hashable, Optional
+
+from chatushka import ChatushkaBot
+from chatushka.bot.internal.hyperloglog import HyperLogLog
+from chatushka.core.services.base import ServiceWrapperBase
+from chatushka.core.services.mongodb.bulk_writer import MongoDBBulkWriter
+from chatushka.core.services.mongodb.settings import is_mongodb_configured
+from chatushka.core.services.mongodb.wrapper import MongoDBWrapper
+from chatushka.core.transports.models import Message
+
+logger = getLogger(__name__)
+
+STATS_COLLECTION = "chat_stats"
+
+
+def get_stats_day() -> str:
+    return datetime.now(tz=timezone.utc).date().isoformat()
+
+
+class TopCounter:
+    def __init__(
+        self,
+        size: int,
+        max_keys: Optional[int] = None,
+        is_evicting: bool = False,
+    ) -> None:
+        self.size = size
+        self.max_keys = max_keys
+        self.is_evicting = is_evicting
+        self.counts: dict[Hashable, int] = {}
+        self.evicted: set[Hashable] = set()
+        self._top: dict[Hashable, int] = {}
+
+    def increment(
+        self,
+        key: Hashable,
+    ) -> bool:
+        if key not in self.counts and self.max_keys and len(self.counts) >= self.max_keys:
+            if not self.is_evicting:
+                return False
+            self._evict(max(self.max_keys // 2, self.size))
+        self.evicted.discard(key)
+        count = self.counts[key] = self.counts.get(key, 0) + 1
+        # counters only grow by one, so a key can enter the top only by outrunning its weakest member
+        if key in self._top or len(self._top) < self.size:
+            self._top[key] = count
+            return True
+        weakest = min(self._top, key=self._top.__getitem__)
+        if count > self._top[weakest]:
+            del self._top[weakest]
+            self._top[key] = count
+        return True
+
+    def merge(
+        self,
+        counts: dict[Hashable, int],
+    ) -> None:
+        for key, count in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + count
+        if self.max_keys and len(self.counts) > self.max_keys:
+            self._evict(self.max_keys)
+        self._top = dict(sorted(self.counts.items(), key=lambda item: -item[1])[: self.size])
+
+    def _evict(
+        self,
+        keep: int,
+    ) -> None:
+        # sorting is amortized over the keys added until the counter is full again
+        ranked = sorted(self.counts.items(), key=lambda item: (-item[1], item[0] not in self._top))
+        self.counts = dict(ranked[:keep])
+        self.evicted.update(key for key, _ in ranked[keep:])
+
+    def most_common(self) -> list[tuple[Hashable, int]]:
+        return sorted(self._top.items(), key=lambda item: -item[1])
+
+
+class DayRollup:
+    def __init__(self) -> None:
+        self.messages = 0
+        self.users = HyperLogLog()
+
+
+class ChatActivity:
+    def __init__(
+        self,
+        top_size: int = 5,
+        days: int = 7,
+        max_commands: int = 64,
+        max_users: int = 1024,
+    ) -> None:
+        self.days_limit = days
+        self.messages = 0
+        self.users = HyperLogLog()
+        self.days: OrderedDict[str, DayRollup] = OrderedDict()
+        self.user_messages = TopCounter(top_size, max_keys=max_users, is_evicting=True)
+        self.commands = TopCounter(top_size, max_keys=max_commands)
+        self.names: dict[int, str] = {}
+        self.is_loaded = False
+        self._increments: Counter[str] = Counter()
+        self._changed_sketches: set[str] = set()
+        self._dropped_days: set[str] = set()
+
+    def _get_rollup(
+        self,
+        day: str,
+    ) -> DayRollup:
+        if (rollup := self.days.get(day)) is None:
+            rollup = self.days[day] = DayRollup()
+            while len(self.days) > self.days_limit:
+                self._dropped_days.add(self.days.popitem(last=False)[0])
+        return rollup
+
+    def record(
+        self,
+        user_id: int,
+        name: str,
+        day: str,
+        command: Optional[str] = None,
+    ) -> None:
+        rollup = self._get_rollup(day)
+        self.messages += 1
+        rollup.messages += 1
+        self._increments.update(("messages", f"days.{day}.messages", f"users.{user_id}"))
+        if self.users.add(user_id):
+            self._changed_sketches.add("")
+        if rollup.users.add(user_id):
+            self._changed_sketches.add(day)
+        self.user_messages.increment(user_id)
+        self.names[user_id] = name
+        if len(self.names) > len(self.user_messages.counts):
+            self.names = {key: self.names[key] for key in self.user_messages.counts if key in self.names}
+        if command and self.commands.increment(command):
+            self._increments[f"commands.{command}"] += 1
+
+    def active_users(
+        self,
+        days: int = 1,
+    ) -> int:
+        sketch = HyperLogLog()
+        for rollup in list(self.days.values())[-days:]:
+            sketch.merge(rollup.users)
+        return sketch.count()
+
+    def merge_document(
+        self,
+        document: dict[str, Any],
+    ) -> None:
+        self.messages += document.get("messages", 0)
+        if registers := document.get("users_hll"):
+            self.users.merge(HyperLogLog(registers=registers))
+        self.user_messages.merge({int(user_id): count for user_id, count in document.get("users", {}).items()})
+        self.commands.merge(document.get("commands", {}))
+        self.names = {key: self.names[key] for key in self.user_messages.counts if key in self.names}
+        for user_id, name in document.get("names", {}).items():
+            if int(user_id) in self.user_messages.counts:
+                self.names.setdefault(int(user_id), name)
+            else:
+                self.user_messages.evicted.add(int(user_id))
+        stored_days = sorted(document.get("days", {}).items())
+        self._dropped_days.update(day for day, _ in stored_days[: -self.days_limit])
+        for day, stored in stored_days[-self.days_limit :]:  # noqa
+            rollup = self._get_rollup(day)
+            rollup.messages += stored.get("messages", 0)
+            if registers := stored.get("users_hll"):
+                rollup.users.merge(HyperLogLog(registers=registers))
+        days = sorted(self.days.items())
+        self._dropped_days.update(day for day, _ in days[: -self.days_limit])
+        self.days = OrderedDict(days[-self.days_limit :])  # noqa
+
+    def pop_changes(self) -> Optional[dict[str, Any]]:
+        # evicted keys and old days are removed from the document too, so it stays as bounded as the counters
+        removed = (
+            [f"days.{day}" for day in self._dropped_days]
+            + [f"users.{user_id}" for user_id in self.user_messages.evicted]
+            + [f"names.{user_id}" for user_id in self.user_messages.evicted]
+            + [f"commands.{command}" for command in self.commands.evicted]
+        )
+        for day in self._dropped_days:
+            self._increments.pop(f"days.{day}.messages", None)
+        for path in removed:
+            self._increments.pop(path, None)
+        changes: dict[str, Any] = {}
+        if self._increments:
+            changes["$inc"] = dict(self._increments)
+        if removed:
+            changes["$unset"] = dict.fromkeys(removed, "")
+        updated = {}
+        for day in self._changed_sketches:
+            if not day:
+                updated["users_hll"] = self.users.to_bytes()
+            elif rollup := self.days.get(day):
+                updated[f"days.{day}.users_hll"] = rollup.users.to_bytes()
+        updated |= {f"names.{user_id}": self.names[user_id] for user_id, _ in self.user_messages.most_common()}
+        if changes and updated:
+            changes["$set"] = updated
+        self._increments.clear()
+        self._changed_sketches.clear()
+        self._dropped_days.clear()
+        self.user_messages.evicted.clear()
+        self.commands.evicted.clear()
+        return changes or None
+
+
+class ChatStatsService(ServiceWrapperBase):
+    def __init__(
+        self,
+        flush_interval: float = 60,
+        collection: str = STATS_COLLECTION,
+        max_chats: int = 10_000,
+    ) -> None:
+        super().__init__()
+        self.healthz_name = "chat_stats"
+        self.flush_interval = flush_interval
+        self.collection = collection
+        self.is_persistent = is_mongodb_configured()
+        self.max_chats = max_chats
+        self.chats: OrderedDict[int, ChatActivity] = OrderedDict()
+        self._evicted: list[tuple[int, dict[str, Any]]] = []
+        self._loading: dict[int, Task] = {}  # type: ignore
+        self._flushing: Optional[Task] = None  # type: ignore
+
+    def add_event_handlers(
+        self,
+        bot: ChatushkaBot,
+    ) -> None:
+        super().add_event_handlers(bot)
+        if self.is_persistent:
+            MongoDBBulkWriter().add_event_handlers(bot)
+
+    async def startup_event_handler(self) -> None:
+        if self.is_persistent:
+            self._flushing = ensure_future(self._flush_loop())
+
+    async def shutdown_event_handler(self) -> None:
+        if self._flushing:
+            self._flushing.cancel()
+            with suppress(CancelledError):
+                await self._flushing
+            self._flushing = None
+            await self.flush()
+        for task in self._loading.values():
+            task.cancel()
+
+    async def health_check(self) -> None:
+        if self.is_persistent and (not self._flushing or self._flushing.done()):
+            raise RuntimeError("Stats are not flushed")
+
+    def get(
+        self,
+        chat_id: int,
+    ) -> ChatActivity:
+        if (activity := self.chats.get(chat_id)) is None:
+            activity = self.chats[chat_id] = ChatActivity()
+            activity.is_loaded = not self.is_persistent
+            self._load(chat_id)
+            self._evict()
+        else:
+            self.chats.move_to_end(chat_id)
+        return activity
+
+    def _evict(self) -> None:
+        while len(self.chats) > self.max_chats:
+            # chats being loaded are kept, their changes can not be written before the stored document is merged
+            evicted = next((chat_id for chat_id, activity in self.chats.items() if activity.is_loaded), None)
+            if evicted is None:
+                return
+            activity = self.chats.pop(evicted)
+            if self.is_persistent and (changes := activity.pop_changes()):
+                self._evicted.append((evicted, changes))
+
+    def record(
+        self,
+        message: Message,
+        command: Optional[str] = None,
+    ) -> None:
+        self.get(message.chat.id).record(message.user.id, message.user.readable_name, get_stats_day(), command)
+
+    def _load(
+        self,
+        chat_id: int,
+    ) -> None:
+        if self.is_persistent and not self.chats[chat_id].is_loaded and chat_id not in self._loading:
+            self._loading[chat_id] = ensure_future(self._load_document(chat_id))
+
+    async def _load_document(
+        self,
+        chat_id: int,
+    ) -> None:
+        try:
+            collection = MongoDBWrapper().client[MongoDBBulkWriter().database][self.collection]
+            if document := await collection.find_one({"_id": chat_id}):
+                self.chats[chat_id].merge_document(document)
+            self.chats[chat_id].is_loaded = True
+        except Exception:  # noqa, pylint: disable=broad-except
+            logger.exception(f"Unable to load stats of chat {chat_id}")
+        finally:
+            del self._loading[chat_id]
+
+    async def flush(self) -> None:
+        writer = MongoDBBulkWriter()
+        while self._evicted:
+            chat_id, changes = self._evicted.pop(0)
+            await writer.upsert(self.collection, {"_id": chat_id}, changes)
+        for chat_id, activity in list(self.chats.items()):
+            if not activity.is_loaded:
+                # persisted sketches must not be overwritten before they are merged
+                self._load(chat_id)
+                continue
+            if changes := activity.pop_changes():
+                await writer.upsert(self.collection, {"_id": chat_id}, changes)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:  # noqa, pylint: disable=broad-except
+                logger.exception("Unable to flush stats")
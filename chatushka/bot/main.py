@@ -1,9 +1,16 @@
 from asyncio import run
+from functools import partial
 from logging import DEBUG, INFO, WARNING, basicConfig, getLogger
+from typing import Optional
 
 from click import command, option
 
 from chatushka import ChatushkaBot
+from chatushka.bot.internal.data_dir import preload_content_packs
+from chatushka.bot.internal.jokes import BobukJokesService
+from chatushka.bot.internal.profiling import get_profiler
+from chatushka.bot.internal.scheduled_actions import add_scheduled_actions
+from chatushka.bot.internal.stats import ChatStatsService
 from chatushka.bot.matchers import (
     admin_matcher,
     eight_ball_matcher,
@@ -11,10 +18,22 @@ from chatushka.bot.matchers import (
     jokes_matcher,
     lukashenko_matcher,
     philosophy_matcher,
+    profiling_matcher,
+    reminders_matcher,
+    stats_matcher,
     suicide_matcher,
     welcoming_matcher,
 )
 from chatushka.bot.settings import get_settings
+from chatushka.core.cluster.brokers import MultiprocessingBroker
+from chatushka.core.cluster.supervisor import ClusterSupervisor
+from chatushka.core.models import EventTypes, ServeModes
+from chatushka.core.services.mongodb.broadcasts import MongoDBBroadcastCheckpoints
+from chatushka.core.services.mongodb.settings import is_mongodb_configured
+from chatushka.core.services.scheduler import ActionsScheduler
+from chatushka.core.transports.recording import UpdatesRecorder
+from chatushka.core.transports.telegram_bot_api import TELEGRAM_BOT_API_URL, TelegramBotApi
+from chatushka.webui import WebUIServer
 
 logger = getLogger()
 settings = get_settings()
@@ -23,8 +42,21 @@ settings = get_settings()
 def make_bot(
     token: str,
     debug: bool,
+    api_url: str = TELEGRAM_BOT_API_URL,
+    recorder: Optional[UpdatesRecorder] = None,
+    with_services: bool = True,
 ) -> ChatushkaBot:
-    instance = ChatushkaBot(token=token, debug=debug)
+    instance = ChatushkaBot(
+        token=token,
+        debug=debug,
+        api=TelegramBotApi(
+            token,
+            base_url=api_url,
+            recorder=recorder,
+            broadcast_checkpoints=MongoDBBroadcastCheckpoints() if is_mongodb_configured() else None,
+        ),
+        profiler=get_profiler(),
+    )
     instance.add_matcher(
         admin_matcher,
         jokes_matcher,
@@ -34,7 +66,19 @@ def make_bot(
         lukashenko_matcher,
         welcoming_matcher,
         philosophy_matcher,
+        stats_matcher,
+        profiling_matcher,
+        reminders_matcher,
     )
+    if not with_services:
+        # the leader of workers only receives updates, the matchers are kept for allowed updates and cron jobs
+        return instance
+    instance.add_handler(EventTypes.STARTUP, preload_content_packs, include_in_help=False)
+    BobukJokesService().add_event_handlers(instance)
+    ChatStatsService().add_event_handlers(instance)
+    scheduler = ActionsScheduler()
+    add_scheduled_actions(scheduler)
+    scheduler.add_event_handlers(instance)
     return instance
 
 
@@ -48,12 +92,92 @@ def make_bot(
     "--debug/--no-debug",
     is_flag=True,
 )
+@option(
+    "--api-url",
+    envvar="BOT_API_URL",
+    default=TELEGRAM_BOT_API_URL,
+    show_default=True,
+    help="Base URL of Telegram Bot API server.",
+)
+@option(
+    "--webhook-url",
+    help="Public URL of the webhook. Long polling is used when it is not set.",
+)
+@option(
+    "--webhook-host",
+    default="127.0.0.1",
+    show_default=True,
+)
+@option(
+    "--webhook-port",
+    default=8080,
+    show_default=True,
+)
+@option(
+    "--webhook-secret",
+    envvar="BOT_WEBHOOK_SECRET",
+)
+@option(
+    "--record-updates",
+    envvar="BOT_RECORD_UPDATES",
+    help="Directory to record updates received by long polling to. Recording is disabled when it is not set.",
+)
+@option(
+    "--workers",
+    envvar="BOT_WORKERS",
+    default=0,
+    show_default=True,
+    help="Number of worker processes handling updates partitioned by chat. Updates are handled in-process when 0.",
+)
+@option(
+    "--metrics-port",
+    type=int,
+    help="Port of the web UI exposing /metrics. The web UI is disabled when it is not set.",
+)
+@option(
+    "--metrics-host",
+    default="127.0.0.1",
+    show_default=True,
+)
 def cli_main(
     token: str,
     debug: bool,
+    api_url: str,
+    webhook_url: Optional[str],
+    webhook_host: str,
+    webhook_port: int,
+    webhook_secret: Optional[str],
+    record_updates: Optional[str],
+    workers: int,
+    metrics_port: Optional[int],
+    metrics_host: str,
 ) -> None:
     basicConfig(level=DEBUG if debug else INFO)
     getLogger("httpx").setLevel(WARNING)
     logger.debug("Debug mode is on".upper())
-    bot = make_bot(token, debug)
-    run(bot.serve())
+    recorder = UpdatesRecorder(record_updates) if record_updates else None
+    bot = make_bot(token, debug, api_url=api_url, recorder=recorder, with_services=not workers)
+    broker = None
+    if workers:
+        broker = MultiprocessingBroker(workers)
+        supervisor = ClusterSupervisor(
+            partial(make_bot, token, debug, api_url=api_url),
+            broker,
+            log_level=DEBUG if debug else INFO,
+        )
+        bot.add_handler(EventTypes.STARTUP, supervisor.start, include_in_help=False)
+        bot.add_handler(EventTypes.SHUTDOWN, supervisor.close, include_in_help=False)
+    if metrics_port:
+        webui = WebUIServer(host=metrics_host, port=metrics_port)
+        bot.add_handler(EventTypes.STARTUP, webui.start, include_in_help=False)
+        bot.add_handler(EventTypes.SHUTDOWN, webui.close, include_in_help=False)
+    run(
+        bot.serve(
+            mode=ServeModes.WEBHOOK if webhook_url else ServeModes.POLLING,
+            webhook_url=webhook_url,
+            webhook_host=webhook_host,
+            webhook_port=webhook_port,
+            webhook_secret_token=webhook_secret,
+            broker=broker,
+        )
+    )
@@ -4,6 +4,9 @@ from chatushka.bot.matchers.eight_ball import eight_ball_matcher
 from chatushka.bot.matchers.helpers import helpers_matcher
 from chatushka.bot.matchers.lukashenko import lukashenko_matcher
 from chatushka.bot.matchers.philosophy import philosophy_matcher
+from chatushka.bot.matchers.profiling import profiling_matcher
+from chatushka.bot.matchers.reminders import reminders_matcher
+from chatushka.bot.matchers.stats import stats_matcher
 from chatushka.bot.matchers.suicide import suicide_matcher
 from chatushka.bot.matchers.welcoming import welcoming_matcher
 
@@ -16,4 +19,7 @@ __all__ = (
     "lukashenko_matcher",
     "welcoming_matcher",
     "philosophy_matcher",
+    "stats_matcher",
+    "profiling_matcher",
+    "reminders_matcher",
 )
@@ -21,20 +21,7 @@ async def mute_handler(
     args: list[str],
 ) -> None:
     restrict_time = timedelta(minutes=randrange(10, 30))
-    admins = await api.get_chat_administrators(message.chat.id)
-
-    privileges = None
-    for admin in admins:
-        if admin.user.id == message.user.id:
-            privileges = admin
-            break
-
-    if (
-        not message.reply_to_message
-        or not privileges
-        or not privileges.status.CREATOR
-        or not privileges.can_restrict_members
-    ):
+    if not message.reply_to_message or not await api.admins.can_restrict(message.chat.id, message.user.id):
         await send_mute_request(
             api=api,
             message=message,
@@ -1,7 +1,9 @@
-from asyncio import sleep
+from time import time
 
+from chatushka.bot.internal.scheduled_actions import UNPIN_MESSAGE_ACTION, get_unpin_key
 from chatushka.bot.settings import get_settings
 from chatushka.core.matchers import CommandsMatcher
+from chatushka.core.services.scheduler import ActionsScheduler
 from chatushka.core.transports.models import Message
 from chatushka.core.transports.telegram_bot_api import TelegramBotApi
 
@@ -24,6 +26,7 @@ async def pin_handler(
             text="Для закрепа необходимо написать команду реплаем",
             reply_to_message_id=message.message_id,
         )
+        return
 
     try:
         pin_hours = int(args[0])
@@ -40,10 +43,11 @@ async def pin_handler(
             text=f"Через {pin_hours} ч. закреп будет убран",
             reply_to_message_id=message.message_id,
         )
-        await sleep(pin_hours * 60)
-        await api.unpin_chat_message(
-            chat_id=message.chat.id,
-            message_id=message.reply_to_message.message_id,
+        await ActionsScheduler().schedule(
+            UNPIN_MESSAGE_ACTION,
+            dict(chat_id=message.chat.id, message_id=message.reply_to_message.message_id),
+            due_at=time() + pin_hours * 3600,
+            key=get_unpin_key(message.chat.id, message.reply_to_message.message_id),
         )
 
 
@@ -52,6 +56,9 @@ async def unpin_handler(
     api: TelegramBotApi,
     message: Message,
 ) -> None:
+    if not message.reply_to_message:
+        return
+    await ActionsScheduler().cancel(get_unpin_key(message.chat.id, message.reply_to_message.message_id))
     await api.unpin_chat_message(
         chat_id=message.chat.id,
         message_id=message.reply_to_message.message_id,
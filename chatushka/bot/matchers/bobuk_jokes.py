@@ -1,6 +1,5 @@
-from httpx import AsyncClient
-
-from chatushka.bot.settings import BOBUK_JOKES_URL, get_settings
+from chatushka.bot.internal.jokes import BobukJokesService
+from chatushka.bot.settings import get_settings
 from chatushka.core.matchers import CommandsMatcher
 from chatushka.core.transports.models import Message
 from chatushka.core.transports.telegram_bot_api import TelegramBotApi
@@ -17,13 +16,15 @@ async def jokes_handler(
     api: TelegramBotApi,
     message: Message,
 ) -> None:
-    async with AsyncClient() as client:  # type: AsyncClient
-        response = await client.get(BOBUK_JOKES_URL)
-        try:
-            response.raise_for_status()
-            joke = response.json()["content"]
-        except Exception:  # noqa, pylint: disable=broad-except
-            return
+    service = BobukJokesService()
+    # jokes already in the buffer are served while the source is unavailable
+    if not (joke := service.pop()):
+        await api.send_message(
+            chat_id=message.chat.id,
+            text="No jokes right now",
+            reply_to_message_id=message.message_id,
+        )
+        return
     await api.send_message(
         chat_id=message.chat.id,
         text=joke,
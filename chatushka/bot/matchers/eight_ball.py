@@ -1,6 +1,6 @@
-from random import choice, randrange
+from random import randrange
 
-from chatushka.bot.internal.data_dir import read_yaml_from_data_dir
+from chatushka.bot.internal.data_dir import get_content_pack
 from chatushka.bot.settings import get_settings
 from chatushka.core.matchers import CommandsMatcher, RegexMatcher
 from chatushka.core.transports.models import Message
@@ -11,6 +11,7 @@ HELP_MESSAGE = (
 )
 
 settings = get_settings()
+answers = get_content_pack("eight_ball.yaml", "ru")
 eight_ball_matcher = CommandsMatcher(
     prefixes=settings.command_prefixes,
     postfixes=settings.command_postfixes,
@@ -24,10 +25,9 @@ async def eight_ball_handler(
     api: TelegramBotApi,
     message: Message,
 ) -> None:
-    answers = read_yaml_from_data_dir("eight_ball")
     await api.send_message(
         chat_id=message.chat.id,
-        text=choice(answers["ru"]),
+        text=answers.pick(),
         reply_to_message_id=message.message_id,
     )
 
@@ -38,11 +38,10 @@ async def eight_ball_answer_handler(
     message: Message,
     matched: list[str],  # noqa, pylint: disable=unused-argument
 ) -> None:
-    answers = read_yaml_from_data_dir("eight_ball")
     rand_int = randrange(8)
     if rand_int == 1:
         await api.send_message(
             chat_id=message.chat.id,
-            text=choice(answers["ru"]),
+            text=answers.pick(),
             reply_to_message_id=message.message_id,
         )
@@ -0,0 +1,58 @@
+from chatushka.bot.internal.profiling import get_profiler
+from chatushka.bot.settings import get_settings
+from chatushka.core.matchers import CommandsMatcher
+from chatushka.core.transports.models import Message
+from chatushka.core.transports.telegram_bot_api import TelegramBotApi
+
+_MAX_DURATION = 60
+
+settings = get_settings()
+profiling_matcher = CommandsMatcher(
+    prefixes=settings.command_prefixes,
+    postfixes=settings.command_postfixes,
+)
+
+
+def _parse_duration(
+    args: list[str],
+    default: float,
+) -> float:
+    try:
+        duration = float(args[0])
+    except (ValueError, IndexError):
+        duration = default
+    # nan fails the comparison too
+    if not duration > 0:
+        duration = default
+    return min(duration, _MAX_DURATION)
+
+
+@profiling_matcher("profile", include_in_help=False)
+async def profile_handler(
+    api: TelegramBotApi,
+    message: Message,
+    args: list[str],
+) -> None:
+    if message.user.id not in settings.operators:
+        return
+    profiler = get_profiler()
+    if profiler.is_running:
+        await api.send_message(
+            chat_id=message.chat.id,
+            text="Профилирование уже идёт",
+            reply_to_message_id=message.message_id,
+        )
+        return
+    report = await profiler.capture(_parse_duration(args, profiler.duration))
+    lines = [
+        f"Профиль за {report.duration:.1f} с, сэмплов: {report.samples}",
+        f"Максимальная задержка цикла: {report.max_lag * 1000:.1f} мс",
+        f"Медленных колбэков: {len(report.slow_callbacks)}",
+        f"Память: {report.memory_diff / 1024:+.1f} КиБ",
+        *(f"<pre>{path}</pre>" for path in report.files),
+    ]
+    await api.send_message(
+        chat_id=message.chat.id,
+        text="\n".join(lines),
+        reply_to_message_id=message.message_id,
+    )
@@ -0,0 +1,54 @@
+from html import escape
+from re import compile as compile_regex
+from time import time
+
+from chatushka.bot.internal.scheduled_actions import SEND_MESSAGE_ACTION
+from chatushka.bot.settings import get_settings
+from chatushka.core.matchers import CommandsMatcher
+from chatushka.core.services.scheduler import ActionsScheduler
+from chatushka.core.transports.models import Message
+from chatushka.core.transports.telegram_bot_api import TelegramBotApi
+
+_DELAY_REGEX = compile_regex(r"(\d{1,6})([mhd]?)")
+_UNITS = {"": 60, "m": 60, "h": 3600, "d": 86400}
+_MAX_DELAY = 365 * 86400
+_MAX_TEXT_LENGTH = 1024
+
+REMINDER_MESSAGE = '⏰ <a href="tg://user?id={user}">{name}</a>, напоминаю: {text}'
+
+settings = get_settings()
+reminders_matcher = CommandsMatcher(
+    prefixes=settings.command_prefixes,
+    postfixes=settings.command_postfixes,
+)
+
+
+@reminders_matcher("remind", help_message="Напомнить: /remind 30m текст (m, h или d)")
+async def remind_handler(
+    api: TelegramBotApi,
+    message: Message,
+    args: list[str],
+) -> None:
+    matched = _DELAY_REGEX.fullmatch(args[0]) if args else None
+    delay = int(matched.group(1)) * _UNITS[matched.group(2)] if matched else 0
+    if not delay or delay > _MAX_DELAY or len(args) < 2:
+        await api.send_message(
+            chat_id=message.chat.id,
+            text="Формат: /remind 30m текст, где время в минутах (m), часах (h) или днях (d), но не больше года",
+            reply_to_message_id=message.message_id,
+        )
+        return
+    text = escape(" ".join(args[1:])[:_MAX_TEXT_LENGTH])
+    await ActionsScheduler().schedule(
+        SEND_MESSAGE_ACTION,
+        dict(
+            chat_id=message.chat.id,
+            text=REMINDER_MESSAGE.format(user=message.user.id, name=escape(message.user.readable_name), text=text),
+        ),
+        due_at=time() + delay,
+    )
+    await api.send_message(
+        chat_id=message.chat.id,
+        text="Напомню 👌",
+        reply_to_message_id=message.message_id,
+    )
@@ -0,0 +1,81 @@
+from html import escape
+from re import compile as compile_regex
+from typing import Optional, Union
+
+from chatushka.bot.internal.stats import ChatStatsService, get_stats_day
+from chatushka.bot.settings import get_settings
+from chatushka.core.matchers import CommandsMatcher, EventsMatcher, EventTypes
+from chatushka.core.transports.models import Message
+from chatushka.core.transports.telegram_bot_api import TelegramBotApi
+
+_COMMAND_NAME = compile_regex(r"\w{1,32}")
+
+settings = get_settings()
+stats_matcher = CommandsMatcher(
+    prefixes=settings.command_prefixes,
+    postfixes=settings.command_postfixes,
+)
+activity_matcher = EventsMatcher()
+stats_matcher.add_matcher(activity_matcher)
+
+
+def _as_tuple(
+    value: Union[str, tuple[str, ...]],
+) -> tuple[str, ...]:
+    return (value,) if isinstance(value, str) else value
+
+
+def parse_command(
+    text: str,
+) -> Optional[str]:
+    word = text.split(" ", 1)[0].split("@", 1)[0]
+    for prefix in _as_tuple(settings.command_prefixes):
+        if prefix and word.startswith(prefix):
+            word = word[len(prefix) :]  # noqa
+            break
+    else:
+        for postfix in _as_tuple(settings.command_postfixes):
+            if postfix and word.endswith(postfix):
+                word = word[: -len(postfix)]
+                break
+        else:
+            return None
+    return word.lower() if _COMMAND_NAME.fullmatch(word) else None
+
+
+@activity_matcher(EventTypes.MESSAGE, include_in_help=False)
+async def activity_handler(
+    message: Optional[Message] = None,
+) -> None:
+    # the matcher is called for membership updates too, they carry no message
+    if not message:
+        return
+    ChatStatsService().record(message, parse_command(message.text or ""))
+
+
+@stats_matcher("stats", help_message="Chat activity statistics")
+async def stats_handler(
+    api: TelegramBotApi,
+    message: Message,
+) -> None:
+    activity = ChatStatsService().get(message.chat.id)
+    today = activity.days.get(get_stats_day())
+    lines = [
+        f"Messages: {activity.messages} (today {today.messages if today else 0})",
+        f"Active users: ~{activity.active_users()} today, ~{activity.active_users(activity.days_limit)} in a week",
+        f"Unique users: ~{activity.users.count()}",
+    ]
+    if top_users := activity.user_messages.most_common():
+        lines.append("\nTop users:")
+        lines += [
+            f'<a href="tg://user?id={user_id}">{escape(activity.names.get(user_id, str(user_id)))}</a>: {count}'
+            for user_id, count in top_users  # type: ignore
+        ]
+    if top_commands := activity.commands.most_common():
+        lines.append("\nTop commands:")
+        lines += [f"{escape(command)}: {count}" for command, count in top_commands]  # type: ignore
+    await api.send_message(
+        chat_id=message.chat.id,
+        text="\n".join(lines),
+        reply_to_message_id=message.message_id,
+    )
@@ -1,5 +1,6 @@
 from functools import lru_cache
 from pathlib import Path
+from tempfile import gettempdir
 from typing import Union
 
 from chatushka.core.utils import ServiceSettingsBase
@@ -13,6 +14,8 @@ BOT_DATA_DIR = BOT_ROOT_DIR / "data"
 class _Settings(ServiceSettingsBase):
     command_prefixes: Union[str, tuple[str, ...]] = ("/", "!")
     command_postfixes: Union[str, tuple[str, ...]] = "!"
+    operators: tuple[int, ...] = ()
+    profiles_dir: Path = Path(gettempdir()) / "chatushka-profiles"
 
 
 @lru_cache
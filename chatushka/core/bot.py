@@ -1,19 +1,41 @@
 import signal
-from asyncio import ensure_future, get_event_loop, sleep
+from asyncio import CancelledError, Future, ensure_future, get_event_loop, sleep
+from contextlib import suppress
 from functools import partial
 from logging import getLogger
-from typing import Optional
+from os import getpid
+from secrets import token_urlsafe
+from time import perf_counter, time
+from typing import Any, Awaitable, Callable, Optional, Union
+from urllib.parse import urlparse
 
 from chatushka.__version__ import __URL__, __VERSION__
+from chatushka.core.cluster.brokers import BrokerEndpointBase, UpdatesBrokerBase, WorkerHeartbeat, get_update_partition
+from chatushka.core.cluster.roles import set_workers_count
+from chatushka.core.dispatcher import UpdatesDispatcher
+from chatushka.core.executor import HandlersExecutor
 from chatushka.core.matchers import CommandsMatcher, EventsMatcher, EventTypes
-from chatushka.core.transports.models import Message
+from chatushka.core.matchers.routing import RoutingTable
+from chatushka.core.metrics import REGISTRY
+from chatushka.core.middlewares import MiddlewareBase, MiddlewareChain
+from chatushka.core.models import ServeModes
+from chatushka.core.profiling import RuntimeProfiler
+from chatushka.core.transports.models import Message, Update, UpdateKinds
 from chatushka.core.transports.telegram_bot_api import TelegramBotApi
 from chatushka.core.transports.utils import check_preconditions
+from chatushka.core.transports.webhook import WebhookReceiver
 
 logger = getLogger(__name__)
 
 _HTTP_POOLING_TIMEOUT = 60
 _HTTP_POOLING_DELAY = 2
+_SHUTDOWN_TIMEOUT = 10
+_SERVICE_UPDATES = {UpdateKinds.MY_CHAT_MEMBER.update_field, UpdateKinds.CHAT_MEMBER.update_field}
+
+_UPDATES = REGISTRY.counter("chatushka_updates_total", "Processed updates", ("kind",))
+_UPDATES_DROPPED = REGISTRY.counter("chatushka_updates_dropped_total", "Updates dropped by middlewares")
+_UPDATE_ERRORS = REGISTRY.counter("chatushka_update_errors_total", "Updates failed to be processed")
+_UPDATE_SECONDS = REGISTRY.histogram("chatushka_update_duration_seconds", "Time spent on processing of an update")
 
 
 async def _message_handler(
@@ -36,13 +58,32 @@ class ChatushkaBot(EventsMatcher):
         token: str,
         title: str = None,
         debug: bool = False,
+        api: Optional[TelegramBotApi] = None,
+        max_concurrency: int = 64,
+        max_backlog: int = 10_000,
+        concurrent_handlers: bool = False,
+        handlers_timeout: Optional[float] = None,
+        profiler: Optional[RuntimeProfiler] = None,
     ) -> None:
         super().__init__()
 
         self.title = title or self.__class__.__name__
         self.debug = debug
-        self.api = TelegramBotApi(token)
+        self.api = api or TelegramBotApi(token)
+        self.dispatcher = UpdatesDispatcher(
+            self._process_update,
+            max_concurrency=max_concurrency,
+            max_backlog=max_backlog,
+        )
+        self._serving: Optional[Future] = None  # type: ignore
+        self.routing = RoutingTable(self)
+        self.executor = HandlersExecutor(concurrent=concurrent_handlers, timeout=handlers_timeout)
+        self.middlewares: list[MiddlewareBase] = []
+        self._chain = MiddlewareChain()
+        self.profiler = profiler
+        self.add_handler(EventTypes.STARTUP, self.api.startup, include_in_help=False)
         self.add_handler(EventTypes.STARTUP, check_preconditions, include_in_help=False)
+        self._register_gauges()
 
         bot_commands_matcher = CommandsMatcher(prefixes=("!", "/"))
         bot_commands_matcher.add_handler(
@@ -59,14 +100,75 @@ class ChatushkaBot(EventsMatcher):
             output += f"\n\n*{', '.join(help_message.tokens)}*\n> {help_message.message}"
         return output
 
-    # pylint: disable=too-many-nested-blocks
-    async def _loop(self) -> None:
+    @property
+    def allowed_updates(self) -> list[str]:
+        return sorted(set(self.routing.allowed_updates) | _SERVICE_UPDATES)
+
+    def add_middleware(
+        self,
+        *middlewares: MiddlewareBase,
+    ) -> None:
+        self.middlewares.extend(middlewares)
+        self._chain = MiddlewareChain.from_middlewares(self.middlewares)
+        self.executor.chain = self._chain if self._chain.around_handler else None
+
+    def _register_gauges(self) -> None:
+        gauges = dict(
+            chatushka_dispatcher_pending_updates=(
+                "Updates waiting in dispatcher queues",
+                lambda: self.dispatcher.pending,
+            ),
+            chatushka_dispatcher_active_shards=("Shards with running workers", lambda: self.dispatcher.active_shards),
+            chatushka_dispatcher_max_shard_depth=(
+                "Depth of the longest shard queue",
+                lambda: max(self.dispatcher.queue_depths().values(), default=0),
+            ),
+            chatushka_handlers_in_flight=("Handlers running concurrently", lambda: self.executor.in_flight),
+            chatushka_rate_limiter_waiting=(
+                "Requests waiting for the rate limiter",
+                lambda: self.api.rate_limiter.waiting,
+            ),
+        )
+        for name, (documentation, function) in gauges.items():
+            REGISTRY.gauge(name, documentation).set_function(function)
+
+    async def _process_update(
+        self,
+        update: Update,
+    ) -> None:
+        if update.my_chat_member or update.chat_member:
+            self.api.admins.invalidate(update.chat.id)  # type: ignore
+        kinds = update.kinds
+        _UPDATES.inc(kinds[0].value if kinds else "other")
+        started_at = perf_counter()
+        try:
+            if self._chain.pre_dispatch and not await self._chain.run_pre_dispatch(update):
+                _UPDATES_DROPPED.inc()
+                return
+            matched_handlers = await self.routing.dispatch(self.api, update, executor=self.executor)
+            if matched_handlers:
+                logger.debug(f"Matched {len(matched_handlers)} handlers")
+            if self._chain.post_dispatch:
+                await self._chain.run_post_dispatch(update, matched_handlers)
+        except Exception as err:  # noqa, pylint: disable=broad-except
+            _UPDATE_ERRORS.inc()
+            if self.debug:
+                raise
+            logger.error(err)
+        finally:
+            _UPDATE_SECONDS.observe(perf_counter() - started_at)
+
+    async def _loop(
+        self,
+        put: Callable[[Update], Awaitable[Any]],
+    ) -> None:
         offset: Optional[int] = None
         while True:
             try:
                 updates, latest_update_id = await self.api.get_updates(
                     timeout=_HTTP_POOLING_TIMEOUT,
                     offset=offset,
+                    allowed_updates=self.allowed_updates,
                 )
                 if updates:
                     offset = latest_update_id + 1
@@ -74,35 +176,145 @@ class ChatushkaBot(EventsMatcher):
                 logger.error(err)
                 await sleep(_HTTP_POOLING_DELAY)
                 continue
-            if updates:
-                for update in updates:
-                    try:
-                        for matcher in self.matchers:
-                            matched_handlers = await matcher.match(self.api, update, should_call_matched=True)
-                            if matched_handlers:
-                                logger.debug(f"Matched {len(matched_handlers)} handlers")
-                    except Exception as err:  # noqa, pylint: disable=broad-except
-                        if self.debug:
-                            raise
-                        logger.error(err)
-            await sleep(_HTTP_POOLING_DELAY)
+            for update in updates:
+                await put(update)
+            if not updates:
+                await sleep(_HTTP_POOLING_DELAY)
+
+    async def _webhook(
+        self,
+        receiver: WebhookReceiver,
+        url: str,
+    ) -> None:
+        await receiver.start()
+        await self.api.set_webhook(
+            url,
+            secret_token=receiver.secret_token,
+            allowed_updates=self.allowed_updates,
+        )
+        try:
+            await receiver.serve_forever()
+        finally:
+            await receiver.close()
+            await self.api.delete_webhook()
+
+    @staticmethod
+    async def _publish(
+        broker: UpdatesBrokerBase,
+        update: Update,
+    ) -> None:
+        payload = update.json(by_alias=True, exclude_none=True).encode()
+        await broker.publish(get_update_partition(update, broker.partitions), payload)
+
+    async def _send_heartbeats(
+        self,
+        endpoint: BrokerEndpointBase,
+        received: list[int],
+    ) -> None:
+        # heartbeats come from their own task, so a worker waiting for backlog room is not taken for a hung one
+        while True:
+            heartbeat = WorkerHeartbeat(
+                endpoint.partition,
+                getpid(),
+                time(),
+                received[0],
+                self.dispatcher.pending,
+                REGISTRY.snapshot(),
+            )
+            await endpoint.heartbeat(heartbeat)
+            await sleep(endpoint.heartbeat_interval)
+
+    async def _consume(
+        self,
+        endpoint: BrokerEndpointBase,
+    ) -> None:
+        received = [0]
+        heartbeats = ensure_future(self._send_heartbeats(endpoint, received))
+        try:
+            while True:
+                try:
+                    payloads = await endpoint.consume(timeout=endpoint.heartbeat_interval)
+                except (EOFError, OSError):
+                    logger.info(f"Partition {endpoint.partition} is closed by the leader")
+                    return
+                for payload in payloads:
+                    await self.dispatcher.put(Update.parse_raw(payload))
+                received[0] += len(payloads)
+        finally:
+            heartbeats.cancel()
+            with suppress(CancelledError, OSError):
+                await heartbeats
+
+    def _profile(self) -> None:
+        if self.profiler:
+            self.profiler.start()
+
+    def _stop(self) -> None:
+        if self._serving:
+            self._serving.cancel()
 
     async def _close(self) -> None:
+        if self.profiler:
+            self.profiler.close()
+        await self.dispatcher.close(timeout=_SHUTDOWN_TIMEOUT)
+        await self.executor.close()
+        for matcher in self.matchers:
+            await matcher.close()
         await self.call(self.api, EventTypes.SHUTDOWN)
         for matcher in self.matchers:
             if isinstance(matcher, EventsMatcher):
                 await matcher.call(api=self.api, token=EventTypes.SHUTDOWN)
+        await self.api.shutdown()
 
-    async def serve(self) -> None:
+    async def serve(
+        self,
+        mode: Union[str, ServeModes] = ServeModes.POLLING,
+        webhook_url: Optional[str] = None,
+        webhook_host: str = "127.0.0.1",
+        webhook_port: int = 8080,
+        webhook_secret_token: Optional[str] = None,
+        broker: Optional[UpdatesBrokerBase] = None,
+        endpoint: Optional[BrokerEndpointBase] = None,
+    ) -> None:
+        mode = ServeModes(mode)
+        if mode == ServeModes.WEBHOOK and not webhook_url:
+            raise ValueError("webhook_url is required for webhook mode")
+        if mode == ServeModes.WORKER and not endpoint:
+            raise ValueError("endpoint is required for worker mode")
+        if broker:
+            set_workers_count(broker.partitions)
         await self.call(self.api, EventTypes.STARTUP)
         loop = get_event_loop()
-        for sig in (signal.SIGINT, signal.SIGTERM):
+        # workers are stopped by the leader closing their partitions, so queued updates are not lost
+        for sig in (signal.SIGINT, signal.SIGTERM) if mode != ServeModes.WORKER else ():
             try:
-                loop.add_signal_handler(sig, callback=lambda: ensure_future(self._close()))
+                loop.add_signal_handler(sig, callback=self._stop)
             except NotImplementedError:
                 break
+        if self.profiler and hasattr(signal, "SIGUSR1"):
+            loop.add_signal_handler(signal.SIGUSR1, callback=self._profile)
         for matcher in self.matchers:
-            await matcher.init()
+            await matcher.init(self.api)
             if isinstance(matcher, EventsMatcher):
                 await matcher.call(api=self.api, token=EventTypes.STARTUP)
-        await self._loop()
+        self.routing = RoutingTable(self)
+        logger.debug(f"Routing table:\n{self.routing.dump()}")
+        put = partial(self._publish, broker) if broker else self.dispatcher.put
+        if mode == ServeModes.WORKER:
+            self._serving = ensure_future(self._consume(endpoint))  # type: ignore
+        elif mode == ServeModes.WEBHOOK:
+            receiver = WebhookReceiver(
+                callback=put,
+                secret_token=webhook_secret_token or token_urlsafe(32),
+                host=webhook_host,
+                port=webhook_port,
+                path=urlparse(webhook_url).path,
+            )
+            self._serving = ensure_future(self._webhook(receiver, webhook_url))  # type: ignore
+        else:
+            self._serving = ensure_future(self._loop(put))
+        try:
+            with suppress(CancelledError):
+                await self._serving
+        finally:
+            await self._close()
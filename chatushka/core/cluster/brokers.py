@@ -0,0 +1,302 @@
+from abc import ABC, abstractmethod
+from asyncio import Event, Task
+from asyncio import TimeoutError as AsyncTimeoutError
+from asyncio import ensure_future, gather, get_event_loop, wait_for
+from collections import deque
+from contextlib import suppress
+from itertools import islice
+from logging import getLogger
+from multiprocessing import Pipe
+from multiprocessing.connection import Connection
+from typing import NamedTuple, Optional
+from zlib import crc32
+
+from chatushka.core.dispatcher import get_update_shard
+from chatushka.core.metrics import SNAPSHOT_TYPING
+from chatushka.core.transports.models import Update
+
+logger = getLogger(__name__)
+
+
+class WorkerHeartbeat(NamedTuple):
+    partition: int
+    pid: int
+    sent_at: float
+    received: int
+    pending: int
+    # handlers, routing and Bot API calls are measured in workers, the leader exports their metrics
+    metrics: Optional[SNAPSHOT_TYPING] = None
+
+
+def get_update_partition(
+    update: Update,
+    partitions: int,
+) -> int:
+    # crc32 is stable across processes and restarts unlike hash() of strings
+    return crc32(str(get_update_shard(update)).encode()) % partitions
+
+
+class BrokerEndpointBase(ABC):
+    def __init__(
+        self,
+        partition: int,
+        partitions: int,
+        heartbeat_interval: float,
+    ) -> None:
+        self.partition = partition
+        self.partitions = partitions
+        self.heartbeat_interval = heartbeat_interval
+
+    @abstractmethod
+    async def consume(
+        self,
+        timeout: float,
+    ) -> list[bytes]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def heartbeat(
+        self,
+        heartbeat: WorkerHeartbeat,
+    ) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class UpdatesBrokerBase(ABC):
+    def __init__(
+        self,
+        partitions: int,
+        heartbeat_interval: float = 1,
+    ) -> None:
+        if partitions < 1:
+            raise ValueError("At least one partition is required")
+        self.partitions = partitions
+        self.heartbeat_interval = heartbeat_interval
+
+    @abstractmethod
+    def connect(
+        self,
+        partition: int,
+    ) -> BrokerEndpointBase:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def publish(
+        self,
+        partition: int,
+        payload: bytes,
+    ) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def receive_heartbeats(self) -> list[WorkerHeartbeat]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def pending(
+        self,
+        partition: int,
+    ) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def close(
+        self,
+        timeout: Optional[float] = None,
+    ) -> None:
+        raise NotImplementedError
+
+    def disconnect(
+        self,
+        partition: int,
+    ) -> None:
+        pass
+
+
+class PipeEndpoint(BrokerEndpointBase):
+    def __init__(
+        self,
+        connection: Connection,
+        partition: int,
+        partitions: int,
+        heartbeat_interval: float,
+    ) -> None:
+        super().__init__(partition, partitions, heartbeat_interval)
+        self.connection = connection
+
+    def _receive(
+        self,
+        timeout: float,
+    ) -> list[bytes]:
+        if not self.connection.poll(timeout):
+            return []
+        batch: Optional[list[bytes]] = self.connection.recv()
+        if batch is None:
+            raise EOFError(f"Partition {self.partition} is closed")
+        return batch
+
+    async def consume(
+        self,
+        timeout: float,
+    ) -> list[bytes]:
+        # EOFError means the leader has closed the partition and there is nothing left to consume
+        return await get_event_loop().run_in_executor(None, self._receive, timeout)
+
+    async def heartbeat(
+        self,
+        heartbeat: WorkerHeartbeat,
+    ) -> None:
+        self.connection.send(heartbeat)
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+class MultiprocessingBroker(UpdatesBrokerBase):
+    def __init__(
+        self,
+        partitions: int,
+        heartbeat_interval: float = 1,
+        max_pending: int = 10_000,
+        batch_size: int = 100,
+    ) -> None:
+        super().__init__(partitions, heartbeat_interval)
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self._buffers: list[deque[bytes]] = [deque() for _ in range(partitions)]
+        self._connections: list[Optional[Connection]] = [None] * partitions
+        self._sending: list[Optional[Connection]] = [None] * partitions
+        self._senders: list[Task] = []  # type: ignore
+        self._has_data: list[Event] = []
+        self._has_room: list[Event] = []
+        self._connected: list[Event] = []
+
+    def _start_senders(self) -> None:
+        # events are bound to the running loop, so they are created on first use
+        if self._has_data:
+            return
+        self._has_data = [Event() for _ in range(self.partitions)]
+        self._has_room = [Event() for _ in range(self.partitions)]
+        self._connected = [Event() for _ in range(self.partitions)]
+        self._senders = [ensure_future(self._send(partition)) for partition in range(self.partitions)]
+
+    def connect(
+        self,
+        partition: int,
+    ) -> BrokerEndpointBase:
+        # every worker process gets a fresh pipe, so a killed worker can not leave locks or partial reads behind
+        self._start_senders()
+        # a pipe being written by the sender thread is closed by the sender, closing it here could reuse its fd
+        if (connection := self._connections[partition]) and connection is not self._sending[partition]:
+            connection.close()
+        leader_end, worker_end = Pipe(duplex=True)
+        self._connections[partition] = leader_end
+        self._connected[partition].set()
+        return PipeEndpoint(worker_end, partition, self.partitions, self.heartbeat_interval)
+
+    def pending(
+        self,
+        partition: int,
+    ) -> int:
+        return len(self._buffers[partition])
+
+    async def publish(
+        self,
+        partition: int,
+        payload: bytes,
+    ) -> None:
+        self._start_senders()
+        buffer = self._buffers[partition]
+        while len(buffer) >= self.max_pending:
+            self._has_room[partition].clear()
+            await self._has_room[partition].wait()
+        buffer.append(payload)
+        self._has_data[partition].set()
+
+    async def _send(
+        self,
+        partition: int,
+    ) -> None:
+        buffer = self._buffers[partition]
+        has_data = self._has_data[partition]
+        has_room = self._has_room[partition]
+        connected = self._connected[partition]
+        loop = get_event_loop()
+        while True:
+            if not buffer:
+                has_data.clear()
+                await has_data.wait()
+                continue
+            connection = self._connections[partition]
+            if connection is None or connection.closed:
+                connected.clear()
+                await connected.wait()
+                continue
+            batch = list(islice(buffer, self.batch_size))
+            self._sending[partition] = connection
+            try:
+                await loop.run_in_executor(None, connection.send, batch)
+            except (OSError, ValueError):
+                # the worker is gone, the batch stays in the buffer until the partition is connected again
+                if connection is self._connections[partition]:
+                    connected.clear()
+                    await connected.wait()
+                continue
+            finally:
+                self._sending[partition] = None
+                if connection is not self._connections[partition]:
+                    connection.close()
+            for _ in batch:
+                buffer.popleft()
+            has_room.set()
+
+    async def receive_heartbeats(self) -> list[WorkerHeartbeat]:
+        heartbeats = []
+        for connection in self._connections:
+            if connection is None or connection.closed:
+                continue
+            with suppress(EOFError, OSError):
+                while connection.poll():
+                    heartbeats.append(connection.recv())
+        return heartbeats
+
+    async def close(
+        self,
+        timeout: Optional[float] = None,
+    ) -> None:
+        with suppress(AsyncTimeoutError):
+            await wait_for(self._flush(), timeout=timeout)
+        for sender in self._senders:
+            sender.cancel()
+        await gather(*self._senders, return_exceptions=True)
+        self._senders = []
+        # closing a socket with unread heartbeats resets it and drops updates the worker has not read yet,
+        # so the end of the partition is sent explicitly and the pipe is closed after the worker exits
+        loop = get_event_loop()
+        for connection in self._connections:
+            if connection and not connection.closed:
+                loop.run_in_executor(None, self._finish, connection)
+
+    @staticmethod
+    def _finish(
+        connection: Connection,
+    ) -> None:
+        with suppress(OSError):
+            connection.send(None)
+
+    def disconnect(
+        self,
+        partition: int,
+    ) -> None:
+        if connection := self._connections[partition]:
+            connection.close()
+        self._connections[partition] = None
+
+    async def _flush(self) -> None:
+        for partition, buffer in enumerate(self._buffers):
+            while buffer and self._has_room:
+                self._has_room[partition].clear()
+                await self._has_room[partition].wait()
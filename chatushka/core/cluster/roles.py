@@ -0,0 +1,30 @@
+from typing import Optional
+
+_worker_index: Optional[int] = None
+_workers_count = 0
+
+
+def get_worker_index() -> Optional[int]:
+    return _worker_index
+
+
+def set_worker_index(
+    index: Optional[int],
+) -> None:
+    global _worker_index  # pylint: disable=global-statement
+    _worker_index = index
+
+
+def get_workers_count() -> int:
+    return _workers_count
+
+
+def set_workers_count(
+    count: int,
+) -> None:
+    global _workers_count  # pylint: disable=global-statement
+    _workers_count = count
+
+
+def is_leader() -> bool:
+    return _worker_index is None
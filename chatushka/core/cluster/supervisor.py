@@ -0,0 +1,169 @@
+from asyncio import CancelledError, Task, ensure_future, gather, get_event_loop, sleep
+from contextlib import suppress
+from logging import INFO, getLogger
+from multiprocessing import get_context
+from multiprocessing.process import BaseProcess
+from time import monotonic
+from typing import Callable, Optional
+
+from chatushka.core.bot import ChatushkaBot
+from chatushka.core.cluster.brokers import UpdatesBrokerBase, WorkerHeartbeat
+from chatushka.core.cluster.worker import run_worker
+from chatushka.core.metrics import REGISTRY
+
+logger = getLogger(__name__)
+
+_WORKERS_ALIVE = REGISTRY.gauge("chatushka_cluster_workers_alive", "Worker processes with fresh heartbeats")
+_WORKER_PENDING = REGISTRY.gauge(
+    "chatushka_cluster_worker_pending_updates",
+    "Updates buffered by the leader or queued in the worker dispatcher",
+    ("worker", "queue"),
+)
+_WORKER_RECEIVED = REGISTRY.gauge(
+    "chatushka_cluster_worker_received_updates",
+    "Updates received by the current process of the worker",
+    ("worker",),
+)
+_WORKER_HEARTBEAT_AGE = REGISTRY.gauge(
+    "chatushka_cluster_worker_heartbeat_age_seconds",
+    "Seconds since the last heartbeat of the worker",
+    ("worker",),
+)
+_WORKER_RESTARTS = REGISTRY.counter(
+    "chatushka_cluster_worker_restarts_total",
+    "Worker processes restarted after a crash or a missed heartbeat",
+    ("worker",),
+)
+
+
+class _WorkerState:
+    def __init__(
+        self,
+        process: BaseProcess,
+    ) -> None:
+        self.process = process
+        self.seen_at = monotonic()
+        self.heartbeat: Optional[WorkerHeartbeat] = None
+
+
+class ClusterSupervisor:
+    def __init__(
+        self,
+        factory: Callable[[], ChatushkaBot],
+        broker: UpdatesBrokerBase,
+        heartbeat_timeout: float = 30,
+        shutdown_timeout: float = 10,
+        log_level: int = INFO,
+        start_method: str = "spawn",
+    ) -> None:
+        self.factory = factory
+        self.broker = broker
+        self.context = get_context(start_method)
+        self.heartbeat_timeout = heartbeat_timeout
+        self.shutdown_timeout = shutdown_timeout
+        self.log_level = log_level
+        self.workers: dict[int, _WorkerState] = {}
+        self._task: Optional[Task] = None  # type: ignore
+
+    @property
+    def alive(self) -> int:
+        return sum(1 for state in self.workers.values() if self._is_alive(state, monotonic()))
+
+    def _is_alive(
+        self,
+        state: _WorkerState,
+        now: float,
+    ) -> bool:
+        return state.process.is_alive() and now - state.seen_at <= self.heartbeat_timeout
+
+    def _spawn(
+        self,
+        partition: int,
+    ) -> None:
+        endpoint = self.broker.connect(partition)
+        process = self.context.Process(
+            target=run_worker,
+            args=(self.factory, endpoint, self.log_level),
+            name=f"chatushka-worker-{partition}",
+            daemon=True,
+        )
+        process.start()
+        # the worker owns its end of the pipe now, the leader copy would hide EOF from it
+        endpoint.close()
+        self.workers[partition] = _WorkerState(process)
+        logger.info(f"Worker of partition {partition} is started with pid {process.pid}")
+
+    def _heartbeat_value(
+        self,
+        partition: int,
+        field: str,
+    ) -> float:
+        state = self.workers.get(partition)
+        return getattr(state.heartbeat, field) if state and state.heartbeat else 0
+
+    def _register_gauges(
+        self,
+        partition: int,
+    ) -> None:
+        worker = str(partition)
+        _WORKER_PENDING.set_function(lambda: self.broker.pending(partition), worker, "leader")
+        _WORKER_PENDING.set_function(lambda: self._heartbeat_value(partition, "pending"), worker, "worker")
+        _WORKER_RECEIVED.set_function(lambda: self._heartbeat_value(partition, "received"), worker)
+        _WORKER_HEARTBEAT_AGE.set_function(
+            lambda: monotonic() - state.seen_at if (state := self.workers.get(partition)) else 0,
+            worker,
+        )
+
+    async def start(self) -> None:
+        for partition in range(self.broker.partitions):
+            self._spawn(partition)
+            self._register_gauges(partition)
+        _WORKERS_ALIVE.set_function(lambda: self.alive)
+        self._task = ensure_future(self._watch())
+
+    async def _watch(self) -> None:
+        while True:
+            await sleep(self.broker.heartbeat_interval)
+            now = monotonic()
+            for heartbeat in await self.broker.receive_heartbeats():
+                state = self.workers[heartbeat.partition]
+                if heartbeat.pid == state.process.pid:
+                    state.heartbeat = heartbeat
+                    state.seen_at = now
+                    if heartbeat.metrics is not None:
+                        REGISTRY.set_remote(str(heartbeat.partition), heartbeat.metrics)
+            for partition, state in self.workers.items():
+                if self._is_alive(state, now):
+                    continue
+                if state.process.is_alive():
+                    logger.error(f"Worker of partition {partition} missed heartbeats, killing pid {state.process.pid}")
+                    state.process.kill()
+                else:
+                    logger.error(f"Worker of partition {partition} exited with code {state.process.exitcode}")
+                await get_event_loop().run_in_executor(None, state.process.join)
+                _WORKER_RESTARTS.inc(str(partition))
+                self._spawn(partition)
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            with suppress(CancelledError):
+                await self._task
+            self._task = None
+        # closed partitions let workers process what they have received and exit
+        await self.broker.close(timeout=self.shutdown_timeout)
+        await gather(*(self._stop(partition, state) for partition, state in self.workers.items()))
+        self.workers.clear()
+
+    async def _stop(
+        self,
+        partition: int,
+        state: _WorkerState,
+    ) -> None:
+        loop = get_event_loop()
+        await loop.run_in_executor(None, state.process.join, self.shutdown_timeout)
+        if state.process.is_alive():
+            logger.warning(f"Worker of partition {partition} did not stop in time, killing it")
+            state.process.kill()
+            await loop.run_in_executor(None, state.process.join)
+        self.broker.disconnect(partition)
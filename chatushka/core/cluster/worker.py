@@ -0,0 +1,31 @@
+import signal
+from asyncio import run
+from logging import INFO, basicConfig, getLogger
+from typing import Callable
+
+from chatushka.core.bot import ChatushkaBot
+from chatushka.core.cluster.brokers import BrokerEndpointBase
+from chatushka.core.cluster.roles import set_worker_index, set_workers_count
+from chatushka.core.models import ServeModes
+
+logger = getLogger(__name__)
+
+
+def run_worker(
+    factory: Callable[[], ChatushkaBot],
+    endpoint: BrokerEndpointBase,
+    log_level: int = INFO,
+) -> None:
+    # the leader stops workers by closing their partitions, signals to the process group are left to it
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    basicConfig(level=log_level, format=f"worker-{endpoint.partition} %(levelname)s:%(name)s:%(message)s")
+    set_worker_index(endpoint.partition)
+    set_workers_count(endpoint.partitions)
+    bot = factory()
+    bot.api.rate_limiter.split_global_rate(endpoint.partitions)
+    logger.info(f"Worker of partition {endpoint.partition} is started")
+    try:
+        run(bot.serve(mode=ServeModes.WORKER, endpoint=endpoint))
+    finally:
+        endpoint.close()
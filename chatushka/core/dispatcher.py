@@ -0,0 +1,97 @@
+from asyncio import CancelledError, Semaphore, Task, ensure_future, gather, wait
+from collections import deque
+from logging import getLogger
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from chatushka.core.transports.models import Update
+
+logger = getLogger(__name__)
+
+
+def get_update_shard(
+    update: Update,
+) -> Hashable:
+    chat = update.chat
+    return chat.id if chat else None
+
+
+class UpdatesDispatcher:
+    def __init__(
+        self,
+        handler: Callable[[Update], Awaitable[Any]],
+        max_concurrency: int = 64,
+        max_backlog: int = 10_000,
+    ) -> None:
+        self.handler = handler
+        self.max_concurrency = max_concurrency
+        self.max_backlog = max_backlog
+        self._concurrency: Optional[Semaphore] = None
+        self._backlog: Optional[Semaphore] = None
+        self._queues: dict[Hashable, deque[Update]] = {}
+        self._workers: dict[Hashable, Task] = {}  # type: ignore
+        self._pending = 0
+        self._is_closed = False
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def active_shards(self) -> int:
+        return len(self._workers)
+
+    def queue_depths(self) -> dict[Hashable, int]:
+        return {shard: len(queue) for shard, queue in self._queues.items()}
+
+    async def put(
+        self,
+        update: Update,
+    ) -> None:
+        if self._is_closed:
+            raise RuntimeError("Dispatcher is closed")
+        if self._backlog is None:
+            self._concurrency = Semaphore(self.max_concurrency)
+            self._backlog = Semaphore(self.max_backlog)
+        await self._backlog.acquire()
+        self._pending += 1
+        shard = get_update_shard(update)
+        queue = self._queues.get(shard)
+        if queue is None:
+            queue = self._queues[shard] = deque()
+            self._workers[shard] = ensure_future(self._worker(shard, queue))
+        queue.append(update)
+
+    async def _worker(
+        self,
+        shard: Hashable,
+        queue: deque[Update],
+    ) -> None:
+        try:
+            while queue:
+                update = queue.popleft()
+                try:
+                    async with self._concurrency:  # type: ignore
+                        await self.handler(update)
+                except CancelledError:
+                    raise
+                except Exception:  # noqa, pylint: disable=broad-except
+                    logger.exception(f"Error occurred while dispatching update {update.update_id}")
+                finally:
+                    self._pending -= 1
+                    self._backlog.release()  # type: ignore
+        finally:
+            del self._queues[shard]
+            del self._workers[shard]
+
+    async def close(
+        self,
+        timeout: Optional[float] = None,
+    ) -> None:
+        self._is_closed = True
+        workers = list(self._workers.values())
+        if not workers:
+            return
+        _, not_done = await wait(workers, timeout=timeout)
+        for worker in not_done:
+            worker.cancel()
+        await gather(*not_done, return_exceptions=True)
@@ -0,0 +1,117 @@
+from asyncio import CancelledError, Task
+from asyncio import TimeoutError as AsyncTimeoutError
+from asyncio import ensure_future, gather, wait_for
+from logging import getLogger
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, NamedTuple, Optional
+
+from chatushka.core.metrics import REGISTRY
+
+if TYPE_CHECKING:
+    from chatushka.core.matchers.base import CallPlan
+    from chatushka.core.middlewares import MiddlewareChain
+
+logger = getLogger(__name__)
+
+_HANDLER_SECONDS = REGISTRY.histogram(
+    "chatushka_handler_duration_seconds",
+    "Time spent in a handler",
+    ("handler",),
+)
+_HANDLER_ERRORS = REGISTRY.counter(
+    "chatushka_handler_errors_total",
+    "Handlers failed with an error or timed out",
+    ("handler", "reason"),
+)
+
+
+class Invocation(NamedTuple):
+    plan: "CallPlan"
+    arguments: dict[str, Any]
+
+    @property
+    def name(self) -> str:
+        handler = getattr(self.plan.handler, "func", self.plan.handler)
+        return getattr(handler, "__qualname__", repr(handler))
+
+    async def run(self) -> None:
+        if self.plan.is_coroutine:
+            await self.plan.handler(**self.arguments)  # type: ignore
+            return
+        self.plan.handler(**self.arguments)
+
+
+class HandlersExecutor:
+    def __init__(
+        self,
+        concurrent: bool = False,
+        timeout: Optional[float] = None,
+    ) -> None:
+        self.concurrent = concurrent
+        self.timeout = timeout
+        self.chain: Optional["MiddlewareChain"] = None
+        self._tasks: set[Task] = set()  # type: ignore
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    async def execute(
+        self,
+        invocations: list[Invocation],
+    ) -> None:
+        if not self.concurrent or len(invocations) < 2:
+            for invocation in invocations:
+                await self._run(invocation, isolate=self.concurrent)
+            return
+        ordered = [invocation for invocation in invocations if invocation.plan.ordered]
+        tasks = [ensure_future(self._run(invocation)) for invocation in invocations if not invocation.plan.ordered]
+        if ordered:
+            tasks.append(ensure_future(self._run_ordered(ordered)))
+        self._tasks.update(tasks)
+        try:
+            await gather(*tasks)
+        finally:
+            self._tasks.difference_update(tasks)
+
+    async def _run_ordered(
+        self,
+        invocations: list[Invocation],
+    ) -> None:
+        for invocation in invocations:
+            await self._run(invocation)
+
+    async def _run(
+        self,
+        invocation: Invocation,
+        isolate: bool = True,
+    ) -> None:
+        timeout = invocation.plan.timeout or self.timeout
+        started_at = perf_counter()
+        try:
+            call = invocation.run() if self.chain is None else self.chain.wrap(invocation)
+            if timeout:
+                await wait_for(call, timeout=timeout)
+            else:
+                await call
+        except CancelledError:
+            raise
+        except AsyncTimeoutError:
+            _HANDLER_ERRORS.inc(invocation.name, "timeout")
+            if not isolate:
+                raise
+            logger.error(f"Handler {invocation.name} exceeded the timeout of {timeout} seconds")
+        except Exception:  # noqa, pylint: disable=broad-except
+            _HANDLER_ERRORS.inc(invocation.name, "exception")
+            if not isolate:
+                raise
+            logger.exception(f"Error occurred in handler {invocation.name}")
+        finally:
+            _HANDLER_SECONDS.observe(perf_counter() - started_at, invocation.name)
+
+    async def close(self) -> None:
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await gather(*tasks, return_exceptions=True)
+        self._tasks.clear()
@@ -2,11 +2,12 @@ from abc import ABC
 from asyncio import iscoroutinefunction
 from collections import defaultdict
 from inspect import signature
-from typing import Any, Callable, Hashable, Iterable, NamedTuple, Optional, Union
+from typing import Any, Callable, ClassVar, FrozenSet, Hashable, Iterable, NamedTuple, Optional, Union
 
+from chatushka.core.matchers.routing import MatchersRoutesIndex, Route, RoutesIndex
 from chatushka.core.models import HANDLER_TYPING, MatchedToken
 from chatushka.core.protocols import MatcherProtocol
-from chatushka.core.transports.models import Update
+from chatushka.core.transports.models import Update, UpdateKinds
 from chatushka.core.transports.telegram_bot_api import TelegramBotApi
 
 
@@ -15,11 +16,75 @@ class HelpMessage(NamedTuple):
     message: Optional[str]
 
 
+class CallPlan(NamedTuple):
+    handler: HANDLER_TYPING
+    is_coroutine: bool
+    wants_api: bool
+    wants_token: bool
+    wants_update: bool
+    wants_message: bool
+    wants_args: bool
+    extra_parameters: tuple[str, ...]
+    ordered: bool = False
+    timeout: Optional[float] = None
+
+    @classmethod
+    def from_handler(
+        cls,
+        handler: HANDLER_TYPING,
+        ordered: bool = False,
+        timeout: Optional[float] = None,
+    ) -> "CallPlan":
+        parameters = tuple(signature(handler).parameters)
+        return cls(
+            handler=handler,
+            is_coroutine=iscoroutinefunction(handler),
+            wants_api="api" in parameters,
+            wants_token="token" in parameters,
+            wants_update="update" in parameters,
+            wants_message="message" in parameters,
+            wants_args="args" in parameters,
+            extra_parameters=tuple(
+                param for param in parameters if param not in ("api", "token", "update", "message", "args")
+            ),
+            ordered=ordered,
+            timeout=timeout,
+        )
+
+    def bind(
+        self,
+        api: TelegramBotApi,
+        token: Hashable,
+        update: Optional[Update],
+        args: Optional[tuple[str, ...]],
+        kwargs: dict[str, Any],
+    ) -> dict[str, Any]:
+        arguments = {param: kwargs[param] for param in self.extra_parameters if param in kwargs}
+        if self.wants_api:
+            arguments["api"] = api
+        if self.wants_token:
+            arguments["token"] = token
+        if self.wants_update:
+            arguments["update"] = update
+        if self.wants_args and (args is not None or "args" in kwargs):
+            arguments["args"] = kwargs["args"] if args is None else args
+        if self.wants_message:
+            if update and update.message is not None:
+                arguments["message"] = update.message
+            elif "message" in kwargs:
+                arguments["message"] = kwargs["message"]
+        return arguments
+
+
 class MatcherBase(ABC):
+
+    update_kinds: ClassVar[FrozenSet[UpdateKinds]] = frozenset(UpdateKinds)
+
     def __init__(
         self,
     ) -> None:
         self.handlers: dict[Hashable, list[HANDLER_TYPING]] = defaultdict(list)
+        self.call_plans: dict[Hashable, list[CallPlan]] = defaultdict(list)
         self.matchers: list[MatcherProtocol] = []
         self._help_messages: list[HelpMessage] = []
 
@@ -28,6 +93,8 @@ class MatcherBase(ABC):
         *tokens: Hashable,
         help_message: Optional[str] = None,
         include_in_help: bool = True,
+        ordered: bool = False,
+        timeout: Optional[float] = None,
     ) -> Callable[[Callable[[], None]], None]:
         def decorator(
             func: HANDLER_TYPING,
@@ -37,6 +104,8 @@ class MatcherBase(ABC):
                 handler=func,
                 help_message=help_message,
                 include_in_help=include_in_help,
+                ordered=ordered,
+                timeout=timeout,
             )
 
         return decorator
@@ -54,11 +123,14 @@ class MatcherBase(ABC):
         handler: HANDLER_TYPING,
         help_message: Optional[str] = None,
         include_in_help: bool = True,
+        ordered: bool = False,
+        timeout: Optional[float] = None,
     ) -> None:
         if not help_message:
             help_message = f"help message of {self.__class__.__name__}"
         if not isinstance(tokens, (list, tuple, set)):
             tokens = (tokens,)
+        plan = CallPlan.from_handler(handler, ordered=ordered, timeout=timeout)
         for raw_token in tokens:
             if isinstance(raw_token, str):
                 raw_token = raw_token.strip()
@@ -67,6 +139,7 @@ class MatcherBase(ABC):
                 prepared = (prepared,)
             for token in prepared:
                 self.handlers[token].append(handler)
+                self.call_plans[token].append(plan)
         if include_in_help:
             self._help_messages.append(
                 HelpMessage(tokens, help_message),
@@ -86,16 +159,16 @@ class MatcherBase(ABC):
         should_call_matched: bool = False,
     ) -> list[MatchedToken]:
         matched_handlers = []
-        for token in self.handlers.keys():
-            if matched := await self._check(token, update):
-                matched_handlers.append(matched)
-                if should_call_matched:
-                    await self.call(
-                        api=api,
-                        token=matched.token,
-                        update=update,
-                        kwargs=matched.kwargs | dict(args=matched.args),
-                    )
+        for matched in await self._match_tokens(update):
+            matched_handlers.append(matched)
+            if should_call_matched:
+                await self.call(
+                    api=api,
+                    token=matched.token,
+                    update=update,
+                    kwargs=matched.kwargs,
+                    args=matched.args,
+                )
         for matcher in self.matchers:
             matched_handlers += await matcher.match(api, update, should_call_matched=should_call_matched)
         return matched_handlers
@@ -106,22 +179,25 @@ class MatcherBase(ABC):
         token: Hashable,
         update: Optional[Update] = None,
         kwargs: Optional[dict[str, Any]] = None,
+        args: Optional[tuple[str, ...]] = None,
     ) -> None:
-        if not kwargs:
-            kwargs = {}
-        kwargs = kwargs | dict(api=api, update=update, token=token)
-        handlers = self.handlers.get(token)
-        if not handlers:
+        plans = self.call_plans.get(token)
+        if not plans:
             return
-        for handler in handlers:
-            sig = signature(handler)
-            sig_kwargs = {param: kwargs.get(param) for param in sig.parameters if param in kwargs}
-            if update and update.message is not None and "message" in sig.parameters:
-                sig_kwargs["message"] = update.message
-            if iscoroutinefunction(handler):
-                await handler(**sig_kwargs)  # type: ignore
+        if kwargs is None:
+            kwargs = {}
+        for plan in plans:
+            if plan.is_coroutine:
+                await plan.handler(**plan.bind(api, token, update, args, kwargs))  # type: ignore
                 continue
-            handler(**sig_kwargs)
+            plan.handler(**plan.bind(api, token, update, args, kwargs))
+
+    @classmethod
+    def compile_index(
+        cls,
+        routes: list[Route],
+    ) -> RoutesIndex:
+        return MatchersRoutesIndex(routes, cls.update_kinds)
 
     # pylint: disable=no-self-use
     def _cast_token(
@@ -130,6 +206,16 @@ class MatcherBase(ABC):
     ) -> Union[Any, Iterable[Any]]:
         return (token,)  # noqa
 
+    async def _match_tokens(
+        self,
+        update: Update,
+    ) -> list[MatchedToken]:
+        matched_tokens = []
+        for token in self.handlers.keys():
+            if matched := await self._check(token, update):
+                matched_tokens.append(matched)
+        return matched_tokens
+
     # pylint: disable=unused-argument
     async def _check(
         self,
@@ -138,5 +224,13 @@ class MatcherBase(ABC):
     ) -> Optional[MatchedToken]:
         return None
 
-    async def init(self) -> None:
-        pass
+    async def init(
+        self,
+        api: Optional[TelegramBotApi] = None,
+    ) -> None:
+        for matcher in self.matchers:
+            await matcher.init(api)
+
+    async def close(self) -> None:
+        for matcher in self.matchers:
+            await matcher.close()
@@ -4,7 +4,7 @@ from typing import Hashable, Optional, Union
 
 from chatushka.core.matchers.base import MatcherBase
 from chatushka.core.models import MatchedToken
-from chatushka.core.transports.models import Update
+from chatushka.core.transports.models import Update, UpdateKinds
 
 logger = getLogger(__name__)
 
@@ -15,6 +15,9 @@ class ChatUsersMovementsEventsEnum(Enum):
 
 
 class ChatUsersMovementsMatcher(MatcherBase):
+
+    update_kinds = frozenset((UpdateKinds.NEW_CHAT_MEMBERS,))
+
     def _cast_token(
         self,
         token: Union[str, ChatUsersMovementsEventsEnum],
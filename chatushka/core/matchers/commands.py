@@ -1,11 +1,56 @@
-from typing import Hashable, Iterable, Optional, Union
+from collections import defaultdict
+from itertools import chain
+from typing import FrozenSet, Hashable, Iterable, Optional, Union
 
 from chatushka.core.matchers.base import MatcherBase
+from chatushka.core.matchers.routing import ResolvedRoute, Route, RoutesIndex
 from chatushka.core.models import MatchedToken
-from chatushka.core.transports.models import Update
+from chatushka.core.transports.models import Update, UpdateKinds
+
+
+class CommandsRoutesIndex(RoutesIndex):
+    def __init__(
+        self,
+        routes: list[Route],
+        update_kinds: FrozenSet[UpdateKinds],
+    ) -> None:
+        super().__init__(routes, update_kinds)
+        self._case_sensitive: dict[str, list[Route]] = defaultdict(list)
+        self._case_insensitive: dict[str, list[Route]] = defaultdict(list)
+        for route in routes:
+            index = self._case_sensitive if route.matcher.case_sensitive else self._case_insensitive  # type: ignore
+            index[route.token].append(route)  # type: ignore
+
+    async def resolve(
+        self,
+        update: Update,
+    ) -> list[ResolvedRoute]:
+        if not update.message or not update.message.text:
+            return []
+        user_id = update.message.user.id
+        words = CommandsMatcher.tokenize(update.message.text)
+        resolved: dict[int, ResolvedRoute] = {}
+        for i, word in enumerate(words):
+            for route in chain(self._case_sensitive.get(word, ()), self._case_insensitive.get(word.lower(), ())):
+                if route.position in resolved:
+                    continue
+                whitelist = route.matcher.whitelist  # type: ignore
+                if whitelist and user_id not in whitelist:
+                    continue
+                resolved[route.position] = ResolvedRoute(
+                    route=route,
+                    matched=MatchedToken(
+                        token=route.token,
+                        args=words[i + 1 :],  # noqa
+                    ),
+                )
+        return list(resolved.values())
 
 
 class CommandsMatcher(MatcherBase):
+
+    update_kinds = frozenset((UpdateKinds.MESSAGE_TEXT,))
+
     def __init__(
         self,
         prefixes: Union[str, tuple[str, ...]] = ("/",),
@@ -43,21 +88,43 @@ class CommandsMatcher(MatcherBase):
             tokens.append(value)
         return tokens
 
-    async def _check(
+    @property
+    def case_sensitive(self) -> bool:
+        return self._case_sensitive
+
+    @property
+    def whitelist(self) -> Optional[tuple[int, ...]]:
+        return self._whitelist
+
+    @classmethod
+    def compile_index(
+        cls,
+        routes: list[Route],
+    ) -> RoutesIndex:
+        return CommandsRoutesIndex(routes, cls.update_kinds)
+
+    @staticmethod
+    def tokenize(
+        text: str,
+    ) -> tuple[str, ...]:
+        return tuple(word for word in text.split(" ") if word)
+
+    async def _match_tokens(
         self,
-        token: str,
         update: Update,
-    ) -> Optional[MatchedToken]:
+    ) -> list[MatchedToken]:
         if not update.message or not update.message.text:
-            return
+            return []
         if self._whitelist and update.message.user.id not in self._whitelist:
-            return
-        words = tuple(word for word in update.message.text.split(" ") if word)
+            return []
+        words = self.tokenize(update.message.text)
+        matched: dict[str, MatchedToken] = {}
         for i, word in enumerate(words):
             if not self._case_sensitive:
                 word = word.lower()
-            if token == word:
-                return MatchedToken(
-                    token=token,
-                    args=tuple(words[i + 1 :]),  # noqa
+            if word in self.handlers and word not in matched:
+                matched[word] = MatchedToken(
+                    token=word,
+                    args=words[i + 1 :],  # noqa
                 )
+        return list(matched.values())
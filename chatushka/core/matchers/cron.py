@@ -1,14 +1,241 @@
+from asyncio import CancelledError, Event, Task
+from asyncio import TimeoutError as AsyncTimeoutError
+from asyncio import ensure_future, gather, sleep, wait_for
+from contextlib import suppress
+from datetime import datetime, timezone, tzinfo
+from enum import Enum, unique
+from heapq import heappop, heappush
+from itertools import count
 from logging import getLogger
+from random import random
+from time import time
+from typing import Hashable, Optional
 
-from aiocron import crontab
+from croniter import croniter
 
-from chatushka.core.matchers.base import MatcherBase
+from chatushka.core.cluster.roles import is_leader
+from chatushka.core.executor import HandlersExecutor, Invocation
+from chatushka.core.matchers.base import CallPlan, MatcherBase
+from chatushka.core.transports.telegram_bot_api import TelegramBotApi
 
 logger = getLogger(__name__)
 
+_GOLDEN_RATIO_FRACTION = 0.6180339887498949
+_NEXT_TIMES_CACHE_SIZE = 4096
+
+
+@unique
+class MissedRunsPolicies(str, Enum):
+    SKIP = "skip"
+    RUN_ONCE = "run_once"
+    RUN_ALL = "run_all"
+
+
+class CronJob:
+    __slots__ = ("matcher", "invocation", "expression", "offset", "scheduled_at", "is_cancelled")
+
+    def __init__(
+        self,
+        matcher: "CronMatcher",
+        invocation: Invocation,
+        expression: str,
+        offset: float,
+        scheduled_at: float,
+    ) -> None:
+        self.matcher = matcher
+        self.invocation = invocation
+        self.expression = expression
+        self.offset = offset
+        self.scheduled_at = scheduled_at
+        self.is_cancelled = False
+
+
+class CronScheduler:
+    def __init__(
+        self,
+        executor: Optional[HandlersExecutor] = None,
+    ) -> None:
+        self.executor = executor or HandlersExecutor(concurrent=True)
+        self._heap: list[tuple[float, int, CronJob]] = []
+        self._sequence = count()
+        self._jobs = 0
+        self._wakeup: Optional[Event] = None
+        self._loop_task: Optional[Task] = None  # type: ignore
+        self._running: dict[Task, "CronMatcher"] = {}  # type: ignore
+        self._next_times: dict[tuple[str, tzinfo, float], float] = {}
+
+    @property
+    def jobs(self) -> int:
+        return self._jobs
+
+    def next_after(
+        self,
+        job: CronJob,
+        timestamp: float,
+    ) -> float:
+        # jobs sharing an expression fire at the same time, so croniter runs once per expression and tick
+        key = (job.expression, job.matcher.tz, timestamp)
+        if (next_at := self._next_times.get(key)) is None:
+            if len(self._next_times) >= _NEXT_TIMES_CACHE_SIZE:
+                self._next_times.clear()
+            base = datetime.fromtimestamp(timestamp, tz=job.matcher.tz)
+            next_at = self._next_times[key] = croniter(job.expression, base).get_next(float)
+        return next_at
+
+    def _push(
+        self,
+        job: CronJob,
+    ) -> None:
+        fire_at = job.scheduled_at + job.offset + random() * job.matcher.jitter
+        heappush(self._heap, (fire_at, next(self._sequence), job))
+        if self._wakeup and self._heap[0][2] is job:
+            self._wakeup.set()
+
+    def add(
+        self,
+        job: CronJob,
+    ) -> None:
+        self._jobs += 1
+        self._push(job)
+        if self._loop_task is None or self._loop_task.done():
+            self._wakeup = Event()
+            self._loop_task = ensure_future(self._loop())
+
+    async def remove(
+        self,
+        matcher: "CronMatcher",
+    ) -> None:
+        # heap entries of cancelled jobs are skipped when popped
+        for _, _, job in self._heap:
+            if job.matcher is matcher and not job.is_cancelled:
+                job.is_cancelled = True
+                self._jobs -= 1
+        running = [task for task, owner in self._running.items() if owner is matcher]
+        for task in running:
+            task.cancel()
+        await gather(*running, return_exceptions=True)
+        if not self._jobs and self._loop_task:
+            self._loop_task.cancel()
+            with suppress(CancelledError):
+                await self._loop_task
+            self._loop_task = None
+            self._heap.clear()
+
+    def _fire(
+        self,
+        job: CronJob,
+    ) -> None:
+        task = ensure_future(self.executor.execute([job.invocation]))
+        self._running[task] = job.matcher
+        task.add_done_callback(self._forget)
+
+    def _forget(
+        self,
+        task: Task,  # type: ignore
+    ) -> None:
+        self._running.pop(task, None)
+
+    def _reschedule(
+        self,
+        job: CronJob,
+        fire_at: float,
+        now: float,
+    ) -> None:
+        is_missed = now - fire_at > job.matcher.misfire_grace
+        policy = job.matcher.missed_runs
+        if not is_missed or policy != MissedRunsPolicies.SKIP:
+            self._fire(job)
+        if is_missed and policy != MissedRunsPolicies.RUN_ALL:
+            job.scheduled_at = self.next_after(job, now)
+        else:
+            job.scheduled_at = self.next_after(job, job.scheduled_at)
+        self._push(job)
+
+    async def _loop(self) -> None:
+        while self._heap:
+            fire_at, _, job = self._heap[0]
+            if job.is_cancelled:
+                heappop(self._heap)
+                continue
+            now = time()
+            if fire_at > now:
+                self._wakeup.clear()  # type: ignore
+                with suppress(AsyncTimeoutError):
+                    await wait_for(self._wakeup.wait(), timeout=fire_at - now)  # type: ignore
+                continue
+            heappop(self._heap)
+            self._reschedule(job, fire_at, now)
+            await sleep(0)
+
+
+SHARED_CRON_SCHEDULER = CronScheduler()
+
 
 class CronMatcher(MatcherBase):
-    async def init(self) -> None:
-        for token, handlers in self.handlers.items():
-            for handler in handlers:
-                crontab(token, func=handler)
+
+    update_kinds = frozenset()
+
+    def __init__(
+        self,
+        tz: tzinfo = timezone.utc,
+        jitter: float = 0,
+        spread: float = 0,
+        missed_runs: MissedRunsPolicies = MissedRunsPolicies.SKIP,
+        misfire_grace: float = 1,
+        scheduler: Optional[CronScheduler] = None,
+    ) -> None:
+        super().__init__()
+        self.tz = tz
+        self.jitter = jitter
+        self.spread = spread
+        self.missed_runs = MissedRunsPolicies(missed_runs)
+        self.misfire_grace = misfire_grace
+        self.scheduler = scheduler or SHARED_CRON_SCHEDULER
+
+    def _cast_token(
+        self,
+        token: Hashable,
+    ) -> tuple[str]:
+        if not isinstance(token, str) or not croniter.is_valid(token):
+            raise ValueError(f"Invalid cron expression {token!r}")
+        return (token,)
+
+    def _offset(
+        self,
+        position: int,
+    ) -> float:
+        # low-discrepancy sequence spreads any number of jobs evenly and keeps their offsets stable
+        return self.spread * ((position * _GOLDEN_RATIO_FRACTION) % 1)
+
+    async def init(
+        self,
+        api: Optional[TelegramBotApi] = None,
+    ) -> None:
+        if not is_leader():
+            # cron jobs would fire once per worker process, so they run in the leader only
+            await super().init(api)
+            return
+        now = time()
+        position = 0
+        for token, plans in self.call_plans.items():
+            for plan in plans:
+                self._add_job(api, token, plan, position, now)  # type: ignore
+                position += 1
+        await super().init(api)
+
+    def _add_job(
+        self,
+        api: TelegramBotApi,
+        token: str,
+        plan: CallPlan,
+        position: int,
+        now: float,
+    ) -> None:
+        invocation = Invocation(plan, plan.bind(api, token, None, None, {}))
+        job = CronJob(self, invocation, token, self._offset(position), 0)
+        job.scheduled_at = self.scheduler.next_after(job, now)
+        self.scheduler.add(job)
+
+    async def close(self) -> None:
+        await self.scheduler.remove(self)
+        await super().close()
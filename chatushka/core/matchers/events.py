@@ -1,14 +1,27 @@
 from logging import getLogger
-from typing import Hashable, Iterable, Optional, Union
+from typing import Iterable, Union
 
 from chatushka.core.matchers.base import MatcherBase
+from chatushka.core.matchers.routing import MatchersRoutesIndex, Route, RoutesIndex
 from chatushka.core.models import EventTypes, MatchedToken
-from chatushka.core.transports.models import Update
+from chatushka.core.transports.models import Update, UpdateKinds
 
 logger = getLogger(__name__)
 
 
 class EventsMatcher(MatcherBase):
+    update_kinds = frozenset((UpdateKinds.MESSAGE, UpdateKinds.MY_CHAT_MEMBER, UpdateKinds.CHAT_MEMBER))
+
+    @classmethod
+    def compile_index(
+        cls,
+        routes: list[Route],
+    ) -> RoutesIndex:
+        return MatchersRoutesIndex(
+            [route for route in routes if route.token == EventTypes.MESSAGE],
+            cls.update_kinds,
+        )
+
     def _cast_token(
         self,
         token: str,
@@ -17,9 +30,10 @@ class EventsMatcher(MatcherBase):
             return EventTypes[token.upper()]
         return token
 
-    async def _check(
+    async def _match_tokens(
         self,
-        token: Hashable,
         update: Update,
-    ) -> Optional[MatchedToken]:
-        return MatchedToken(token=EventTypes.MESSAGE)
+    ) -> list[MatchedToken]:
+        if EventTypes.MESSAGE not in self.handlers:
+            return []
+        return [MatchedToken(token=EventTypes.MESSAGE)]
@@ -1,28 +1,159 @@
+from collections import defaultdict
 from logging import getLogger
-from re import findall
-from typing import Optional
+from re import Pattern
+from re import compile as compile_regex
+from re import error as RegexError
+from typing import Any, FrozenSet, Hashable, Iterable, Optional, Union
 
 from chatushka.core.matchers.base import MatcherBase
-from chatushka.core.models import MatchedToken, RegexMatchKwargs
-from chatushka.core.transports.models import Update
+from chatushka.core.matchers.routing import ResolvedRoute, Route, RoutesIndex
+from chatushka.core.models import HANDLER_TYPING, MatchedToken, RegexMatchKwargs
+from chatushka.core.transports.models import Update, UpdateKinds
 
 logger = getLogger(__name__)
 
+_DEFAULT_FLAGS = compile_regex("").flags
+_BACKREFERENCES = compile_regex(r"\\[1-9]|\(\?P=")
 
-class RegexMatcher(MatcherBase):
 
-    suffix = "regex"
+def compile_scanner(
+    patterns: Iterable[Pattern[str]],
+) -> Optional[Pattern[str]]:
+    sources = []
+    for pattern in patterns:
+        if pattern.flags != _DEFAULT_FLAGS or _BACKREFERENCES.search(pattern.pattern):
+            return None
+        sources.append(f"(?:{pattern.pattern})")
+    if not sources:
+        return None
+    try:
+        return compile_regex("|".join(sources))
+    except RegexError as err:
+        logger.debug(f"Unable to combine patterns: {err}")
+        return None
+
+
+def scan_patterns(
+    text: str,
+    patterns: dict[str, Pattern[str]],
+    scanner: Optional[Pattern[str]] = None,
+) -> list[tuple[str, tuple[Any, ...]]]:
+    start = 0
+    if scanner:
+        # no pattern can match before the leftmost match of the alternation
+        if not (first := scanner.search(text)):
+            return []
+        start = first.start()
+    founded = []
+    for token, pattern in patterns.items():
+        if matched := pattern.findall(text, start):
+            founded.append((token, tuple(matched)))
+    return founded
 
-    async def _check(
+
+class PatternsScanner:
+    def __init__(
+        self,
+        patterns: Optional[dict[str, Pattern[str]]] = None,
+    ) -> None:
+        self.patterns: dict[str, Pattern[str]] = dict(patterns or {})
+        self._scanner: Optional[Pattern[str]] = None
+        self._is_outdated = True
+
+    def add(
+        self,
+        token: str,
+    ) -> None:
+        if token not in self.patterns:
+            self.patterns[token] = compile_regex(token)
+            self._is_outdated = True
+
+    def match(
         self,
-        token: str,  # type: ignore
         update: Update,
-    ) -> Optional[MatchedToken]:
+    ) -> list[MatchedToken]:
         if not update.message or not update.message.text:
-            return
-        if founded := findall(token, update.message.text):
-            kwargs = RegexMatchKwargs(matched=tuple(founded))
-            return MatchedToken(
+            return []
+        if self._is_outdated:
+            self._scanner = compile_scanner(self.patterns.values())
+            self._is_outdated = False
+        return [
+            MatchedToken(
                 token=token,
-                kwargs=kwargs,
+                kwargs=RegexMatchKwargs(matched=founded),
             )
+            for token, founded in scan_patterns(update.message.text, self.patterns, self._scanner)
+        ]
+
+
+class RegexRoutesIndex(RoutesIndex):
+    def __init__(
+        self,
+        routes: list[Route],
+        update_kinds: FrozenSet[UpdateKinds],
+    ) -> None:
+        super().__init__(routes, update_kinds)
+        patterns: dict[str, Pattern[str]] = {}
+        self._routes: dict[str, list[Route]] = defaultdict(list)
+        for route in routes:
+            patterns[route.token] = route.matcher.patterns[route.token]  # type: ignore
+            self._routes[route.token].append(route)  # type: ignore
+        self._scanner = PatternsScanner(patterns)
+
+    async def resolve(
+        self,
+        update: Update,
+    ) -> list[ResolvedRoute]:
+        resolved = []
+        for matched in self._scanner.match(update):
+            resolved += [ResolvedRoute(route, matched) for route in self._routes[matched.token]]  # type: ignore
+        return resolved
+
+
+class RegexMatcher(MatcherBase):
+
+    suffix = "regex"
+    update_kinds = frozenset((UpdateKinds.MESSAGE_TEXT,))
+
+    def __init__(
+        self,
+    ) -> None:
+        super().__init__()
+        self._scanner = PatternsScanner()
+
+    @property
+    def patterns(self) -> dict[str, Pattern[str]]:
+        return self._scanner.patterns
+
+    @classmethod
+    def compile_index(
+        cls,
+        routes: list[Route],
+    ) -> RoutesIndex:
+        return RegexRoutesIndex(routes, cls.update_kinds)
+
+    def add_handler(
+        self,
+        tokens: Union[Hashable, Iterable[Hashable]],
+        handler: HANDLER_TYPING,
+        help_message: Optional[str] = None,
+        include_in_help: bool = True,
+        ordered: bool = False,
+        timeout: Optional[float] = None,
+    ) -> None:
+        super().add_handler(
+            tokens,
+            handler,
+            help_message=help_message,
+            include_in_help=include_in_help,
+            ordered=ordered,
+            timeout=timeout,
+        )
+        for token in self.handlers:
+            self._scanner.add(token)  # type: ignore
+
+    async def _match_tokens(
+        self,
+        update: Update,
+    ) -> list[MatchedToken]:
+        return self._scanner.match(update)
@@ -0,0 +1,181 @@
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, FrozenSet, Hashable, Iterator, NamedTuple, Optional
+
+from chatushka.core.executor import HandlersExecutor, Invocation
+from chatushka.core.metrics import REGISTRY
+from chatushka.core.models import MatchedToken
+from chatushka.core.transports.models import Update, UpdateKinds
+from chatushka.core.transports.telegram_bot_api import TelegramBotApi
+
+if TYPE_CHECKING:
+    from chatushka.core.matchers.base import MatcherBase
+
+_SEQUENTIAL_EXECUTOR = HandlersExecutor()
+_MATCH_SECONDS = REGISTRY.histogram(
+    "chatushka_match_duration_seconds",
+    "Time spent on resolving handlers of an update",
+    buckets=(0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.1),
+)
+
+
+class Route(NamedTuple):
+    position: int
+    matcher: "MatcherBase"
+    token: Hashable
+
+
+class ResolvedRoute(NamedTuple):
+    route: Route
+    matched: MatchedToken
+
+
+class RoutesIndex:
+    def __init__(
+        self,
+        routes: list[Route],
+        update_kinds: FrozenSet[UpdateKinds],
+    ) -> None:
+        self.routes = routes
+        self.update_kinds = update_kinds if routes else frozenset()
+
+    async def resolve(
+        self,
+        update: Update,
+    ) -> list[ResolvedRoute]:
+        raise NotImplementedError
+
+
+class MatchersRoutesIndex(RoutesIndex):
+    def __init__(
+        self,
+        routes: list[Route],
+        update_kinds: FrozenSet[UpdateKinds],
+    ) -> None:
+        super().__init__(routes, update_kinds)
+        self._routes: dict[int, dict[Hashable, Route]] = {}
+        self._matchers: list["MatcherBase"] = []
+        for route in routes:
+            if id(route.matcher) not in self._routes:
+                self._routes[id(route.matcher)] = {}
+                self._matchers.append(route.matcher)
+            self._routes[id(route.matcher)][route.token] = route
+
+    async def resolve(
+        self,
+        update: Update,
+    ) -> list[ResolvedRoute]:
+        resolved = []
+        for matcher in self._matchers:
+            routes = self._routes[id(matcher)]
+            for matched in await matcher._match_tokens(update):  # pylint: disable=protected-access
+                if route := routes.get(matched.token):
+                    resolved.append(ResolvedRoute(route, matched))
+        return resolved
+
+
+def iter_routes(
+    root: "MatcherBase",
+) -> Iterator[tuple["MatcherBase", Hashable]]:
+    for token in root.handlers:
+        yield root, token
+    for matcher in root.matchers:
+        yield from iter_routes(matcher)  # type: ignore
+
+
+class RoutingTable:
+    def __init__(
+        self,
+        root: "MatcherBase",
+    ) -> None:
+        self.routes = [Route(position, matcher, token) for position, (matcher, token) in enumerate(iter_routes(root))]
+        groups: dict[type, list[Route]] = {}
+        for route in self.routes:
+            groups.setdefault(type(route.matcher), []).append(route)
+        self.indexes: dict[type, RoutesIndex] = {
+            matcher_type: matcher_type.compile_index(routes) for matcher_type, routes in groups.items()
+        }
+        self._by_kind: dict[UpdateKinds, list[RoutesIndex]] = {kind: [] for kind in UpdateKinds}
+        for index in self.indexes.values():
+            for kind in index.update_kinds:
+                self._by_kind[kind].append(index)
+        self._by_kinds: dict[tuple[UpdateKinds, ...], list[RoutesIndex]] = {}
+
+    @property
+    def update_kinds(self) -> FrozenSet[UpdateKinds]:
+        return frozenset(kind for kind, indexes in self._by_kind.items() if indexes)
+
+    @property
+    def allowed_updates(self) -> list[str]:
+        return sorted({kind.update_field for kind in self.update_kinds})
+
+    async def resolve(
+        self,
+        update: Update,
+    ) -> list[ResolvedRoute]:
+        kinds = update.kinds
+        if not kinds:
+            return []
+        if (indexes := self._by_kinds.get(kinds)) is None:
+            indexes = self._by_kinds[kinds] = list(
+                dict.fromkeys(index for kind in kinds for index in self._by_kind[kind])
+            )
+        resolved = []
+        for index in indexes:
+            resolved += await index.resolve(update)
+        resolved.sort(key=lambda item: item.route.position)
+        return resolved
+
+    @staticmethod
+    def invocations(
+        api: TelegramBotApi,
+        update: Update,
+        resolved: list[ResolvedRoute],
+    ) -> list[Invocation]:
+        invocations = []
+        for route, matched in resolved:
+            for plan in route.matcher.call_plans.get(matched.token, ()):
+                arguments = plan.bind(api, matched.token, update, matched.args, matched.kwargs)
+                invocations.append(Invocation(plan, arguments))
+        return invocations
+
+    async def dispatch(
+        self,
+        api: TelegramBotApi,
+        update: Update,
+        executor: Optional[HandlersExecutor] = None,
+    ) -> list[MatchedToken]:
+        started_at = perf_counter()
+        resolved = await self.resolve(update)
+        _MATCH_SECONDS.observe(perf_counter() - started_at)
+        if resolved:
+            await (executor or _SEQUENTIAL_EXECUTOR).execute(self.invocations(api, update, resolved))
+        return [matched for _, matched in resolved]
+
+    @staticmethod
+    def _describe(
+        route: Route,
+        kwargs: Optional[dict[str, Any]] = None,
+    ) -> list[str]:
+        lines = []
+        for plan in route.matcher.call_plans.get(route.token, []):
+            handler = getattr(plan.handler, "func", plan.handler)
+            line = f"#{route.position} {type(route.matcher).__name__} {route.token!r} -> {handler.__qualname__}"
+            if kwargs:
+                line += f" {kwargs}"
+            lines.append(line)
+        return lines
+
+    def dump(self) -> str:
+        lines = []
+        for route in self.routes:
+            lines += self._describe(route)
+        return "\n".join(lines)
+
+    async def explain(
+        self,
+        update: Update,
+    ) -> str:
+        lines = []
+        for route, matched in await self.resolve(update):
+            lines += self._describe(route, matched.kwargs | dict(args=matched.args))
+        return "\n".join(lines)
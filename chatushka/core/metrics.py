@@ -0,0 +1,277 @@
+from bisect import bisect_left
+from typing import Callable, Iterator, NamedTuple, Optional, Union
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LABELS_TYPING = tuple[str, ...]
+
+
+def _escape(
+    value: str,
+) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _add_label(
+    sample: str,
+    name: str,
+    value: str,
+) -> str:
+    metric, _, rest = sample.partition(" ")
+    label = f'{name}="{_escape(value)}"'
+    if metric.endswith("}"):
+        metric_name, _, labels = metric.partition("{")
+        return f"{metric_name}{{{label},{labels} {rest}"
+    return f"{metric}{{{label}}} {rest}"
+
+
+def _format_value(
+    value: float,
+) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class MetricSnapshot(NamedTuple):
+    kind: str
+    documentation: str
+    samples: tuple[str, ...]
+
+
+class MetricBase:
+    kind = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: LABELS_TYPING = (),
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+
+    def _format_labels(
+        self,
+        values: LABELS_TYPING,
+        extra: Optional[tuple[str, str]] = None,
+    ) -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.labels, values)]
+        if extra:
+            pairs.append(f'{extra[0]}="{extra[1]}"')
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def snapshot(self) -> MetricSnapshot:
+        return MetricSnapshot(self.kind, self.documentation, tuple(self.samples()))
+
+    def render(self) -> str:
+        return _render_family(self.name, self.snapshot(), {})
+
+
+class Counter(MetricBase):
+    kind = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: LABELS_TYPING = (),
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: dict[LABELS_TYPING, float] = {}
+
+    def inc(
+        self,
+        *labels: str,
+        value: float = 1,
+    ) -> None:
+        self._values[labels] = self._values.get(labels, 0) + value
+
+    def get(
+        self,
+        *labels: str,
+    ) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{self._format_labels(labels)} {_format_value(value)}"
+
+
+class Gauge(MetricBase):
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: LABELS_TYPING = (),
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: dict[LABELS_TYPING, float] = {}
+        self._functions: dict[LABELS_TYPING, Callable[[], float]] = {}
+
+    def set(
+        self,
+        value: float,
+        *labels: str,
+    ) -> None:
+        self._values[labels] = value
+
+    def set_function(
+        self,
+        function: Callable[[], float],
+        *labels: str,
+    ) -> None:
+        self._functions[labels] = function
+
+    def samples(self) -> Iterator[str]:
+        values = self._values | {labels: function() for labels, function in self._functions.items()}
+        for labels, value in values.items():
+            yield f"{self.name}{self._format_labels(labels)} {_format_value(value)}"
+
+
+class _HistogramSeries:
+    __slots__ = ("counts", "total")
+
+    def __init__(
+        self,
+        size: int,
+    ) -> None:
+        self.counts = [0] * size
+        self.total = 0.0
+
+
+class Histogram(MetricBase):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: LABELS_TYPING = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[LABELS_TYPING, _HistogramSeries] = {}
+
+    def observe(
+        self,
+        value: float,
+        *labels: str,
+    ) -> None:
+        if (series := self._series.get(labels)) is None:
+            series = self._series[labels] = _HistogramSeries(len(self.buckets) + 1)
+        series.counts[bisect_left(self.buckets, value)] += 1
+        series.total += value
+
+    def count(
+        self,
+        *labels: str,
+    ) -> int:
+        series = self._series.get(labels)
+        return sum(series.counts) if series else 0
+
+    def samples(self) -> Iterator[str]:
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series.counts):
+                cumulative += count
+                bucket_labels = self._format_labels(labels, ("le", _format_value(bound)))
+                yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+            yield f"{self.name}_sum{self._format_labels(labels)} {_format_value(series.total)}"
+            yield f"{self.name}_count{self._format_labels(labels)} {cumulative}"
+
+
+METRIC_TYPING = Union[Counter, Gauge, Histogram]
+SNAPSHOT_TYPING = dict[str, MetricSnapshot]
+
+
+def _render_family(
+    name: str,
+    snapshot: MetricSnapshot,
+    remote: dict[str, MetricSnapshot],
+) -> str:
+    lines = [f"# HELP {name} {_escape(snapshot.documentation)}", f"# TYPE {name} {snapshot.kind}"]
+    lines += snapshot.samples
+    for worker, remote_snapshot in remote.items():
+        lines += (_add_label(sample, "worker", worker) for sample in remote_snapshot.samples)
+    return "\n".join(lines)
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, METRIC_TYPING] = {}
+        # the latest metrics of worker processes, exported with a worker label
+        self._remote: dict[str, SNAPSHOT_TYPING] = {}
+
+    def _register(
+        self,
+        metric: METRIC_TYPING,
+    ) -> METRIC_TYPING:
+        if (registered := self._metrics.get(metric.name)) is not None:
+            if type(registered) is not type(metric) or registered.labels != metric.labels:
+                raise ValueError(f"Metric {metric.name} is already registered with another type or labels")
+            return registered
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self,
+        name: str,
+        documentation: str,
+        labels: LABELS_TYPING = (),
+    ) -> Counter:
+        return self._register(Counter(name, documentation, labels))  # type: ignore
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labels: LABELS_TYPING = (),
+    ) -> Gauge:
+        return self._register(Gauge(name, documentation, labels))  # type: ignore
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: LABELS_TYPING = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))  # type: ignore
+
+    def snapshot(self) -> SNAPSHOT_TYPING:
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def set_remote(
+        self,
+        worker: str,
+        snapshot: SNAPSHOT_TYPING,
+    ) -> None:
+        self._remote[worker] = snapshot
+
+    def render(self) -> str:
+        families = {name: metric.snapshot() for name, metric in self._metrics.items()}
+        for snapshot in self._remote.values():
+            for name, metric in snapshot.items():
+                families.setdefault(name, MetricSnapshot(metric.kind, metric.documentation, ()))
+        rendered = []
+        for name, family in families.items():
+            remote = {
+                worker: snapshot[name]
+                for worker, snapshot in self._remote.items()
+                if name in snapshot and snapshot[name].samples
+            }
+            rendered.append(_render_family(name, family, remote))
+        return "\n".join(rendered) + "\n"
+
+
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,77 @@
+from functools import partial
+from typing import Awaitable, Callable, NamedTuple
+
+from chatushka.core.executor import Invocation
+from chatushka.core.models import MatchedToken
+from chatushka.core.transports.models import Update
+
+CALL_NEXT_TYPING = Callable[[], Awaitable[None]]
+
+
+class MiddlewareBase:
+    async def pre_dispatch(
+        self,
+        update: Update,
+    ) -> bool:
+        return True
+
+    async def post_dispatch(
+        self,
+        update: Update,
+        matched: list[MatchedToken],
+    ) -> None:
+        return None
+
+    async def around_handler(
+        self,
+        invocation: Invocation,
+        call_next: CALL_NEXT_TYPING,
+    ) -> None:
+        await call_next()
+
+
+def _overrides(
+    middleware: MiddlewareBase,
+    hook: str,
+) -> bool:
+    return getattr(type(middleware), hook) is not getattr(MiddlewareBase, hook)
+
+
+class MiddlewareChain(NamedTuple):
+    pre_dispatch: tuple[MiddlewareBase, ...] = ()
+    post_dispatch: tuple[MiddlewareBase, ...] = ()
+    around_handler: tuple[MiddlewareBase, ...] = ()
+
+    @classmethod
+    def from_middlewares(
+        cls,
+        middlewares: list[MiddlewareBase],
+    ) -> "MiddlewareChain":
+        # hooks left as is in MiddlewareBase are skipped, so unused stages cost nothing
+        return cls(*(tuple(item for item in middlewares if _overrides(item, hook)) for hook in cls._fields))
+
+    async def run_pre_dispatch(
+        self,
+        update: Update,
+    ) -> bool:
+        for middleware in self.pre_dispatch:
+            if not await middleware.pre_dispatch(update):
+                return False
+        return True
+
+    async def run_post_dispatch(
+        self,
+        update: Update,
+        matched: list[MatchedToken],
+    ) -> None:
+        for middleware in reversed(self.post_dispatch):
+            await middleware.post_dispatch(update, matched)
+
+    def wrap(
+        self,
+        invocation: Invocation,
+    ) -> Awaitable[None]:
+        call: CALL_NEXT_TYPING = invocation.run
+        for middleware in reversed(self.around_handler):
+            call = partial(middleware.around_handler, invocation, call)
+        return call()
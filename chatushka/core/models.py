@@ -23,3 +23,10 @@ class EventTypes(Enum):
     STARTUP = auto()
     SHUTDOWN = auto()
     MESSAGE = auto()
+
+
+@unique
+class ServeModes(str, Enum):
+    POLLING = "polling"
+    WEBHOOK = "webhook"
+    WORKER = "worker"
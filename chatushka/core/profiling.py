@@ -0,0 +1,246 @@
+import sys
+import tracemalloc
+from asyncio import Event, Task
+from asyncio import TimeoutError as AsyncTimeoutError
+from asyncio import ensure_future, get_running_loop, sleep, wait_for
+from collections import Counter
+from datetime import datetime, timezone
+from logging import getLogger
+from pathlib import Path
+from threading import Event as ThreadEvent
+from threading import Thread, get_ident
+from time import perf_counter
+from types import CodeType, FrameType
+from typing import Iterable, NamedTuple, Optional, Union
+
+logger = getLogger(__name__)
+
+_REPORT_TOP = 30
+
+
+class ProfileReport(NamedTuple):
+    duration: float
+    samples: int
+    slow_callbacks: list[float]
+    max_lag: float
+    memory_diff: int
+    files: list[Path]
+
+
+def _short_filename(
+    filename: str,
+) -> str:
+    prefixes = sorted((path for path in sys.path if path and filename.startswith(path)), key=len)
+    return filename[len(prefixes[-1]) :].lstrip("/\\") if prefixes else filename  # noqa
+
+
+def _format_frame(
+    frame: tracemalloc.Frame,
+) -> str:
+    return f"{_short_filename(frame.filename)}:{frame.lineno}"
+
+
+class _StackFolder:
+    def __init__(self) -> None:
+        self._names: dict[CodeType, str] = {}
+
+    def _name(
+        self,
+        code: CodeType,
+    ) -> str:
+        if (name := self._names.get(code)) is None:
+            name = self._names[code] = f"{code.co_name} ({_short_filename(code.co_filename)}:{code.co_firstlineno})"
+        return name
+
+    def fold(
+        self,
+        frame: Optional[FrameType],
+    ) -> str:
+        names = []
+        while frame is not None:
+            names.append(self._name(frame.f_code))
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+
+def _write_collapsed(
+    path: Path,
+    stacks: Iterable[tuple[str, int]],
+) -> Path:
+    # "frame;frame;frame weight" lines are understood by flamegraph.pl, speedscope and inferno
+    path.write_text("".join(f"{stack} {weight}\n" for stack, weight in stacks if weight > 0))
+    return path
+
+
+class RuntimeProfiler:
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        duration: float = 10,
+        interval: float = 0.005,
+        slow_callback_threshold: float = 0.1,
+        memory_frames: int = 16,
+    ) -> None:
+        self.directory = Path(directory)
+        self.duration = duration
+        self.interval = interval
+        self.slow_callback_threshold = slow_callback_threshold
+        self.memory_frames = memory_frames
+        self._is_running = False
+        self._stopping: Optional[Event] = None
+        self._task: Optional[Task] = None  # type: ignore
+        self._folder = _StackFolder()
+
+    @property
+    def is_running(self) -> bool:
+        return self._is_running
+
+    def start(
+        self,
+        duration: Optional[float] = None,
+    ) -> None:
+        if self._is_running:
+            logger.warning("Profiling is already running")
+            return
+        self._task = ensure_future(self.capture(duration))
+
+    def close(self) -> None:
+        if self._stopping:
+            self._stopping.set()
+
+    def _sample(
+        self,
+        thread_id: int,
+        stop: ThreadEvent,
+        heartbeat: list[float],
+        stacks: Counter,  # type: ignore
+        blocked_stacks: Counter,  # type: ignore
+    ) -> None:
+        while not stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)  # pylint: disable=protected-access
+            if frame is None:
+                continue
+            stack = self._folder.fold(frame)
+            stacks[stack] += 1
+            if perf_counter() - heartbeat[0] > self.slow_callback_threshold:
+                blocked_stacks[stack] += 1
+            del frame
+
+    async def _watch_loop(
+        self,
+        heartbeat: list[float],
+        lags: list[float],
+    ) -> None:
+        while True:
+            expected_at = perf_counter() + self.interval
+            await sleep(self.interval)
+            now = heartbeat[0] = perf_counter()
+            lags.append(now - expected_at)
+
+    async def capture(
+        self,
+        duration: Optional[float] = None,
+    ) -> ProfileReport:
+        if self._is_running:
+            raise RuntimeError("Profiling is already running")
+        self._is_running = True
+        self._stopping = Event()
+        try:
+            return await self._capture(duration or self.duration)
+        finally:
+            self._is_running = False
+            self._stopping = None
+
+    async def _capture(
+        self,
+        duration: float,
+    ) -> ProfileReport:
+        # snapshots of a large heap, comparing them and writing files take long enough to stall the loop
+        loop = get_running_loop()
+        is_tracing = tracemalloc.is_tracing()
+        if not is_tracing:
+            tracemalloc.start(self.memory_frames)
+        try:
+            memory_before = await loop.run_in_executor(None, tracemalloc.take_snapshot)
+        except BaseException:
+            if not is_tracing:
+                tracemalloc.stop()
+            raise
+        heartbeat = [perf_counter()]
+        lags: list[float] = []
+        stacks: Counter[str] = Counter()
+        blocked_stacks: Counter[str] = Counter()
+        stop = ThreadEvent()
+        sampler = Thread(
+            target=self._sample,
+            args=(get_ident(), stop, heartbeat, stacks, blocked_stacks),
+            name="chatushka-profiler",
+            daemon=True,
+        )
+        watcher = ensure_future(self._watch_loop(heartbeat, lags))
+        started_at = perf_counter()
+        sampler.start()
+        try:
+            await wait_for(self._stopping.wait(), timeout=duration)  # type: ignore
+        except AsyncTimeoutError:
+            pass
+        finally:
+            stop.set()
+            watcher.cancel()
+            sampler.join()
+            elapsed = perf_counter() - started_at
+            try:
+                memory_after = await loop.run_in_executor(None, tracemalloc.take_snapshot)
+            finally:
+                if not is_tracing:
+                    tracemalloc.stop()
+        memory_stats = await loop.run_in_executor(None, memory_after.compare_to, memory_before, "traceback")
+        slow_callbacks = sorted((lag for lag in lags if lag > self.slow_callback_threshold), reverse=True)
+        report = ProfileReport(
+            duration=elapsed,
+            samples=sum(stacks.values()),
+            slow_callbacks=slow_callbacks,
+            max_lag=max(lags, default=0.0),
+            memory_diff=sum(stat.size_diff for stat in memory_stats),
+            files=[],
+        )
+        await loop.run_in_executor(None, self._write, report, stacks, blocked_stacks, memory_stats)
+        logger.info(f"Profile of {elapsed:.1f} seconds is written to {self.directory}")
+        return report
+
+    def _write(
+        self,
+        report: ProfileReport,
+        stacks: Counter,  # type: ignore
+        blocked_stacks: Counter,  # type: ignore
+        memory_stats: list[tracemalloc.StatisticDiff],
+    ) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        prefix = datetime.now(tz=timezone.utc).strftime("%Y%m%dT%H%M%S")
+        memory_stacks = (
+            (";".join(_format_frame(frame) for frame in stat.traceback), stat.size_diff) for stat in memory_stats
+        )
+        report.files.extend(
+            (
+                _write_collapsed(self.directory / f"{prefix}-cpu.collapsed", stacks.most_common()),
+                _write_collapsed(self.directory / f"{prefix}-blocked.collapsed", blocked_stacks.most_common()),
+                _write_collapsed(self.directory / f"{prefix}-memory.collapsed", memory_stacks),
+            )
+        )
+        lines = [
+            f"duration: {report.duration:.3f} s",
+            f"samples: {report.samples}",
+            f"max loop lag: {report.max_lag * 1000:.1f} ms",
+            f"slow callbacks over {self.slow_callback_threshold * 1000:.0f} ms: {len(report.slow_callbacks)}",
+            *(f"  {lag * 1000:.1f} ms" for lag in report.slow_callbacks[:_REPORT_TOP]),
+            "blocking stacks:",
+            *(f"  {weight} {stack}" for stack, weight in blocked_stacks.most_common(_REPORT_TOP)),
+            f"memory diff: {report.memory_diff / 1024:+.1f} KiB",
+            *(
+                f"  {_format_frame(stat.traceback[-1])}: {stat.size_diff / 1024:+.1f} KiB, {stat.count_diff:+d} blocks"
+                for stat in memory_stats[:_REPORT_TOP]
+            ),
+        ]
+        report_path = self.directory / f"{prefix}-report.txt"
+        report_path.write_text("\n".join(lines) + "\n")
+        report.files.append(report_path)
@@ -44,5 +44,11 @@ class MatcherProtocol(Protocol):
     ) -> None:
         ...
 
-    async def init(self) -> None:
+    async def init(
+        self,
+        api: Optional[TelegramBotApi] = None,
+    ) -> None:
+        ...
+
+    async def close(self) -> None:
         ...
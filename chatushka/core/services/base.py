@@ -22,8 +22,8 @@ class ServiceWrapperBase(ABC, metaclass=SingletonABCMeta):
         self,
         bot: ChatushkaBot,
     ) -> None:
-        bot.add_handler(EventTypes.STARTUP, self.startup_event_handler)
-        bot.add_handler(EventTypes.SHUTDOWN, self.shutdown_event_handler)
+        bot.add_handler(EventTypes.STARTUP, self.startup_event_handler, include_in_help=False)
+        bot.add_handler(EventTypes.SHUTDOWN, self.shutdown_event_handler, include_in_help=False)
 
     @abstractmethod
     async def startup_event_handler(self) -> None:
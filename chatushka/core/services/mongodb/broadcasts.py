@@ -0,0 +1,49 @@
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from chatushka.core.services.mongodb.settings import MongoDBSettings
+from chatushka.core.services.mongodb.wrapper import MongoDBWrapper
+from chatushka.core.transports.broadcast import BroadcastCheckpoint, BroadcastCheckpointStorage
+
+BROADCASTS_COLLECTION = "broadcasts"
+
+
+class MongoDBBroadcastCheckpoints(BroadcastCheckpointStorage):
+    def __init__(
+        self,
+        collection: str = BROADCASTS_COLLECTION,
+    ) -> None:
+        self.collection = collection
+
+    def _get_collection(self) -> Any:
+        return MongoDBWrapper().client[MongoDBSettings().mongodb_database][self.collection]
+
+    async def load(
+        self,
+        broadcast_id: str,
+    ) -> Optional[BroadcastCheckpoint]:
+        if not (document := await self._get_collection().find_one({"_id": broadcast_id})):
+            return None
+        return BroadcastCheckpoint(
+            position=document["position"],
+            handled_ahead=tuple(document.get("handled_ahead") or ()),
+            sent=document.get("sent", 0),
+            failed=document.get("failed", 0),
+        )
+
+    async def save(
+        self,
+        broadcast_id: str,
+        checkpoint: BroadcastCheckpoint,
+    ) -> None:
+        await self._get_collection().replace_one(
+            {"_id": broadcast_id},
+            checkpoint._asdict() | {"updated_at": datetime.now(tz=timezone.utc)},
+            upsert=True,
+        )
+
+    async def delete(
+        self,
+        broadcast_id: str,
+    ) -> None:
+        await self._get_collection().delete_one({"_id": broadcast_id})
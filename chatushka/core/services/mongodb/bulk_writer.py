@@ -0,0 +1,268 @@
+from asyncio import Event, Task
+from asyncio import TimeoutError as AsyncTimeoutError
+from asyncio import ensure_future, wait_for
+from contextlib import suppress
+from logging import getLogger
+from time import monotonic
+from typing import Any, Dict, Optional, Union
+
+from pymongo import InsertOne, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from chatushka import ChatushkaBot
+from chatushka.core.models import EventTypes
+from chatushka.core.services.base import ServiceWrapperBase
+from chatushka.core.services.mongodb.settings import MongoDBSettings
+from chatushka.core.services.mongodb.wrapper import MongoDBWrapper
+
+logger = getLogger(__name__)
+
+WRITE_OPERATION_TYPING = Union[InsertOne, UpdateOne, ReplaceOne]
+# duplicate keys and failed document validation fail the same way on every attempt
+_PERMANENT_WRITE_ERRORS = frozenset((11000, 11001, 121))
+
+
+class _BufferedWrite:
+    def __init__(
+        self,
+        operation: WRITE_OPERATION_TYPING,
+        document: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.operation = operation
+        # raw documents of inserts, so insert-only batches go through insert_many
+        self.document = document
+        self.attempts = 0
+
+
+class BulkWriteStats:
+    def __init__(self) -> None:
+        self.flushes = 0
+        self.written = 0
+        self.failed = 0
+        self.dropped = 0
+        self.total_batch_size = 0
+        self.last_batch_size = 0
+        self.max_batch_size = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+        self.total_flush_latency = 0.0
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.total_batch_size / self.flushes if self.flushes else 0.0
+
+    @property
+    def mean_flush_latency(self) -> float:
+        return self.total_flush_latency / self.flushes if self.flushes else 0.0
+
+    def record(
+        self,
+        batch_size: int,
+        latency: float,
+        written: int,
+        failed: int,
+        dropped: int,
+    ) -> None:
+        self.flushes += 1
+        self.total_batch_size += batch_size
+        self.written += written
+        self.failed += failed
+        self.dropped += dropped
+        self.last_batch_size = batch_size
+        self.max_batch_size = max(self.max_batch_size, batch_size)
+        self.last_flush_latency = latency
+        self.max_flush_latency = max(self.max_flush_latency, latency)
+        self.total_flush_latency += latency
+
+
+class MongoDBBulkWriter(ServiceWrapperBase):
+    def __init__(
+        self,
+        database: Optional[str] = None,
+        max_batch_size: int = 500,
+        flush_interval: float = 1,
+        max_buffered: int = 10_000,
+        max_attempts: int = 3,
+    ) -> None:
+        super().__init__()
+        self.healthz_name = "mongodb_bulk_writer"
+        self.settings: MongoDBSettings = MongoDBSettings()
+        self.database = database or self.settings.mongodb_database
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self.max_attempts = max_attempts
+        self.stats = BulkWriteStats()
+        self._buffers: dict[str, list[_BufferedWrite]] = {}
+        self._buffered = 0
+        self._flush_needed: Optional[Event] = None
+        self._has_space: Optional[Event] = None
+        self._flushing: Optional[Task] = None  # type: ignore
+        self._is_closing = False
+
+    @property
+    def buffered(self) -> int:
+        return self._buffered
+
+    def add_event_handlers(
+        self,
+        bot: ChatushkaBot,
+    ) -> None:
+        # buffers have to be flushed before the client is closed
+        wrapper = MongoDBWrapper()
+        bot.add_handler(EventTypes.STARTUP, wrapper.startup_event_handler, include_in_help=False)
+        super().add_event_handlers(bot)
+        bot.add_handler(EventTypes.SHUTDOWN, wrapper.shutdown_event_handler, include_in_help=False)
+
+    async def startup_event_handler(self) -> None:
+        self._is_closing = False
+        self._flush_needed = Event()
+        self._has_space = Event()
+        self._has_space.set()
+        self._flushing = ensure_future(self._flush_loop())
+
+    async def shutdown_event_handler(self) -> None:
+        self._is_closing = True
+        if self._flushing:
+            self._flush_needed.set()  # type: ignore
+            await self._flushing
+            self._flushing = None
+        await self.flush()
+
+    async def health_check(self) -> None:
+        if not self._flushing or self._flushing.done():
+            raise RuntimeError("Bulk writer is not running")
+        if self._buffered >= self.max_buffered:
+            raise RuntimeError(f"Bulk writer buffer is full ({self._buffered} operations)")
+
+    async def insert(
+        self,
+        collection: str,
+        document: Dict[str, Any],
+    ) -> None:
+        await self._buffer(collection, _BufferedWrite(InsertOne(document), document))
+
+    async def upsert(
+        self,
+        collection: str,
+        query: Dict[str, Any],
+        update: Dict[str, Any],
+        replace: bool = False,
+    ) -> None:
+        operation = ReplaceOne(query, update, upsert=True) if replace else UpdateOne(query, update, upsert=True)
+        await self.write(collection, operation)
+
+    async def write(
+        self,
+        collection: str,
+        operation: WRITE_OPERATION_TYPING,
+    ) -> None:
+        await self._buffer(collection, _BufferedWrite(operation))
+
+    async def _buffer(
+        self,
+        collection: str,
+        entry: _BufferedWrite,
+    ) -> None:
+        while self._buffered >= self.max_buffered:
+            if not self._has_space:
+                # there is no flush loop before startup, so the buffer is flushed in place
+                await self.flush()
+                continue
+            self._has_space.clear()
+            self._flush_needed.set()  # type: ignore
+            await self._has_space.wait()
+        buffer = self._buffers.setdefault(collection, [])
+        buffer.append(entry)
+        self._buffered += 1
+        if len(buffer) >= self.max_batch_size and self._flush_needed:
+            self._flush_needed.set()
+
+    async def flush(self) -> None:
+        for collection in list(self._buffers):
+            await self._flush_collection(collection)
+
+    async def _flush_collection(
+        self,
+        collection: str,
+    ) -> None:
+        entries = self._buffers.pop(collection, [])
+        while entries:
+            batch, entries = entries[: self.max_batch_size], entries[self.max_batch_size :]  # noqa
+            if not (pending := await self._write_batch(collection, batch)):
+                continue
+            if self._is_closing:
+                # nothing is retried on the final flush, operations after a failed one still have to be written
+                entries = pending + entries
+                continue
+            # later operations wait for the failed ones, so updates of a document keep their order
+            self._buffers[collection] = pending + entries + self._buffers.get(collection, [])
+            return
+
+    async def _write_batch(
+        self,
+        collection: str,
+        entries: list[_BufferedWrite],
+    ) -> list[_BufferedWrite]:
+        started_at = monotonic()
+        retryable: list[_BufferedWrite] = []
+        permanent: list[_BufferedWrite] = []
+        unattempted: list[_BufferedWrite] = []
+        # updates of the same document have to be applied in order, inserts do not depend on each other
+        is_ordered = not all(entry.document is not None for entry in entries)
+        try:
+            target = MongoDBWrapper().client[self.database][collection]
+            if is_ordered:
+                await target.bulk_write([entry.operation for entry in entries], ordered=True)
+            else:
+                await target.insert_many([entry.document for entry in entries], ordered=False)
+        except BulkWriteError as err:
+            retryable, permanent, unattempted = _split_failures(entries, err, is_ordered)
+            failed = len(retryable) + len(permanent)
+            logger.error(f"Unable to write {failed} of {len(entries)} operations to {collection}: {err!r}")
+        except Exception:  # noqa, pylint: disable=broad-except
+            retryable = entries
+            logger.exception(f"Unable to write {len(entries)} operations to {collection}")
+        retried = []
+        for entry in retryable:
+            entry.attempts += 1
+            # the final flush on shutdown has no next flush to retry in
+            if entry.attempts < self.max_attempts and not self._is_closing:
+                retried.append(entry)
+        failed = len(retryable) + len(permanent)
+        dropped = failed - len(retried)
+        if dropped:
+            logger.error(f"Dropped {dropped} operations to {collection}")
+        written = len(entries) - failed - len(unattempted)
+        self.stats.record(len(entries), monotonic() - started_at, written, failed, dropped)
+        self._buffered -= written + dropped
+        if self._has_space and self._buffered < self.max_buffered:
+            self._has_space.set()
+        return retried + unattempted
+
+    async def _flush_loop(self) -> None:
+        while not self._is_closing:
+            with suppress(AsyncTimeoutError):
+                await wait_for(self._flush_needed.wait(), timeout=self.flush_interval)  # type: ignore
+            self._flush_needed.clear()  # type: ignore
+            await self.flush()
+
+
+def _split_failures(
+    entries: list[_BufferedWrite],
+    err: BulkWriteError,
+    is_ordered: bool,
+) -> tuple[list[_BufferedWrite], list[_BufferedWrite], list[_BufferedWrite]]:
+    # failed operations worth a retry, failed operations to drop and operations that were not attempted
+    errors = sorted(err.details.get("writeErrors", ()), key=lambda error: error["index"])
+    if not errors:
+        # only the write concern failed, the operations are applied
+        return [], [], []
+    unattempted = []
+    if is_ordered:
+        # an ordered write stops on the first error, later operations are not attempted
+        errors = errors[:1]
+        unattempted = entries[errors[0]["index"] + 1 :]  # noqa
+    retryable = [entries[error["index"]] for error in errors if error.get("code") not in _PERMANENT_WRITE_ERRORS]
+    permanent = [entries[error["index"]] for error in errors if error.get("code") in _PERMANENT_WRITE_ERRORS]
+    return retryable, permanent, unattempted
@@ -1,7 +1,18 @@
+from pydantic import ValidationError
+
 from chatushka.core.utils import ServiceSettingsBase
 
 
 class MongoDBSettings(ServiceSettingsBase):
     mongodb_dsn: str
+    mongodb_database: str = "chatushka"
     mongodb_min_connections_count: int = 2
     mongodb_max_connections_count: int = 8
+
+
+def is_mongodb_configured() -> bool:
+    try:
+        MongoDBSettings()
+    except ValidationError:
+        return False
+    return True
@@ -1,10 +1,17 @@
-from typing import Any, Dict, List, Optional, Tuple
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
 
+from bson import json_util
 from motor.motor_asyncio import AsyncIOMotorClient
 
 from chatushka.core.services.mongodb.wrapper import MongoDBWrapper
 
 
+class KeysetPage(NamedTuple):
+    documents: List[Dict[str, Any]]
+    next_cursor: Optional[str]
+
+
 def get_mongodb_client() -> AsyncIOMotorClient:
     return MongoDBWrapper().client
 
@@ -25,3 +32,119 @@ async def mongodb_paginated_find(
     cursor = collection.find(query, sort=sort, projection=projection)
     cursor.skip(page * per_page).limit(per_page)
     return [doc async for doc in cursor]
+
+
+def encode_keyset_cursor(
+    values: List[Any],
+) -> str:
+    return urlsafe_b64encode(json_util.dumps(values).encode()).decode()
+
+
+def decode_keyset_cursor(
+    token: str,
+) -> List[Any]:
+    try:
+        values = json_util.loads(urlsafe_b64decode(token.encode()))
+    except ValueError as err:
+        raise ValueError(f"Invalid cursor token {token!r}") from err
+    if not isinstance(values, list):
+        raise ValueError(f"Invalid cursor token {token!r}")
+    return values
+
+
+def _keyset_sort(
+    sort: Optional[List[Tuple[str, int]]],
+) -> List[Tuple[str, int]]:
+    sort = list(sort or [])
+    if all(field != "_id" for field, _ in sort):
+        sort.append(("_id", sort[-1][1] if sort else 1))
+    return sort
+
+
+def _keyset_projection(
+    projection: Optional[Dict[str, int]],
+    sort: List[Tuple[str, int]],
+) -> Optional[Dict[str, int]]:
+    if not projection:
+        return projection
+    if any(value for field, value in projection.items() if field != "_id"):
+        return projection | {field: 1 for field, _ in sort}
+    if excluded := [field for field, _ in sort if field in projection]:
+        raise ValueError(f"Sort fields {excluded} can not be excluded from projection")
+    return projection
+
+
+def _get_field(
+    document: Dict[str, Any],
+    field: str,
+) -> Any:
+    value: Any = document
+    for part in field.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def _keyset_query(
+    query: Optional[Dict[str, Any]],
+    sort: List[Tuple[str, int]],
+    last_values: List[Any],
+) -> Dict[str, Any]:
+    if len(last_values) != len(sort):
+        raise ValueError("Cursor token does not match sort fields")
+    clauses = []
+    for position, (field, direction) in enumerate(sort):
+        prefix = {prev_field: last_values[index] for index, (prev_field, _) in enumerate(sort[:position])}
+        # null and missing values sort before any other value, but are not comparable with $gt and $lt
+        value = last_values[position]
+        if value is None:
+            if direction > 0:
+                clauses.append(prefix | {field: {"$ne": None}})
+            continue
+        clauses.append(prefix | {field: {"$gt" if direction > 0 else "$lt": value}})
+        if direction < 0:
+            clauses.append(prefix | {field: None})
+    after = {"$or": clauses}
+    return {"$and": [query, after]} if query else after
+
+
+async def mongodb_keyset_find(
+    collection: AsyncIOMotorClient,
+    query: Optional[Dict[str, Any]],
+    per_page: int,
+    cursor: Optional[str] = None,
+    sort: Optional[List[Tuple[str, int]]] = None,
+    projection: Optional[Dict[str, int]] = None,
+) -> KeysetPage:
+    sort = _keyset_sort(sort)
+    if cursor:
+        query = _keyset_query(query, sort, decode_keyset_cursor(cursor))
+    found = collection.find(query, sort=sort, projection=_keyset_projection(projection, sort))
+    found.limit(per_page + 1)
+    documents = [doc async for doc in found]
+    if len(documents) <= per_page:
+        return KeysetPage(documents, None)
+    documents.pop()
+    return KeysetPage(documents, encode_keyset_cursor([_get_field(documents[-1], field) for field, _ in sort]))
+
+
+async def mongodb_stream_find(
+    collection: AsyncIOMotorClient,
+    query: Optional[Dict[str, Any]],
+    batch_size: int = 100,
+    cursor: Optional[str] = None,
+    sort: Optional[List[Tuple[str, int]]] = None,
+    projection: Optional[Dict[str, int]] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    while True:
+        page = await mongodb_keyset_find(
+            collection,
+            query,
+            per_page=batch_size,
+            cursor=cursor,
+            sort=sort,
+            projection=projection,
+        )
+        for document in page.documents:
+            yield document
+        if not (cursor := page.next_cursor):
+            return
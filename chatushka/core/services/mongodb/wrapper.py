@@ -14,10 +14,15 @@ class MongoDBWrapper(ServiceWrapperBase):
         self.healthz_name = "mongodb"
         self.client: AsyncIOMotorClient
         self.settings: MongoDBSettings = MongoDBSettings()
+        self._references = 0
 
     async def startup_event_handler(
         self,
     ) -> None:
+        # several services register the wrapper, the client is shared until the last of them is shut down
+        self._references += 1
+        if self._references > 1:
+            return
         self.client = AsyncIOMotorClient(  # noqa
             self.settings.mongodb_dsn,
             minPoolSize=self.settings.mongodb_min_connections_count,
@@ -26,7 +31,8 @@ class MongoDBWrapper(ServiceWrapperBase):
         )
 
     async def shutdown_event_handler(self) -> None:
-        if self.client:
+        self._references -= 1
+        if self._references <= 0 and self.client:
             self.client.close()
 
     async def health_check(self) -> None:
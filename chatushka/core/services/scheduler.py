@@ -0,0 +1,298 @@
+from asyncio import CancelledError, Event, Semaphore, Task
+from asyncio import TimeoutError as AsyncTimeoutError
+from asyncio import ensure_future, gather, sleep, wait_for
+from contextlib import suppress
+from datetime import datetime, timezone
+from heapq import heappop, heappush
+from itertools import count
+from logging import getLogger
+from time import time
+from typing import Any, Awaitable, Callable, NamedTuple, Optional
+from uuid import uuid4
+
+from chatushka import ChatushkaBot
+from chatushka.core.cluster.roles import get_worker_index, get_workers_count
+from chatushka.core.models import EventTypes
+from chatushka.core.services.base import ServiceWrapperBase
+from chatushka.core.services.mongodb.settings import MongoDBSettings, is_mongodb_configured
+from chatushka.core.services.mongodb.wrapper import MongoDBWrapper
+from chatushka.core.transports.exceptions import TelegramBotApiError, TelegramRetryAfterError
+from chatushka.core.transports.telegram_bot_api import TelegramBotApi
+
+logger = getLogger(__name__)
+
+SCHEDULED_ACTIONS_COLLECTION = "scheduled_actions"
+
+ACTION_TYPING = Callable[..., Awaitable[Any]]
+
+
+class ScheduledJob(NamedTuple):
+    id: str
+    action: str
+    params: dict[str, Any]
+    due_at: float
+    attempts: int = 0
+    owner: Optional[int] = None
+
+    def to_document(self) -> dict[str, Any]:
+        return {
+            "_id": self.id,
+            "action": self.action,
+            "params": self.params,
+            "due_at": datetime.fromtimestamp(self.due_at, tz=timezone.utc),
+            "attempts": self.attempts,
+            "owner": self.owner,
+        }
+
+    @classmethod
+    def from_document(
+        cls,
+        document: dict[str, Any],
+    ) -> "ScheduledJob":
+        due_at: datetime = document["due_at"]
+        if due_at.tzinfo is None:
+            due_at = due_at.replace(tzinfo=timezone.utc)
+        return cls(
+            id=document["_id"],
+            action=document["action"],
+            params=document.get("params") or {},
+            due_at=due_at.timestamp(),
+            attempts=document.get("attempts", 0),
+            owner=document.get("owner"),
+        )
+
+
+def _get_orphans_query(
+    worker_index: Optional[int],
+    workers: int,
+) -> Optional[dict[str, Any]]:
+    # jobs of workers that are gone after the number of workers is changed are spread over the current ones
+    if worker_index is None:
+        return None if workers else {"owner": {"$ne": None}}
+    query = {"owner": {"$gte": workers, "$mod": [workers, worker_index]}}
+    if worker_index == 0:
+        # the leader of workers runs no scheduler, so jobs scheduled without workers go to the first one
+        return {"$or": [{"owner": None}, query]}
+    return query
+
+
+def _is_permanent_error(
+    err: Exception,
+) -> bool:
+    # bad requests and forbidden chats will not get better with time, flood control and server errors will
+    if isinstance(err, TelegramRetryAfterError) or not isinstance(err, TelegramBotApiError):
+        return False
+    return err.error_code is not None and 400 <= err.error_code < 500
+
+
+class ActionsScheduler(ServiceWrapperBase):
+    def __init__(
+        self,
+        collection: str = SCHEDULED_ACTIONS_COLLECTION,
+        max_attempts: int = 5,
+        retry_delay: float = 10,
+        max_concurrency: int = 16,
+        preload_window: float = 3600,
+    ) -> None:
+        super().__init__()
+        self.healthz_name = "scheduler"
+        self.collection = collection
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_concurrency = max_concurrency
+        self.preload_window = preload_window
+        self.is_persistent = is_mongodb_configured()
+        self.actions: dict[str, ACTION_TYPING] = {}
+        self._jobs: dict[str, ScheduledJob] = {}
+        self._heap: list[tuple[float, int, ScheduledJob]] = []
+        self._sequence = count()
+        self._loaded_until = float("-inf") if self.is_persistent else float("inf")
+        self._api: Optional[TelegramBotApi] = None
+        self._wakeup: Optional[Event] = None
+        self._concurrency: Optional[Semaphore] = None
+        self._running: set[Task] = set()  # type: ignore
+        self._loop_task: Optional[Task] = None  # type: ignore
+        self._preload_task: Optional[Task] = None  # type: ignore
+
+    @property
+    def pending(self) -> int:
+        return len(self._jobs)
+
+    def add_event_handlers(
+        self,
+        bot: ChatushkaBot,
+    ) -> None:
+        if not self.is_persistent:
+            super().add_event_handlers(bot)
+            return
+        wrapper = MongoDBWrapper()
+        bot.add_handler(EventTypes.STARTUP, wrapper.startup_event_handler, include_in_help=False)
+        super().add_event_handlers(bot)
+        bot.add_handler(EventTypes.SHUTDOWN, wrapper.shutdown_event_handler, include_in_help=False)
+
+    def add_action(
+        self,
+        name: str,
+        action: ACTION_TYPING,
+    ) -> None:
+        self.actions[name] = action
+
+    def _get_collection(self) -> Any:
+        return MongoDBWrapper().client[MongoDBSettings().mongodb_database][self.collection]
+
+    async def startup_event_handler(
+        self,
+        api: TelegramBotApi,
+    ) -> None:
+        self._api = api
+        self._wakeup = Event()
+        self._concurrency = Semaphore(self.max_concurrency)
+        if self.is_persistent:
+            await self._get_collection().create_index([("owner", 1), ("due_at", 1)])
+            await self._claim_orphans()
+            await self._preload()
+            self._preload_task = ensure_future(self._preload_loop())
+        self._loop_task = ensure_future(self._loop())
+
+    async def shutdown_event_handler(self) -> None:
+        # interrupted jobs stay persisted and run again after restart
+        tasks = [task for task in (self._loop_task, self._preload_task) if task] + list(self._running)
+        for task in tasks:
+            task.cancel()
+        await gather(*tasks, return_exceptions=True)
+        self._loop_task = self._preload_task = None
+
+    async def health_check(self) -> None:
+        if not self._loop_task or self._loop_task.done():
+            raise RuntimeError("Scheduler is not running")
+
+    def _push(
+        self,
+        job: ScheduledJob,
+    ) -> None:
+        self._jobs[job.id] = job
+        heappush(self._heap, (job.due_at, next(self._sequence), job))
+        if self._wakeup and self._heap[0][2] is job:
+            self._wakeup.set()
+
+    async def schedule(
+        self,
+        action: str,
+        params: dict[str, Any],
+        due_at: float,
+        key: Optional[str] = None,
+    ) -> ScheduledJob:
+        if action not in self.actions:
+            raise ValueError(f"Unknown action {action}")
+        # every worker process runs the jobs scheduled by it, so a job runs once however many workers there are
+        job = ScheduledJob(
+            id=key or uuid4().hex,
+            action=action,
+            params=params,
+            due_at=due_at,
+            owner=get_worker_index(),
+        )
+        if self.is_persistent:
+            await self._get_collection().replace_one({"_id": job.id}, job.to_document(), upsert=True)
+        if job.due_at <= max(self._loaded_until, time() + self.preload_window):
+            self._push(job)
+        else:
+            # far jobs are kept in the database only and preloaded when they get close
+            self._jobs.pop(job.id, None)
+        return job
+
+    async def cancel(
+        self,
+        key: str,
+    ) -> None:
+        # the heap entry is left in place and skipped when popped
+        self._jobs.pop(key, None)
+        if self.is_persistent:
+            await self._get_collection().delete_one({"_id": key})
+
+    async def _claim_orphans(self) -> None:
+        if (query := _get_orphans_query(get_worker_index(), get_workers_count())) is None:
+            return
+        result = await self._get_collection().update_many(query, {"$set": {"owner": get_worker_index()}})
+        if result.modified_count:
+            logger.info(f"{result.modified_count} scheduled actions of gone workers are taken over")
+
+    async def _preload(self) -> None:
+        loaded_until = time() + self.preload_window
+        query: dict[str, Any] = {
+            "owner": get_worker_index(),
+            "due_at": {"$lte": datetime.fromtimestamp(loaded_until, tz=timezone.utc)},
+        }
+        if self._loaded_until != float("-inf"):
+            query["due_at"]["$gt"] = datetime.fromtimestamp(self._loaded_until, tz=timezone.utc)
+        async for document in self._get_collection().find(query):
+            job = ScheduledJob.from_document(document)
+            if job.id not in self._jobs:
+                self._push(job)
+        self._loaded_until = loaded_until
+
+    async def _preload_loop(self) -> None:
+        while True:
+            await sleep(self.preload_window / 2)
+            try:
+                await self._preload()
+            except Exception:  # noqa, pylint: disable=broad-except
+                logger.exception("Unable to preload scheduled actions")
+
+    async def _loop(self) -> None:
+        while True:
+            now = time()
+            while self._heap and self._heap[0][0] <= now:
+                job = heappop(self._heap)[2]
+                if self._jobs.get(job.id) is not job:
+                    continue
+                await self._concurrency.acquire()  # type: ignore
+                task = ensure_future(self._execute(job))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+            self._wakeup.clear()  # type: ignore
+            timeout = self._heap[0][0] - now if self._heap else None
+            with suppress(AsyncTimeoutError):
+                await wait_for(self._wakeup.wait(), timeout=timeout)  # type: ignore
+
+    async def _execute(
+        self,
+        job: ScheduledJob,
+    ) -> None:
+        try:
+            await self.actions[job.action](self._api, **job.params)
+        except CancelledError:
+            raise
+        except Exception as err:  # noqa, pylint: disable=broad-except
+            await self._retry(job, err)
+        else:
+            await self._complete(job)
+        finally:
+            self._concurrency.release()  # type: ignore
+
+    async def _complete(
+        self,
+        job: ScheduledJob,
+    ) -> None:
+        if self._jobs.get(job.id) is job:
+            del self._jobs[job.id]
+            if self.is_persistent:
+                await self._get_collection().delete_one({"_id": job.id, "attempts": job.attempts})
+
+    async def _retry(
+        self,
+        job: ScheduledJob,
+        err: Exception,
+    ) -> None:
+        attempts = job.attempts + 1
+        if job.action not in self.actions or attempts >= self.max_attempts or _is_permanent_error(err):
+            logger.error(f"Scheduled action {job.action} {job.id} failed after {attempts} attempts: {err!r}")
+            await self._complete(job)
+            return
+        logger.warning(f"Scheduled action {job.action} {job.id} failed, attempt {attempts}: {err!r}")
+        if self._jobs.get(job.id) is not job:
+            return
+        retried = job._replace(due_at=time() + self.retry_delay * 2 ** (attempts - 1), attempts=attempts)
+        if self.is_persistent:
+            await self._get_collection().replace_one({"_id": job.id}, retried.to_document())
+        self._push(retried)
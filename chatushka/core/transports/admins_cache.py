@@ -0,0 +1,114 @@
+from asyncio import Future, current_task, ensure_future, shield
+from collections import OrderedDict
+from functools import partial
+from logging import getLogger
+from time import monotonic
+from typing import TYPE_CHECKING, NamedTuple, Optional, Union
+
+from chatushka.core.transports.models import ChatMemberAdministrator, ChatMemberOwner
+
+if TYPE_CHECKING:
+    from chatushka.core.transports.telegram_bot_api import TelegramBotApi
+
+logger = getLogger(__name__)
+
+CHAT_ADMINISTRATOR_TYPING = Union[ChatMemberAdministrator, ChatMemberOwner]
+
+
+class _CacheEntry(NamedTuple):
+    expires_at: float
+    members: dict[int, CHAT_ADMINISTRATOR_TYPING]
+
+
+class ChatAdministratorsCache:
+    def __init__(
+        self,
+        api: "TelegramBotApi",
+        ttl: float = 600,
+        max_chats: int = 1024,
+    ) -> None:
+        self.api = api
+        self.ttl = ttl
+        self.max_chats = max_chats
+        self._entries: OrderedDict[int, _CacheEntry] = OrderedDict()
+        self._lookups: dict[int, Future] = {}  # type: ignore
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def invalidate(
+        self,
+        chat_id: Optional[int] = None,
+    ) -> None:
+        if chat_id is None:
+            self._entries.clear()
+            self._lookups.clear()
+            return
+        self._entries.pop(chat_id, None)
+        self._lookups.pop(chat_id, None)
+
+    def _forget_lookup(
+        self,
+        chat_id: int,
+        lookup: Future,  # type: ignore
+    ) -> None:
+        if self._lookups.get(chat_id) is lookup:
+            del self._lookups[chat_id]
+
+    async def _fetch(
+        self,
+        chat_id: int,
+    ) -> dict[int, CHAT_ADMINISTRATOR_TYPING]:
+        admins = await self.api.get_chat_administrators(chat_id)
+        members = {admin.user.id: admin for admin in admins}
+        if self._lookups.get(chat_id) is not current_task():
+            return members
+        self._entries[chat_id] = _CacheEntry(monotonic() + self.ttl, members)
+        self._entries.move_to_end(chat_id)
+        while len(self._entries) > self.max_chats:
+            self._entries.popitem(last=False)
+        return members
+
+    async def get_members(
+        self,
+        chat_id: int,
+    ) -> dict[int, CHAT_ADMINISTRATOR_TYPING]:
+        entry = self._entries.get(chat_id)
+        if entry and entry.expires_at > monotonic():
+            self._entries.move_to_end(chat_id)
+            return entry.members
+        lookup = self._lookups.get(chat_id)
+        if lookup is None:
+            lookup = self._lookups[chat_id] = ensure_future(self._fetch(chat_id))
+            lookup.add_done_callback(partial(self._forget_lookup, chat_id))
+        return await shield(lookup)
+
+    async def get_administrators(
+        self,
+        chat_id: int,
+    ) -> list[CHAT_ADMINISTRATOR_TYPING]:
+        return list((await self.get_members(chat_id)).values())
+
+    async def get_member(
+        self,
+        chat_id: int,
+        user_id: int,
+    ) -> Optional[CHAT_ADMINISTRATOR_TYPING]:
+        return (await self.get_members(chat_id)).get(user_id)
+
+    async def is_admin(
+        self,
+        chat_id: int,
+        user_id: int,
+    ) -> bool:
+        return await self.get_member(chat_id, user_id) is not None
+
+    async def can_restrict(
+        self,
+        chat_id: int,
+        user_id: int,
+    ) -> bool:
+        member = await self.get_member(chat_id, user_id)
+        if isinstance(member, ChatMemberAdministrator):
+            return bool(member.can_restrict_members)
+        return isinstance(member, ChatMemberOwner)
@@ -0,0 +1,255 @@
+from abc import ABC, abstractmethod
+from asyncio import CancelledError, Semaphore, Task, ensure_future, gather
+from logging import getLogger
+from typing import TYPE_CHECKING, Any, AsyncIterable, Awaitable, Callable, Iterable, NamedTuple, Optional, Union
+from uuid import uuid4
+
+from chatushka.core.metrics import REGISTRY
+from chatushka.core.transports.exceptions import TelegramBotApiError
+from chatushka.core.transports.rate_limiter import Priorities
+
+if TYPE_CHECKING:
+    from chatushka.core.transports.telegram_bot_api import TelegramBotApi
+
+logger = getLogger(__name__)
+
+CHAT_IDS_TYPING = Union[Iterable[int], AsyncIterable[int]]
+
+_BROADCAST_MESSAGES = REGISTRY.counter(
+    "chatushka_broadcast_messages_total",
+    "Messages sent by broadcasts",
+    ("status",),
+)
+
+
+class BroadcastFailure(NamedTuple):
+    chat_id: int
+    error_code: Optional[int]
+    description: str
+
+
+class BroadcastCheckpoint(NamedTuple):
+    # chat ids before the position are handled, handled_ahead are positions done out of order after it
+    position: int = 0
+    handled_ahead: tuple[int, ...] = ()
+    sent: int = 0
+    failed: int = 0
+
+
+class BroadcastReport(NamedTuple):
+    # sent and failed include chats handled before a resume, failures and run counts only cover this run
+    broadcast_id: str
+    sent: int
+    failed: int
+    run_sent: int
+    run_failed: int
+    failures: list[BroadcastFailure]
+
+
+class BroadcastCheckpointStorage(ABC):
+    @abstractmethod
+    async def load(
+        self,
+        broadcast_id: str,
+    ) -> Optional[BroadcastCheckpoint]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def save(
+        self,
+        broadcast_id: str,
+        checkpoint: BroadcastCheckpoint,
+    ) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(
+        self,
+        broadcast_id: str,
+    ) -> None:
+        raise NotImplementedError
+
+
+class MemoryBroadcastCheckpoints(BroadcastCheckpointStorage):
+    def __init__(self) -> None:
+        self.checkpoints: dict[str, BroadcastCheckpoint] = {}
+
+    async def load(
+        self,
+        broadcast_id: str,
+    ) -> Optional[BroadcastCheckpoint]:
+        return self.checkpoints.get(broadcast_id)
+
+    async def save(
+        self,
+        broadcast_id: str,
+        checkpoint: BroadcastCheckpoint,
+    ) -> None:
+        self.checkpoints[broadcast_id] = checkpoint
+
+    async def delete(
+        self,
+        broadcast_id: str,
+    ) -> None:
+        self.checkpoints.pop(broadcast_id, None)
+
+
+class _Progress:
+    def __init__(
+        self,
+        checkpoint: BroadcastCheckpoint,
+    ) -> None:
+        self.position = checkpoint.position
+        self.handled_ahead = set(checkpoint.handled_ahead)
+        self.sent = checkpoint.sent
+        self.failed = checkpoint.failed
+        self.resumed = checkpoint
+        self.failures: list[BroadcastFailure] = []
+        self.changes = 0
+
+    def is_handled(
+        self,
+        position: int,
+    ) -> bool:
+        return position < self.position or position in self.handled_ahead
+
+    def handle(
+        self,
+        position: int,
+        failure: Optional[BroadcastFailure] = None,
+    ) -> None:
+        if failure:
+            self.failed += 1
+            self.failures.append(failure)
+        else:
+            self.sent += 1
+        self.handled_ahead.add(position)
+        while self.position in self.handled_ahead:
+            self.handled_ahead.remove(self.position)
+            self.position += 1
+        self.changes += 1
+
+    def checkpoint(self) -> BroadcastCheckpoint:
+        self.changes = 0
+        return BroadcastCheckpoint(
+            position=self.position,
+            handled_ahead=tuple(sorted(self.handled_ahead)),
+            sent=self.sent,
+            failed=self.failed,
+        )
+
+
+async def _iterate(
+    chat_ids: CHAT_IDS_TYPING,
+) -> AsyncIterable[int]:
+    if isinstance(chat_ids, AsyncIterable):
+        async for chat_id in chat_ids:
+            yield chat_id
+    else:
+        for chat_id in chat_ids:
+            yield chat_id
+
+
+class Broadcaster:
+    def __init__(
+        self,
+        api: "TelegramBotApi",
+        checkpoints: Optional[BroadcastCheckpointStorage] = None,
+        max_in_flight: int = 16,
+        checkpoint_every: int = 100,
+    ) -> None:
+        self.api = api
+        self.checkpoints = checkpoints or MemoryBroadcastCheckpoints()
+        self.max_in_flight = max_in_flight
+        self.checkpoint_every = checkpoint_every
+
+    async def send_message(
+        self,
+        chat_ids: CHAT_IDS_TYPING,
+        text: str,
+        broadcast_id: Optional[str] = None,
+        parse_mode: str = "html",
+        disable_web_page_preview: bool = False,
+    ) -> BroadcastReport:
+        async def _send(
+            chat_id: int,
+        ) -> None:
+            await self.api.send_message(
+                chat_id=chat_id,
+                text=text,
+                parse_mode=parse_mode,
+                disable_web_page_preview=disable_web_page_preview,
+                priority=Priorities.LOW,
+            )
+
+        return await self.run(chat_ids, _send, broadcast_id=broadcast_id)
+
+    async def run(
+        self,
+        chat_ids: CHAT_IDS_TYPING,
+        send: Callable[[int], Awaitable[Any]],
+        broadcast_id: Optional[str] = None,
+    ) -> BroadcastReport:
+        # resuming skips positions, so chat ids have to come in the same order every time
+        broadcast_id = broadcast_id or uuid4().hex
+        progress = _Progress(await self.checkpoints.load(broadcast_id) or BroadcastCheckpoint())
+        in_flight = Semaphore(self.max_in_flight)
+        tasks: set[Task] = set()  # type: ignore
+        is_completed = False
+        try:
+            position = 0
+            async for chat_id in _iterate(chat_ids):
+                if not progress.is_handled(position):
+                    await in_flight.acquire()
+                    task = ensure_future(self._send(send, chat_id, position, progress, in_flight))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                if progress.changes >= self.checkpoint_every:
+                    await self.checkpoints.save(broadcast_id, progress.checkpoint())
+                position += 1
+            await gather(*tasks)
+            is_completed = True
+        finally:
+            if is_completed:
+                await self.checkpoints.delete(broadcast_id)
+            else:
+                # messages in flight are not counted as handled and will be sent again on resume
+                for task in tasks:
+                    task.cancel()
+                await gather(*tasks, return_exceptions=True)
+                await self.checkpoints.save(broadcast_id, progress.checkpoint())
+                logger.warning(f"Broadcast {broadcast_id} is interrupted at position {progress.position}")
+        logger.info(f"Broadcast {broadcast_id} is completed: {progress.sent} sent, {progress.failed} failed")
+        return BroadcastReport(
+            broadcast_id=broadcast_id,
+            sent=progress.sent,
+            failed=progress.failed,
+            run_sent=progress.sent - progress.resumed.sent,
+            run_failed=progress.failed - progress.resumed.failed,
+            failures=progress.failures,
+        )
+
+    async def _send(
+        self,
+        send: Callable[[int], Awaitable[Any]],
+        chat_id: int,
+        position: int,
+        progress: _Progress,
+        in_flight: Semaphore,
+    ) -> None:
+        # kicked bots, deleted chats and exhausted retries fail the chat, not the whole broadcast
+        failure: Optional[BroadcastFailure] = None
+        try:
+            await send(chat_id)
+        except CancelledError:
+            raise
+        except TelegramBotApiError as err:
+            failure = BroadcastFailure(chat_id, err.error_code, err.description or str(err))
+        except Exception as err:  # noqa, pylint: disable=broad-except
+            failure = BroadcastFailure(chat_id, None, repr(err))
+        finally:
+            in_flight.release()
+        if failure:
+            logger.debug(f"Broadcast message to chat {chat_id} is failed: {failure.description}")
+        _BROADCAST_MESSAGES.inc("failed" if failure else "sent")
+        progress.handle(position, failure)
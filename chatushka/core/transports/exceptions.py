@@ -0,0 +1,21 @@
+from typing import Any, Optional
+
+
+class TelegramBotApiError(ValueError):
+    def __init__(
+        self,
+        message: str,
+        error_code: Optional[int] = None,
+        description: Optional[str] = None,
+        parameters: Optional[dict[str, Any]] = None,
+    ) -> None:
+        super().__init__(message)
+        self.error_code = error_code
+        self.description = description
+        self.parameters = parameters or {}
+
+
+class TelegramRetryAfterError(TelegramBotApiError):
+    @property
+    def retry_after(self) -> float:
+        return float(self.parameters.get("retry_after", 1))
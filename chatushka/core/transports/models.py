@@ -11,6 +11,20 @@ class ChatType(str, Enum):
     PRIVATE = "private"
 
 
+class UpdateKinds(str, Enum):
+    MESSAGE = "message"
+    MESSAGE_TEXT = "message_text"
+    NEW_CHAT_MEMBERS = "new_chat_members"
+    MY_CHAT_MEMBER = "my_chat_member"
+    CHAT_MEMBER = "chat_member"
+
+    @property
+    def update_field(self) -> str:
+        if self in (UpdateKinds.MESSAGE, UpdateKinds.MESSAGE_TEXT, UpdateKinds.NEW_CHAT_MEMBERS):
+            return "message"
+        return self.value
+
+
 class ChatMemberStatuses(str, Enum):
     MEMBER = "member"
     CREATOR = "creator"
@@ -103,6 +117,32 @@ class Update(BaseModel):
     update_id: int
     message: Optional[Message] = None
     my_chat_member: Optional[MyChatMember] = None
+    chat_member: Optional[MyChatMember] = None
+
+    @property
+    def chat(self) -> Optional[Chat]:
+        if self.message:
+            return self.message.chat
+        if self.my_chat_member:
+            return self.my_chat_member.chat
+        if self.chat_member:
+            return self.chat_member.chat
+        return None
+
+    @property
+    def kinds(self) -> tuple[UpdateKinds, ...]:
+        if self.message:
+            # the most specific kind goes first, any message is a generic message too
+            if self.message.text:
+                return (UpdateKinds.MESSAGE_TEXT, UpdateKinds.MESSAGE)
+            if self.message.new_chat_members:
+                return (UpdateKinds.NEW_CHAT_MEMBERS, UpdateKinds.MESSAGE)
+            return (UpdateKinds.MESSAGE,)
+        if self.my_chat_member:
+            return (UpdateKinds.MY_CHAT_MEMBER,)
+        if self.chat_member:
+            return (UpdateKinds.CHAT_MEMBER,)
+        return ()
 
 
 class ChatPermissions(BaseModel):
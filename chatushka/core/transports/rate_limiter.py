@@ -0,0 +1,179 @@
+from asyncio import CancelledError, Event, Future, Task
+from asyncio import TimeoutError as AsyncTimeoutError
+from asyncio import ensure_future, get_event_loop, wait_for
+from bisect import insort
+from collections import OrderedDict
+from contextlib import suppress
+from enum import IntEnum, unique
+from itertools import count
+from logging import getLogger
+from math import inf
+from time import monotonic
+from typing import NamedTuple, Optional
+
+logger = getLogger(__name__)
+
+
+@unique
+class Priorities(IntEnum):
+    MODERATION = 0
+    DEFAULT = 1
+    LOW = 2
+
+
+class TokenBucket:
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+    ) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = monotonic()
+        self._blocked_until = 0.0
+
+    def _refill(
+        self,
+        now: float,
+    ) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def delay(
+        self,
+        now: float,
+    ) -> float:
+        self._refill(now)
+        return max(self._blocked_until - now, (1 - self._tokens) / self.rate, 0)
+
+    def consume(
+        self,
+        now: float,
+    ) -> None:
+        self._refill(now)
+        self._tokens -= 1
+
+    def block(
+        self,
+        seconds: float,
+    ) -> None:
+        now = monotonic()
+        self._refill(now)
+        self._tokens = 0
+        self._blocked_until = max(self._blocked_until, now + seconds)
+
+
+class _Waiter(NamedTuple):
+    priority: int
+    seq: int
+    chat_id: Optional[int]
+    future: Future  # type: ignore
+
+
+class OutboundRateLimiter:
+    def __init__(
+        self,
+        global_rate: float = 30,
+        global_burst: float = 30,
+        chat_rate: float = 20 / 60,
+        chat_burst: float = 3,
+        max_chats: int = 10_000,
+    ) -> None:
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_chats = max_chats
+        self._global = TokenBucket(global_rate, global_burst)
+        self._chats: OrderedDict[int, TokenBucket] = OrderedDict()
+        self._waiters: list[_Waiter] = []
+        self._counter = count()
+        self._wakeup: Optional[Event] = None
+        self._pump: Optional[Task] = None  # type: ignore
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def split_global_rate(
+        self,
+        parts: int,
+    ) -> None:
+        # processes sharing one bot token split the global quota, per-chat quotas stay whole as chats are partitioned
+        self._global = TokenBucket(self._global.rate / parts, max(self._global.capacity / parts, 1))
+
+    def _chat_bucket(
+        self,
+        chat_id: int,
+    ) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+            if len(self._chats) > self.max_chats:
+                self._chats.popitem(last=False)
+        self._chats.move_to_end(chat_id)
+        return bucket
+
+    def block(
+        self,
+        chat_id: Optional[int],
+        seconds: float,
+    ) -> None:
+        bucket = self._global if chat_id is None else self._chat_bucket(chat_id)
+        bucket.block(seconds)
+        if self._wakeup:
+            self._wakeup.set()
+
+    async def acquire(
+        self,
+        chat_id: Optional[int] = None,
+        priority: Priorities = Priorities.DEFAULT,
+    ) -> None:
+        future = get_event_loop().create_future()
+        insort(self._waiters, _Waiter(priority, next(self._counter), chat_id, future))
+        if self._pump is None or self._pump.done():
+            self._wakeup = Event()
+            self._pump = ensure_future(self._drain(self._wakeup))
+        self._wakeup.set()  # type: ignore
+        await future
+
+    async def _drain(
+        self,
+        wakeup: Event,
+    ) -> None:
+        while self._waiters:
+            now = monotonic()
+            ready: Optional[_Waiter] = None
+            delay = inf
+            for waiter in list(self._waiters):
+                if waiter.future.done():
+                    self._waiters.remove(waiter)
+                    continue
+                chat_delay = 0 if waiter.chat_id is None else self._chat_bucket(waiter.chat_id).delay(now)
+                if chat_delay <= 0:
+                    ready = waiter
+                    break
+                delay = min(delay, chat_delay)
+            if ready is not None:
+                delay = self._global.delay(now)
+                if delay <= 0:
+                    self._global.consume(now)
+                    if ready.chat_id is not None:
+                        self._chat_bucket(ready.chat_id).consume(now)
+                    self._waiters.remove(ready)
+                    ready.future.set_result(None)
+                    continue
+            if delay == inf:
+                continue
+            wakeup.clear()
+            with suppress(AsyncTimeoutError):
+                await wait_for(wakeup.wait(), timeout=delay)
+
+    async def close(self) -> None:
+        for waiter in self._waiters:
+            waiter.future.cancel()
+        self._waiters.clear()
+        if self._pump:
+            self._pump.cancel()
+            with suppress(CancelledError):
+                await self._pump
+            self._pump = None
@@ -0,0 +1,143 @@
+from asyncio import sleep
+from datetime import datetime, timezone
+from gzip import BadGzipFile, GzipFile
+from gzip import open as gzip_open
+from json import JSONDecodeError, dumps, loads
+from logging import getLogger
+from pathlib import Path
+from time import monotonic, time
+from typing import IO, Any, Awaitable, Callable, Iterable, Iterator, NamedTuple, Optional, Union
+
+from pydantic import ValidationError
+
+from chatushka.core.transports.models import Update
+
+logger = getLogger(__name__)
+
+RECORDING_PREFIX = "updates-"
+RECORDING_SUFFIX = ".jsonl.gz"
+
+
+class RecordedUpdate(NamedTuple):
+    received_at: float
+    update: dict[str, Any]
+
+
+class UpdatesRecorder:
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        max_bytes: int = 64 * 1024 * 1024,
+        max_age: float = 3600,
+        max_files: Optional[int] = None,
+        compresslevel: int = 6,
+    ) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.max_files = max_files
+        self.compresslevel = compresslevel
+        self.path: Optional[Path] = None
+        self._raw: Optional[IO[bytes]] = None
+        self._file: Optional[GzipFile] = None
+        self._opened_at = 0.0
+
+    def _open(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = datetime.now(tz=timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        self.path = self.directory / f"{RECORDING_PREFIX}{name}{RECORDING_SUFFIX}"
+        self._raw = open(self.path, "ab")  # pylint: disable=consider-using-with
+        self._file = GzipFile(fileobj=self._raw, mode="ab", compresslevel=self.compresslevel)
+        self._opened_at = monotonic()
+        self._remove_outdated()
+
+    def _remove_outdated(self) -> None:
+        if not self.max_files:
+            return
+        for path in list_recordings(self.directory)[: -self.max_files]:
+            path.unlink(missing_ok=True)
+
+    def _should_rotate(self) -> bool:
+        return self._raw.tell() >= self.max_bytes or monotonic() - self._opened_at >= self.max_age  # type: ignore
+
+    def write(
+        self,
+        updates: Iterable[dict[str, Any]],
+    ) -> None:
+        received_at = time()
+        lines = b"".join(
+            dumps({"received_at": received_at, "update": update}, ensure_ascii=False, separators=(",", ":")).encode()
+            + b"\n"
+            for update in updates
+        )
+        if not lines:
+            return
+        if self._file is None:
+            self._open()
+        self._file.write(lines)  # type: ignore
+        # sync flush keeps everything written so far readable if the process dies before close
+        self._file.flush()  # type: ignore
+        if self._should_rotate():
+            self.close()
+
+    def close(self) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        self._raw.close()  # type: ignore
+        self._file = None
+        self._raw = None
+
+
+def list_recordings(
+    directory: Union[str, Path],
+) -> list[Path]:
+    return sorted(Path(directory).glob(f"{RECORDING_PREFIX}*{RECORDING_SUFFIX}"))
+
+
+def _read_recording(
+    path: Path,
+) -> Iterator[RecordedUpdate]:
+    with gzip_open(path, "rb") as file:
+        try:
+            for line in file:
+                try:
+                    record = loads(line)
+                except JSONDecodeError:
+                    logger.warning(f"Skipped broken record in {path}")
+                    continue
+                yield RecordedUpdate(record["received_at"], record["update"])
+        except (EOFError, BadGzipFile):
+            # a recording of a killed process has no gzip trailer, everything before it is still valid
+            logger.warning(f"Recording {path} is truncated")
+
+
+def read_recorded_updates(
+    *paths: Union[str, Path],
+) -> Iterator[RecordedUpdate]:
+    for path in map(Path, paths):
+        for recording in list_recordings(path) if path.is_dir() else [path]:
+            yield from _read_recording(recording)
+
+
+async def replay_updates(
+    records: Iterable[RecordedUpdate],
+    callback: Callable[[Update], Awaitable[Any]],
+    speed: float = 1,
+) -> int:
+    replayed = 0
+    started_at: Optional[float] = None
+    first_received_at = 0.0
+    for record in records:
+        if started_at is None:
+            started_at, first_received_at = monotonic(), record.received_at
+        if speed and (delay := (record.received_at - first_received_at) / speed - (monotonic() - started_at)) > 0:
+            await sleep(delay)
+        try:
+            update = Update(**record.update)
+        except ValidationError as err:
+            logger.debug(err)
+            continue
+        await callback(update)
+        replayed += 1
+    return replayed
@@ -1,31 +1,113 @@
+from asyncio import sleep
 from datetime import datetime
+from json import dumps
 from logging import getLogger
+from time import perf_counter
 from typing import Any, Dict, List, Optional, Tuple, Union
 
-from httpx import AsyncClient, Response
+from httpx import AsyncClient, Limits, Response
 from pydantic import ValidationError
 
+from chatushka.core.metrics import REGISTRY
 from chatushka.core.transports import models
+from chatushka.core.transports.admins_cache import ChatAdministratorsCache
+from chatushka.core.transports.broadcast import BroadcastCheckpointStorage, Broadcaster
+from chatushka.core.transports.exceptions import TelegramBotApiError, TelegramRetryAfterError
 from chatushka.core.transports.models import (
     ChatMemberAdministrator,
     ChatMemberOwner,
     ChatMemberStatuses,
     ChatPermissions,
 )
+from chatushka.core.transports.rate_limiter import OutboundRateLimiter, Priorities
+from chatushka.core.transports.recording import UpdatesRecorder
 
 logger = getLogger()
 
+TELEGRAM_BOT_API_URL = "https://api.telegram.org"
+
+_DEFAULT_TIMEOUT = 10
+_DEFAULT_METHODS_TIMEOUTS = {
+    "getme": 5,
+    "sendmessage": 10,
+    "getchatadministrators": 5,
+    "restrictchatmember": 5,
+}
+_METHODS_PRIORITIES = {
+    "restrictchatmember": Priorities.MODERATION,
+    "pinchatmessage": Priorities.MODERATION,
+    "unpinchatmessage": Priorities.MODERATION,
+    "unpinallchatmessages": Priorities.MODERATION,
+    "sendmessage": Priorities.DEFAULT,
+}
+_API_REQUEST_SECONDS = REGISTRY.histogram(
+    "chatushka_telegram_request_duration_seconds",
+    "Latency of Telegram Bot API requests",
+    ("method",),
+)
+_API_REQUESTS = REGISTRY.counter(
+    "chatushka_telegram_requests_total",
+    "Telegram Bot API requests by HTTP status",
+    ("method", "status"),
+)
+
 
 class TelegramBotApi:
     def __init__(
         self,
         token: str,
+        max_connections: int = 32,
+        max_keepalive_connections: int = 16,
+        keepalive_expiry: float = 60,
+        http2: bool = False,
+        timeouts: Optional[Dict[str, float]] = None,
+        rate_limiter: Optional[OutboundRateLimiter] = None,
+        max_retries: int = 3,
+        admins_cache_ttl: float = 600,
+        base_url: str = TELEGRAM_BOT_API_URL,
+        recorder: Optional[UpdatesRecorder] = None,
+        broadcast_checkpoints: Optional[BroadcastCheckpointStorage] = None,
+        broadcast_max_in_flight: int = 16,
     ) -> None:
         self.token = token
+        self.base_url = base_url.rstrip("/")
+        self._limits = Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._http2 = http2
+        self._timeouts = _DEFAULT_METHODS_TIMEOUTS | {
+            method.lower(): timeout for method, timeout in (timeouts or {}).items()
+        }
+        self._client: Optional[AsyncClient] = None
+        self.rate_limiter = rate_limiter or OutboundRateLimiter()
+        self.admins = ChatAdministratorsCache(self, ttl=admins_cache_ttl)
+        self.broadcasts = Broadcaster(self, checkpoints=broadcast_checkpoints, max_in_flight=broadcast_max_in_flight)
+        self.max_retries = max_retries
+        self.recorder = recorder
+
+    @property
+    def client(self) -> AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = AsyncClient(limits=self._limits, http2=self._http2)
+        return self._client
+
+    async def startup(self) -> None:
+        _ = self.client
+
+    async def shutdown(self) -> None:
+        await self.rate_limiter.close()
+        if self.recorder:
+            self.recorder.close()
+        if self._client is None:
+            return
+        await self._client.aclose()
+        self._client = None
 
     @property
     def _base_api_url(self) -> str:
-        return f"https://api.telegram.org/bot{self.token}"
+        return f"{self.base_url}/bot{self.token}"
 
     def _api_method_url(
         self,
@@ -41,7 +123,14 @@ class TelegramBotApi:
         is_ok: bool = data.get("ok", False)
         if not is_ok:
             logger.warning(response.text)
-            raise ValueError(f"Telegram response error: {response.text}\n{data}")
+            parameters = data.get("parameters") or {}
+            error_class = TelegramRetryAfterError if "retry_after" in parameters else TelegramBotApiError
+            raise error_class(
+                f"Telegram response error: {response.text}\n{data}",
+                error_code=data.get("error_code"),
+                description=data.get("description"),
+                parameters=parameters,
+            )
 
         result: Dict[str, Any] = data["result"]
         return result
@@ -49,13 +138,39 @@ class TelegramBotApi:
     async def _call_api(
         self,
         method: str,
-        timeout: int = 10,
+        timeout: Optional[float] = None,
+        priority: Optional[Priorities] = None,
         **kwargs: Any,
     ) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+        if timeout is None:
+            timeout = self._timeouts.get(method.lower(), _DEFAULT_TIMEOUT)
+        if priority is None:
+            priority = _METHODS_PRIORITIES.get(method.lower())
+        chat_id = kwargs.get("chat_id")
         url = self._api_method_url(method)
-        async with AsyncClient() as client:  # type: AsyncClient
-            response = await client.post(url, timeout=timeout * 2, data=kwargs)
-        return self.check_api_response(response)
+        method_name = method.lower()
+        attempt = 0
+        while True:
+            if priority is not None:
+                await self.rate_limiter.acquire(chat_id, priority)
+            started_at = perf_counter()
+            status = "error"
+            try:
+                response = await self.client.post(url, timeout=timeout * 2, data=kwargs)
+                status = str(response.status_code)
+                return self.check_api_response(response)
+            except TelegramRetryAfterError as err:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                logger.warning(f"Flood control on {method}, retry in {err.retry_after} seconds")
+                if priority is None:
+                    await sleep(err.retry_after)
+                else:
+                    self.rate_limiter.block(chat_id, err.retry_after)
+            finally:
+                _API_REQUEST_SECONDS.observe(perf_counter() - started_at, method_name)
+                _API_REQUESTS.inc(method_name, status)
 
     async def get_me(
         self,
@@ -67,15 +182,20 @@ class TelegramBotApi:
         self,
         timeout: int,
         offset: Optional[int] = None,
+        allowed_updates: Optional[List[str]] = None,
     ) -> Tuple[List[models.Update], int]:
-        params = {}
+        params: Dict[str, Any] = {}
         if offset:
             params["offset"] = offset
+        if allowed_updates is not None:
+            params["allowed_updates"] = dumps(allowed_updates)
         results = await self._call_api(
             "getupdates",
             timeout=timeout,
             **params,
         )
+        if self.recorder:
+            self.recorder.write(results)  # type: ignore
         updates_list = []
         latest_update_id: Optional[int] = offset
         for result in results:
@@ -89,6 +209,37 @@ class TelegramBotApi:
             updates_list.append(update)
         return updates_list, latest_update_id  # type: ignore
 
+    async def set_webhook(
+        self,
+        url: str,
+        secret_token: Optional[str] = None,
+        allowed_updates: Optional[List[str]] = None,
+        max_connections: Optional[int] = None,
+        drop_pending_updates: bool = False,
+    ) -> bool:
+        params: Dict[str, Any] = dict(url=url, drop_pending_updates=drop_pending_updates)
+        if secret_token:
+            params["secret_token"] = secret_token
+        if allowed_updates is not None:
+            params["allowed_updates"] = dumps(allowed_updates)
+        if max_connections:
+            params["max_connections"] = max_connections
+        result = await self._call_api(
+            "setWebhook",
+            **params,
+        )
+        return result  # noqa, type: ignore
+
+    async def delete_webhook(
+        self,
+        drop_pending_updates: bool = False,
+    ) -> bool:
+        result = await self._call_api(
+            "deleteWebhook",
+            drop_pending_updates=drop_pending_updates,
+        )
+        return result  # noqa, type: ignore
+
     async def send_message(
         self,
         chat_id: int,
@@ -96,9 +247,11 @@ class TelegramBotApi:
         reply_to_message_id: Optional[int] = None,
         parse_mode: str = "html",
         disable_web_page_preview: bool = False,
+        priority: Optional[Priorities] = None,
     ) -> models.Message:
         result = await self._call_api(
             "sendmessage",
+            priority=priority,
             chat_id=chat_id,
             text=text,
             reply_to_message_id=reply_to_message_id,
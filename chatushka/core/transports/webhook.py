@@ -0,0 +1,160 @@
+from asyncio import AbstractServer, IncompleteReadError, LimitOverrunError, StreamReader, StreamWriter
+from asyncio import TimeoutError as AsyncTimeoutError
+from asyncio import start_server, wait_for
+from hmac import compare_digest
+from http import HTTPStatus
+from json import JSONDecodeError, loads
+from logging import getLogger
+from typing import Any, Awaitable, Callable, NamedTuple, Optional
+
+from pydantic import ValidationError
+
+from chatushka.core.transports.models import Update
+
+logger = getLogger(__name__)
+
+SECRET_TOKEN_HEADER = "x-telegram-bot-api-secret-token"
+
+_MAX_BODY_SIZE = 1024 * 1024
+_READ_TIMEOUT = 10
+
+
+class HttpRequest(NamedTuple):
+    method: str
+    path: str
+    headers: dict[str, str]
+    body: bytes
+
+
+async def read_http_request(
+    reader: StreamReader,
+    max_body_size: int = _MAX_BODY_SIZE,
+) -> Optional[HttpRequest]:
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except (IncompleteReadError, LimitOverrunError):
+        return None
+    request_line, *header_lines = head.decode("latin-1").rstrip("\r\n").split("\r\n")
+    try:
+        method, path, _ = request_line.split(" ", 2)
+    except ValueError:
+        return None
+    headers = {}
+    for line in header_lines:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        return None
+    if length < 0 or length > max_body_size:
+        return None
+    try:
+        body = await reader.readexactly(length) if length else b""
+    except IncompleteReadError:
+        return None
+    return HttpRequest(method=method.upper(), path=path, headers=headers, body=body)
+
+
+async def write_http_response(
+    writer: StreamWriter,
+    status: HTTPStatus,
+    body: bytes = b"",
+    content_type: str = "text/plain; charset=utf-8",
+) -> None:
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+
+class WebhookReceiver:
+    def __init__(
+        self,
+        callback: Callable[[Update], Awaitable[Any]],
+        secret_token: Optional[str] = None,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        path: str = "/",
+    ) -> None:
+        self.callback = callback
+        self.secret_token = secret_token
+        self.host = host
+        self.port = port
+        self.path = path or "/"
+        self._server: Optional[AbstractServer] = None
+
+    @property
+    def sockets_names(self) -> list[tuple[str, int]]:
+        if not self._server:
+            return []
+        return [sock.getsockname()[:2] for sock in self._server.sockets]
+
+    async def start(self) -> None:
+        self._server = await start_server(self._handle_connection, self.host, self.port)
+        logger.info(f"Webhook receiver is listening on {self.sockets_names}")
+
+    async def serve_forever(self) -> None:
+        if not self._server:
+            await self.start()
+        await self._server.serve_forever()  # type: ignore
+
+    async def close(self) -> None:
+        if not self._server:
+            return
+        self._server.close()
+        await self._server.wait_closed()
+        self._server = None
+
+    async def _handle_connection(
+        self,
+        reader: StreamReader,
+        writer: StreamWriter,
+    ) -> None:
+        try:
+            try:
+                request = await wait_for(read_http_request(reader), timeout=_READ_TIMEOUT)
+            except AsyncTimeoutError:
+                request = None
+            if not request:
+                await write_http_response(writer, HTTPStatus.BAD_REQUEST)
+                return
+            status = await self._handle_request(request)
+            await write_http_response(writer, status)
+        except ConnectionError as err:
+            logger.debug(err)
+        finally:
+            writer.close()
+
+    async def _handle_request(
+        self,
+        request: HttpRequest,
+    ) -> HTTPStatus:
+        if request.path.split("?", 1)[0] != self.path:
+            return HTTPStatus.NOT_FOUND
+        if request.method != "POST":
+            return HTTPStatus.METHOD_NOT_ALLOWED
+        if self.secret_token and not compare_digest(
+            request.headers.get(SECRET_TOKEN_HEADER, "").encode(),
+            self.secret_token.encode(),
+        ):
+            logger.warning("Webhook request with invalid secret token")
+            return HTTPStatus.UNAUTHORIZED
+        try:
+            update = Update(**loads(request.body))
+        except (JSONDecodeError, TypeError, UnicodeDecodeError):
+            return HTTPStatus.BAD_REQUEST
+        except ValidationError as err:
+            logger.debug(err)
+            return HTTPStatus.OK
+        try:
+            await self.callback(update)
+        except Exception:  # noqa, pylint: disable=broad-except
+            # the update is not acknowledged, so Telegram delivers it again
+            logger.exception(f"Unable to accept update {update.update_id}")
+            return HTTPStatus.SERVICE_UNAVAILABLE
+        return HTTPStatus.OK
@@ -0,0 +1,3 @@
+from chatushka.webui.server import WebUIServer
+
+__all__ = ("WebUIServer",)
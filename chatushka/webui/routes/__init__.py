@@ -0,0 +1,13 @@
+from chatushka.webui.routes.metrics import metrics_route
+from chatushka.webui.routes.models import ROUTE_TYPING, HttpResponse
+
+ROUTES: dict[str, ROUTE_TYPING] = {
+    "/metrics": metrics_route,
+}
+
+__all__ = (
+    "ROUTES",
+    "ROUTE_TYPING",
+    "HttpResponse",
+    "metrics_route",
+)
@@ -0,0 +1,11 @@
+from http import HTTPStatus
+
+from chatushka.core.metrics import PROMETHEUS_CONTENT_TYPE, REGISTRY
+from chatushka.core.transports.webhook import HttpRequest
+from chatushka.webui.routes.models import HttpResponse
+
+
+async def metrics_route(
+    request: HttpRequest,  # noqa, pylint: disable=unused-argument
+) -> HttpResponse:
+    return HttpResponse(HTTPStatus.OK, REGISTRY.render().encode(), PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,13 @@
+from http import HTTPStatus
+from typing import Awaitable, Callable, NamedTuple
+
+from chatushka.core.transports.webhook import HttpRequest
+
+
+class HttpResponse(NamedTuple):
+    status: HTTPStatus
+    body: bytes = b""
+    content_type: str = "text/plain; charset=utf-8"
+
+
+ROUTE_TYPING = Callable[[HttpRequest], Awaitable[HttpResponse]]
@@ -0,0 +1,75 @@
+from asyncio import AbstractServer, StreamReader, StreamWriter
+from asyncio import TimeoutError as AsyncTimeoutError
+from asyncio import start_server, wait_for
+from http import HTTPStatus
+from logging import getLogger
+from typing import Optional
+
+from chatushka.core.transports.webhook import HttpRequest, read_http_request, write_http_response
+from chatushka.webui.routes import ROUTE_TYPING, ROUTES, HttpResponse
+
+logger = getLogger(__name__)
+
+_READ_TIMEOUT = 10
+_MAX_BODY_SIZE = 64 * 1024
+
+
+class WebUIServer:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 9090,
+        routes: Optional[dict[str, ROUTE_TYPING]] = None,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.routes = dict(ROUTES if routes is None else routes)
+        self._server: Optional[AbstractServer] = None
+
+    @property
+    def sockets_names(self) -> list[tuple[str, int]]:
+        if not self._server:
+            return []
+        return [sock.getsockname()[:2] for sock in self._server.sockets]
+
+    async def start(self) -> None:
+        self._server = await start_server(self._handle_connection, self.host, self.port)
+        logger.info(f"Web UI is listening on {self.sockets_names}")
+
+    async def close(self) -> None:
+        if not self._server:
+            return
+        self._server.close()
+        await self._server.wait_closed()
+        self._server = None
+
+    async def _handle_connection(
+        self,
+        reader: StreamReader,
+        writer: StreamWriter,
+    ) -> None:
+        try:
+            try:
+                request = await wait_for(read_http_request(reader, _MAX_BODY_SIZE), timeout=_READ_TIMEOUT)
+            except AsyncTimeoutError:
+                request = None
+            response = await self._handle_request(request) if request else HttpResponse(HTTPStatus.BAD_REQUEST)
+            await write_http_response(writer, response.status, response.body, response.content_type)
+        except ConnectionError as err:
+            logger.debug(err)
+        finally:
+            writer.close()
+
+    async def _handle_request(
+        self,
+        request: HttpRequest,
+    ) -> HttpResponse:
+        if not (route := self.routes.get(request.path.split("?", 1)[0])):
+            return HttpResponse(HTTPStatus.NOT_FOUND)
+        if request.method != "GET":
+            return HttpResponse(HTTPStatus.METHOD_NOT_ALLOWED)
+        try:
+            return await route(request)
+        except Exception:  # noqa, pylint: disable=broad-except
+            logger.exception(f"Error occurred in route {request.path}")
+            return HttpResponse(HTTPStatus.INTERNAL_SERVER_ERROR)
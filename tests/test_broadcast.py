@@ -0,0 +1,69 @@
+from asyncio import CancelledError, Event, ensure_future, run
+from typing import Optional
+
+from pytest import raises
+
+from chatushka.core.transports.broadcast import BroadcastCheckpoint, Broadcaster, MemoryBroadcastCheckpoints
+from chatushka.core.transports.exceptions import TelegramBotApiError
+
+_BROADCAST_ID = "broadcast"
+
+
+class _FakeSend:
+    def __init__(
+        self,
+        errors: Optional[dict[int, Exception]] = None,
+        blocked: Optional[int] = None,
+    ) -> None:
+        self.errors = errors or {}
+        self.blocked = blocked
+        self.is_blocked = Event()
+        self.sent: list[int] = []
+
+    async def __call__(
+        self,
+        chat_id: int,
+    ) -> None:
+        if chat_id == self.blocked:
+            self.is_blocked.set()
+            await Event().wait()
+        if error := self.errors.get(chat_id):
+            raise error
+        self.sent.append(chat_id)
+
+
+def test_failing_chats_do_not_stop_broadcast() -> None:
+    send = _FakeSend(
+        errors={
+            3: TelegramBotApiError("Forbidden", error_code=403, description="bot was kicked"),
+            7: ConnectionError("connection lost"),
+        }
+    )
+    checkpoints = MemoryBroadcastCheckpoints()
+    report = run(Broadcaster(None, checkpoints=checkpoints).run(range(10), send))  # type: ignore
+    assert sorted(send.sent) == [0, 1, 2, 4, 5, 6, 8, 9]
+    assert (report.sent, report.failed, report.run_sent, report.run_failed) == (8, 2, 8, 2)
+    assert sorted((failure.chat_id, failure.error_code) for failure in report.failures) == [(3, 403), (7, None)]
+    assert not checkpoints.checkpoints
+
+
+def test_interrupted_broadcast_is_resumed_without_duplicates() -> None:
+    checkpoints = MemoryBroadcastCheckpoints()
+    broadcaster = Broadcaster(None, checkpoints=checkpoints, max_in_flight=1)  # type: ignore
+    interrupted = _FakeSend(errors={2: TelegramBotApiError("Bad Request", error_code=400)}, blocked=5)
+    resumed = _FakeSend()
+
+    async def _test() -> None:
+        task = ensure_future(broadcaster.run(range(10), interrupted, broadcast_id=_BROADCAST_ID))
+        await interrupted.is_blocked.wait()
+        task.cancel()
+        with raises(CancelledError):
+            await task
+        assert checkpoints.checkpoints[_BROADCAST_ID] == BroadcastCheckpoint(position=5, sent=4, failed=1)
+        report = await broadcaster.run(range(10), resumed, broadcast_id=_BROADCAST_ID)
+        assert (report.sent, report.failed, report.run_sent, report.run_failed) == (9, 1, 5, 0)
+        assert report.failures == []
+
+    run(_test())
+    assert interrupted.sent + resumed.sent == [0, 1, 3, 4, 5, 6, 7, 8, 9]
+    assert not checkpoints.checkpoints
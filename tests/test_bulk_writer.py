@@ -0,0 +1,257 @@
+from asyncio import run
+from typing import Any, Optional
+
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from pytest import MonkeyPatch, fixture
+
+from chatushka.core.services.mongodb.bulk_writer import BulkWriteStats, MongoDBBulkWriter
+from chatushka.core.services.mongodb.wrapper import MongoDBWrapper
+
+_COLLECTION = "documents"
+_SHUTDOWN_IN_PROGRESS = 91
+_DUPLICATE_KEY = 11000
+
+
+class _FakeCollection:
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, list[Any], bool]] = []
+        # error codes by indexes of operations failing in the next calls, None fails the whole call
+        self.failures: list[Optional[dict[int, int]]] = []
+
+    def _fail(
+        self,
+        operations: list[Any],
+        ordered: bool,
+    ) -> None:
+        if not self.failures:
+            return
+        if (codes := self.failures.pop(0)) is None:
+            raise ConnectionError("connection lost")
+        indexes = sorted(codes)
+        if ordered:
+            indexes = indexes[:1]
+        raise BulkWriteError(
+            {
+                "writeErrors": [{"index": index, "code": codes[index], "errmsg": "failed"} for index in indexes],
+                "nInserted": len(operations) - len(indexes),
+            }
+        )
+
+    async def insert_many(
+        self,
+        documents: list[dict[str, Any]],
+        ordered: bool = True,
+    ) -> None:
+        self.calls.append(("insert_many", documents, ordered))
+        self._fail(documents, ordered)
+
+    async def bulk_write(
+        self,
+        operations: list[Any],
+        ordered: bool = True,
+    ) -> None:
+        self.calls.append(("bulk_write", operations, ordered))
+        self._fail(operations, ordered)
+
+
+@fixture
+def collection(
+    monkeypatch: MonkeyPatch,
+) -> _FakeCollection:
+    monkeypatch.setenv("BOT_MONGODB_DSN", "mongodb://127.0.0.1:9")
+    fake = _FakeCollection()
+    MongoDBWrapper().client = {MongoDBBulkWriter().database: {_COLLECTION: fake}}
+    return fake
+
+
+@fixture
+def writer(
+    collection: _FakeCollection,  # noqa, pylint: disable=unused-argument,redefined-outer-name
+) -> MongoDBBulkWriter:
+    # the writer is a singleton, its state is reset between tests
+    instance = MongoDBBulkWriter()
+    instance.stats = BulkWriteStats()
+    instance.max_batch_size = 500
+    instance.max_attempts = 3
+    instance.max_buffered = 10_000
+    instance._has_space = None  # type: ignore
+    instance._flush_needed = None  # type: ignore
+    instance._buffers = {}  # type: ignore
+    instance._buffered = 0  # type: ignore
+    instance._is_closing = False  # type: ignore
+    return instance
+
+
+def test_inserts_are_written_unordered_from_raw_documents(
+    writer: MongoDBBulkWriter,  # pylint: disable=redefined-outer-name
+    collection: _FakeCollection,  # pylint: disable=redefined-outer-name
+) -> None:
+    documents = [{"_id": number} for number in range(3)]
+
+    async def _test() -> None:
+        for document in documents:
+            await writer.insert(_COLLECTION, document)
+        await writer.flush()
+
+    run(_test())
+    assert collection.calls == [("insert_many", documents, False)]
+    assert writer.stats.written == 3
+    assert writer.buffered == 0
+
+
+def test_batches_with_updates_are_ordered(
+    writer: MongoDBBulkWriter,  # pylint: disable=redefined-outer-name
+    collection: _FakeCollection,  # pylint: disable=redefined-outer-name
+) -> None:
+    async def _test() -> None:
+        await writer.insert(_COLLECTION, {"_id": 1})
+        await writer.upsert(_COLLECTION, {"_id": 1}, {"$set": {"value": 1}})
+        await writer.upsert(_COLLECTION, {"_id": 1}, {"$set": {"value": 2}})
+        await writer.flush()
+
+    run(_test())
+    [(method, operations, ordered)] = collection.calls
+    assert (method, ordered) == ("bulk_write", True)
+    assert operations == [
+        InsertOne({"_id": 1}),
+        UpdateOne({"_id": 1}, {"$set": {"value": 1}}, upsert=True),
+        UpdateOne({"_id": 1}, {"$set": {"value": 2}}, upsert=True),
+    ]
+
+
+def test_failed_operations_are_retried_in_order(
+    writer: MongoDBBulkWriter,  # pylint: disable=redefined-outer-name
+    collection: _FakeCollection,  # pylint: disable=redefined-outer-name
+) -> None:
+    writer.max_batch_size = 2
+    updates = [UpdateOne({"_id": 1}, {"$set": {"value": value}}, upsert=True) for value in range(4)]
+
+    async def _test() -> None:
+        for update in updates:
+            await writer.write(_COLLECTION, update)
+        collection.failures = [{1: _SHUTDOWN_IN_PROGRESS}]
+        await writer.flush()
+        # the failed update and the batch after it wait for the next flush
+        assert writer.buffered == 3
+        await writer.write(_COLLECTION, updates[0])
+        await writer.flush()
+
+    run(_test())
+    assert [operations for _, operations, _ in collection.calls] == [
+        updates[:2],
+        updates[1:3],
+        [updates[3], updates[0]],
+    ]
+    assert writer.buffered == 0
+    assert (writer.stats.written, writer.stats.failed, writer.stats.dropped) == (5, 1, 0)
+
+
+def test_unordered_inserts_retry_only_failed_documents(
+    writer: MongoDBBulkWriter,  # pylint: disable=redefined-outer-name
+    collection: _FakeCollection,  # pylint: disable=redefined-outer-name
+) -> None:
+    documents = [{"_id": number} for number in range(4)]
+
+    async def _test() -> None:
+        for document in documents:
+            await writer.insert(_COLLECTION, document)
+        collection.failures = [{1: _SHUTDOWN_IN_PROGRESS, 3: _SHUTDOWN_IN_PROGRESS}]
+        await writer.flush()
+        await writer.flush()
+
+    run(_test())
+    assert [documents for _, documents, _ in collection.calls] == [documents, [documents[1], documents[3]]]
+    assert (writer.stats.written, writer.stats.failed, writer.stats.dropped) == (4, 2, 0)
+
+
+def test_operations_are_dropped_after_max_attempts(
+    writer: MongoDBBulkWriter,  # pylint: disable=redefined-outer-name
+    collection: _FakeCollection,  # pylint: disable=redefined-outer-name
+) -> None:
+    writer.max_attempts = 2
+
+    async def _test() -> None:
+        await writer.insert(_COLLECTION, {"_id": 1})
+        await writer.insert(_COLLECTION, {"_id": 2})
+        collection.failures = [None, None]
+        await writer.flush()
+        assert writer.buffered == 2
+        await writer.flush()
+
+    run(_test())
+    assert len(collection.calls) == 2
+    assert writer.buffered == 0
+    assert (writer.stats.written, writer.stats.failed, writer.stats.dropped) == (0, 4, 2)
+
+
+def test_final_flush_does_not_retry(
+    writer: MongoDBBulkWriter,  # pylint: disable=redefined-outer-name
+    collection: _FakeCollection,  # pylint: disable=redefined-outer-name
+) -> None:
+    async def _test() -> None:
+        await writer.insert(_COLLECTION, {"_id": 1})
+        collection.failures = [None]
+        await writer.shutdown_event_handler()
+
+    run(_test())
+    assert len(collection.calls) == 1
+    assert writer.buffered == 0
+    assert writer.stats.dropped == 1
+
+
+def test_failing_update_does_not_drop_later_operations(
+    writer: MongoDBBulkWriter,  # pylint: disable=redefined-outer-name
+    collection: _FakeCollection,  # pylint: disable=redefined-outer-name
+) -> None:
+    writer.max_attempts = 2
+    updates = [UpdateOne({"_id": number}, {"$set": {"value": number}}, upsert=True) for number in range(3)]
+
+    async def _test() -> None:
+        for update in updates:
+            await writer.write(_COLLECTION, update)
+        # the first update fails every time, the ones after it are not attempted by an ordered write
+        collection.failures = [{0: _SHUTDOWN_IN_PROGRESS}, {0: _SHUTDOWN_IN_PROGRESS}]
+        await writer.flush()
+        await writer.flush()
+        await writer.flush()
+
+    run(_test())
+    assert [operations for _, operations, _ in collection.calls] == [updates, updates, updates[1:]]
+    assert writer.buffered == 0
+    assert (writer.stats.written, writer.stats.failed, writer.stats.dropped) == (2, 2, 1)
+
+
+def test_permanent_errors_are_dropped_at_once(
+    writer: MongoDBBulkWriter,  # pylint: disable=redefined-outer-name
+    collection: _FakeCollection,  # pylint: disable=redefined-outer-name
+) -> None:
+    documents = [{"_id": number} for number in range(3)]
+
+    async def _test() -> None:
+        for document in documents:
+            await writer.insert(_COLLECTION, document)
+        collection.failures = [{0: _DUPLICATE_KEY, 2: _SHUTDOWN_IN_PROGRESS}]
+        await writer.flush()
+        await writer.flush()
+
+    run(_test())
+    assert [documents for _, documents, _ in collection.calls] == [documents, [documents[2]]]
+    assert writer.buffered == 0
+    assert (writer.stats.written, writer.stats.failed, writer.stats.dropped) == (2, 2, 1)
+
+
+def test_buffer_is_bounded_before_startup(
+    writer: MongoDBBulkWriter,  # pylint: disable=redefined-outer-name
+    collection: _FakeCollection,  # pylint: disable=redefined-outer-name
+) -> None:
+    writer.max_buffered = 10
+
+    async def _test() -> None:
+        for number in range(25):
+            await writer.insert(_COLLECTION, {"_id": number})
+            assert writer.buffered <= writer.max_buffered
+
+    run(_test())
+    assert len(collection.calls) == 2
+    assert writer.stats.written == 20
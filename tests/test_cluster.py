@@ -0,0 +1,148 @@
+from asyncio import run
+from collections import defaultdict
+from functools import partial
+from os import getpid, kill
+from pathlib import Path
+from signal import SIGKILL
+
+from benchmarks.fake_api import FakeBotApiServer
+from benchmarks.utils import wait_for_condition
+
+from chatushka.core.bot import ChatushkaBot
+from chatushka.core.cluster.brokers import MultiprocessingBroker, get_update_partition
+from chatushka.core.cluster.supervisor import ClusterSupervisor
+from chatushka.core.metrics import REGISTRY
+from chatushka.core.models import EventTypes
+from chatushka.core.transports.models import Message, Update
+from chatushka.core.transports.telegram_bot_api import TelegramBotApi
+
+_WORKERS = 3
+_CHATS = [-1_000_000_000_000 - number for number in range(12)]
+_MESSAGES = 50
+_BUFFERED_MESSAGES = 10
+_TIMEOUT = 60
+
+
+def _record(
+    log_dir: str,
+    message: Message,
+) -> None:
+    # a line is written at once, so a killed worker leaves whole lines behind
+    with open(Path(log_dir) / f"{getpid()}.log", "a", encoding="utf-8") as log:
+        log.write(f"{message.chat.id} {message.message_id}\n")
+
+
+def _make_worker_bot(
+    token: str,
+    api_url: str,
+    log_dir: str,
+) -> ChatushkaBot:
+    bot = ChatushkaBot(token, api=TelegramBotApi(token, base_url=api_url))
+    bot.add_handler(EventTypes.MESSAGE, partial(_record, log_dir), include_in_help=False)
+    return bot
+
+
+def _make_update(
+    chat_id: int,
+    message_id: int,
+) -> Update:
+    return Update(
+        update_id=message_id,
+        message={
+            "message_id": message_id,
+            "from": {"id": 42, "is_bot": False, "first_name": "Test"},
+            "chat": {"id": chat_id, "type": "supergroup"},
+            "text": "text",
+        },
+    )
+
+
+def _read_logs(
+    log_dir: Path,
+) -> dict[int, list[tuple[int, int]]]:
+    logs = {}
+    for path in log_dir.glob("*.log"):
+        lines = path.read_text(encoding="utf-8").splitlines()
+        logs[int(path.stem)] = [(int(chat_id), int(message_id)) for chat_id, message_id in map(str.split, lines)]
+    return logs
+
+
+def _count_handled(
+    log_dir: Path,
+) -> int:
+    return sum(len(handled) for handled in _read_logs(log_dir).values())
+
+
+def _count_exported_handlers(
+    total: int,
+) -> bool:
+    # handlers run in workers, their metrics are exported by the leader with a worker label
+    counts = [
+        int(line.rpartition(" ")[2])
+        for line in REGISTRY.render().splitlines()
+        if line.startswith('chatushka_handler_duration_seconds_count{worker="')
+    ]
+    return len(counts) == _WORKERS and sum(counts) == total
+
+
+def test_updates_are_partitioned_and_survive_worker_restart(
+    tmp_path: Path,
+) -> None:
+    async def _test() -> None:
+        server = FakeBotApiServer()
+        await server.start()
+        broker = MultiprocessingBroker(_WORKERS, heartbeat_interval=0.2)
+        supervisor = ClusterSupervisor(
+            partial(_make_worker_bot, server.token, server.url, str(tmp_path)),
+            broker,
+            heartbeat_timeout=5,
+        )
+        await supervisor.start()
+        try:
+            assert await wait_for_condition(
+                lambda: all(state.heartbeat for state in supervisor.workers.values()),
+                _TIMEOUT,
+            )
+            for message_id in range(1, _MESSAGES + 1):
+                for chat_id in _CHATS:
+                    await ChatushkaBot._publish(broker, _make_update(chat_id, message_id))
+            assert await wait_for_condition(lambda: _count_handled(tmp_path) == len(_CHATS) * _MESSAGES, _TIMEOUT)
+            assert await wait_for_condition(lambda: _count_exported_handlers(len(_CHATS) * _MESSAGES), _TIMEOUT)
+
+            killed = supervisor.workers[0].process
+            kill(killed.pid, SIGKILL)  # type: ignore
+            assert await wait_for_condition(lambda: not killed.is_alive(), _TIMEOUT)
+            # the partition has no worker now, so its updates are buffered by the leader until the restart
+            buffered_chats = [
+                chat_id for chat_id in _CHATS if get_update_partition(_make_update(chat_id, 1), _WORKERS) == 0
+            ]
+            for message_id in range(_MESSAGES + 1, _MESSAGES + _BUFFERED_MESSAGES + 1):
+                for chat_id in buffered_chats:
+                    await ChatushkaBot._publish(broker, _make_update(chat_id, message_id))
+            total = len(_CHATS) * _MESSAGES + len(buffered_chats) * _BUFFERED_MESSAGES
+            assert await wait_for_condition(lambda: _count_handled(tmp_path) == total, _TIMEOUT)
+            restarted = supervisor.workers[0].process
+            assert restarted.pid != killed.pid
+            processes = [state.process for state in supervisor.workers.values()]
+            partitions = {state.process.pid: partition for partition, state in supervisor.workers.items()}
+        finally:
+            await supervisor.close()
+            await server.close()
+
+        assert [process.exitcode for process in processes] == [0] * _WORKERS
+        logs = _read_logs(tmp_path)
+        assert set(logs) == set(partitions) | {killed.pid}
+        handled: dict[int, list[int]] = defaultdict(list)
+        # the restarted worker handles messages after the killed one
+        for pid, messages in sorted(logs.items(), key=lambda item: item[0] == restarted.pid):
+            for chat_id, message_id in messages:
+                assert get_update_partition(_make_update(chat_id, message_id), _WORKERS) == partitions.get(pid, 0)
+                handled[chat_id].append(message_id)
+        for chat_id in _CHATS:
+            messages = _MESSAGES + (_BUFFERED_MESSAGES if chat_id in buffered_chats else 0)
+            assert handled[chat_id] == list(range(1, messages + 1))
+        assert {message_id for _, message_id in logs[restarted.pid]} == set(
+            range(_MESSAGES + 1, _MESSAGES + _BUFFERED_MESSAGES + 1)
+        )
+
+    run(_test())
@@ -0,0 +1,116 @@
+from asyncio import run, sleep, wait
+from os import stat, utime
+from pathlib import Path
+
+from pytest import MonkeyPatch, fixture
+
+from chatushka.bot.internal import data_dir
+from chatushka.bot.internal.data_dir import ContentPack, YamlContentPack
+
+
+@fixture(autouse=True)
+def _cache_dir(
+    tmp_path: Path,
+    monkeypatch: MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(data_dir, "PACKS_CACHE_DIR", tmp_path / "cache")
+
+
+def _write(
+    path: Path,
+    text: str,
+) -> None:
+    mtime_ns = stat(path).st_mtime_ns if path.exists() else 0
+    path.write_text(text, encoding="utf8")
+    # coarse filesystem timestamps would hide a quick rewrite
+    utime(path, ns=(mtime_ns + 1_000_000, mtime_ns + 1_000_000))
+
+
+def test_txt_pack_is_compiled_into_cache(
+    tmp_path: Path,
+) -> None:
+    source = tmp_path / "quotes.txt"
+    _write(source, "first\n\nsecond\n")
+    pack = ContentPack(source, check_interval=0)
+    assert [pack[index] for index in range(len(pack))] == ["first", "second"]
+    assert pack.path.parent == tmp_path / "cache"
+    assert pack.path.read_bytes() == source.read_bytes()
+
+    # truncating the source in place does not touch pages of the mapped pack
+    with open(source, "r+b") as fh:
+        fh.truncate(0)
+    assert pack._state.entry(1) == "second"  # type: ignore
+    assert len(pack) == 0
+    pack.close()
+
+
+def test_yaml_pack_is_compiled_into_cache(
+    tmp_path: Path,
+) -> None:
+    source = tmp_path / "answers.yaml"
+    _write(source, "ru:\n  - да\n  - нет\nen:\n  - yes\n")
+    pack = YamlContentPack(source, "ru")
+    assert sorted(pack[index] for index in range(len(pack))) == ["да", "нет"]
+    assert pack.path.name.startswith("answers.ru.")
+    pack.close()
+
+
+def test_pack_is_reindexed_off_the_loop(
+    tmp_path: Path,
+) -> None:
+    async def _test() -> None:
+        source = tmp_path / "quotes.txt"
+        _write(source, "first\n")
+        pack = ContentPack(source, check_interval=0)
+        assert len(pack) == 1
+        _write(source, "first\nsecond\nthird\n")
+        # the old index is served until the new one is built in the executor
+        assert len(pack) == 1
+        refreshing = pack._refreshing
+        assert refreshing is not None
+        await refreshing
+        await sleep(0)
+        assert pack._refreshing is None
+        assert len(pack) == 3
+        pack.close()
+
+    run(_test())
+
+
+def test_reload_failure_keeps_old_entries(
+    tmp_path: Path,
+) -> None:
+    async def _test() -> None:
+        source = tmp_path / "quotes.txt"
+        _write(source, "first\n")
+        pack = ContentPack(source, check_interval=0)
+        assert pack.pick() == "first"
+        source.unlink()
+        assert pack.pick() == "first"
+        await wait([pack._refreshing])  # type: ignore
+        await sleep(0)
+        assert pack._refreshing is None
+        assert pack.pick() == "first"
+        pack.close()
+
+    run(_test())
+
+
+def test_pack_is_preloaded_in_executor(
+    tmp_path: Path,
+    monkeypatch: MonkeyPatch,
+) -> None:
+    source = tmp_path / "quotes.txt"
+    _write(source, "first\nsecond\n")
+    pack = ContentPack(source, check_interval=60)
+
+    def _reload() -> None:
+        raise AssertionError("the pack is loaded on the loop")
+
+    async def _test() -> None:
+        await pack.preload()
+        monkeypatch.setattr(pack, "reload", _reload)
+        assert sorted(pack[index] for index in range(len(pack))) == ["first", "second"]
+
+    run(_test())
+    pack.close()
@@ -0,0 +1,143 @@
+from asyncio import Event, ensure_future, run, sleep
+from typing import Any
+
+from pytest import raises
+
+from chatushka.core.dispatcher import UpdatesDispatcher
+from chatushka.core.transports.models import Update
+
+
+def _make_update(
+    update_id: int,
+    chat_id: int,
+) -> Update:
+    return Update(
+        update_id=update_id,
+        message={
+            "message_id": update_id,
+            "from": {"id": 42, "is_bot": False, "first_name": "Test"},
+            "chat": {"id": chat_id, "type": "supergroup"},
+            "text": "hello",
+        },
+    )
+
+
+async def _spin(
+    cycles: int = 10,
+) -> None:
+    for _ in range(cycles):
+        await sleep(0)
+
+
+def test_updates_of_a_chat_are_handled_in_order() -> None:
+    handled: list[tuple[int, int]] = []
+
+    async def _handler(
+        update: Update,
+    ) -> None:
+        # later updates finish faster, so only the dispatcher keeps them in order
+        await _spin(10 - update.update_id % 10)
+        handled.append((update.chat.id, update.update_id))  # type: ignore
+
+    async def _test() -> None:
+        dispatcher = UpdatesDispatcher(_handler)
+        for update_id in range(30):
+            await dispatcher.put(_make_update(update_id, update_id % 3))
+        await dispatcher.close()
+
+    run(_test())
+    assert len(handled) == 30
+    for chat_id in range(3):
+        assert [update_id for chat, update_id in handled if chat == chat_id] == list(range(chat_id, 30, 3))
+    # chats are handled concurrently, not one after another
+    assert [chat for chat, _ in handled[:3]] != [0, 0, 0]
+
+
+def test_chats_are_handled_concurrently_up_to_the_limit() -> None:
+    active, peak = 0, 0
+    release = Event()
+
+    async def _handler(
+        update: Update,  # noqa, pylint: disable=unused-argument
+    ) -> None:
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await release.wait()
+        active -= 1
+
+    async def _test() -> None:
+        dispatcher = UpdatesDispatcher(_handler, max_concurrency=3)
+        for chat_id in range(10):
+            await dispatcher.put(_make_update(chat_id, chat_id))
+        await _spin()
+        assert active == 3
+        assert dispatcher.active_shards == 10
+        release.set()
+        await dispatcher.close()
+        assert dispatcher.pending == 0
+
+    run(_test())
+    assert peak == 3
+
+
+def test_full_backlog_blocks_put() -> None:
+    release = Event()
+
+    async def _handler(
+        update: Update,  # noqa, pylint: disable=unused-argument
+    ) -> None:
+        await release.wait()
+
+    async def _test() -> None:
+        dispatcher = UpdatesDispatcher(_handler, max_backlog=2)
+        await dispatcher.put(_make_update(1, 1))
+        await dispatcher.put(_make_update(2, 2))
+        blocked: Any = ensure_future(dispatcher.put(_make_update(3, 1)))
+        await _spin()
+        assert not blocked.done()
+        assert dispatcher.pending == 2
+        release.set()
+        await blocked
+        await dispatcher.close()
+        assert dispatcher.pending == 0
+
+    run(_test())
+
+
+def test_close_drains_queued_updates() -> None:
+    handled: list[int] = []
+
+    async def _handler(
+        update: Update,
+    ) -> None:
+        await sleep(0.001)
+        handled.append(update.update_id)
+
+    async def _test() -> None:
+        dispatcher = UpdatesDispatcher(_handler)
+        for update_id in range(5):
+            await dispatcher.put(_make_update(update_id, 1))
+        await dispatcher.close()
+        assert dispatcher.queue_depths() == {}
+        with raises(RuntimeError):
+            await dispatcher.put(_make_update(5, 1))
+
+    run(_test())
+    assert handled == list(range(5))
+
+
+def test_close_cancels_updates_after_timeout() -> None:
+    async def _handler(
+        update: Update,  # noqa, pylint: disable=unused-argument
+    ) -> None:
+        await Event().wait()
+
+    async def _test() -> None:
+        dispatcher = UpdatesDispatcher(_handler)
+        await dispatcher.put(_make_update(1, 1))
+        await dispatcher.put(_make_update(2, 1))
+        await dispatcher.close(timeout=0.01)
+        assert dispatcher.active_shards == 0
+
+    run(_test())
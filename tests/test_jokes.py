@@ -0,0 +1,63 @@
+from asyncio import run
+
+from benchmarks.fake_api import FakeBotApiServer
+from benchmarks.utils import wait_for_condition
+
+from chatushka.bot.internal.jokes import BobukJokesService
+from chatushka.bot.matchers.bobuk_jokes import jokes_matcher
+from chatushka.core.transports.models import Update
+from chatushka.core.transports.telegram_bot_api import TelegramBotApi
+
+_NO_JOKES = "No jokes right now"
+_TIMEOUT = 10
+
+_UPDATE = Update(
+    update_id=1,
+    message={
+        "message_id": 7,
+        "from": {"id": 42, "is_bot": False, "first_name": "Test"},
+        "chat": {"id": -100500, "type": "supergroup"},
+        "text": "/joke",
+    },
+)
+
+
+def test_jokes_are_served_from_buffer_while_the_source_fails() -> None:
+    async def _test() -> None:
+        server = FakeBotApiServer()
+        await server.start()
+        api = TelegramBotApi(server.token, base_url=server.url)
+        service = BobukJokesService()
+        url, failures_threshold = service.url, service.failures_threshold
+        service.url = server.jokes_url
+        service.failures_threshold = 1
+        try:
+            await jokes_matcher.match(api, _UPDATE, should_call_matched=True)
+            assert server.last_messages[-1]["text"] == _NO_JOKES
+            assert server.last_messages[-1]["reply_to_message_id"] == "7"
+
+            await service.startup_event_handler()
+            assert await wait_for_condition(lambda: len(service) == service.capacity, _TIMEOUT)
+            await jokes_matcher.match(api, _UPDATE, should_call_matched=True)
+            assert server.last_messages[-1]["text"].startswith("Joke #")
+
+            service.url = f"{server.url}/unavailable"
+            while len(service) >= service.low_water_mark:
+                service.pop()
+            assert await wait_for_condition(lambda: service.is_circuit_open, _TIMEOUT)
+            # the buffer is served while the breaker is open
+            assert len(service)
+            await jokes_matcher.match(api, _UPDATE, should_call_matched=True)
+            assert server.last_messages[-1]["text"].startswith("Joke #")
+            while service.pop():
+                pass
+            assert service.is_circuit_open
+            await jokes_matcher.match(api, _UPDATE, should_call_matched=True)
+            assert server.last_messages[-1]["text"] == _NO_JOKES
+        finally:
+            await service.shutdown_event_handler()
+            service.url, service.failures_threshold = url, failures_threshold
+            await api.shutdown()
+            await server.close()
+
+    run(_test())
@@ -0,0 +1,313 @@
+from asyncio import run
+from bisect import bisect_left
+from functools import total_ordering
+from random import Random
+from time import perf_counter
+from typing import Any, AsyncIterator, Iterator, Optional
+
+from chatushka.core.services.mongodb.utils import (
+    _get_field,
+    _keyset_sort,
+    mongodb_keyset_find,
+    mongodb_paginated_find,
+    mongodb_stream_find,
+)
+
+_COMPARISONS = {
+    "$gt": lambda value, bound: value > bound,
+    "$gte": lambda value, bound: value >= bound,
+    "$lt": lambda value, bound: value < bound,
+    "$lte": lambda value, bound: value <= bound,
+}
+
+
+@total_ordering
+class _Descending:
+    def __init__(
+        self,
+        key: Any,
+    ) -> None:
+        self.key = key
+
+    def __eq__(
+        self,
+        other: object,
+    ) -> bool:
+        return isinstance(other, _Descending) and self.key == other.key
+
+    def __lt__(
+        self,
+        other: Any,
+    ) -> bool:
+        if not isinstance(other, _Descending):
+            return NotImplemented
+        return other.key < self.key
+
+
+class _After:
+    # goes after every key with the same prefix
+    def __lt__(
+        self,
+        other: Any,
+    ) -> bool:
+        return False
+
+    def __gt__(
+        self,
+        other: Any,
+    ) -> bool:
+        return not isinstance(other, _After)
+
+
+_AFTER = _After()
+
+
+def _order_key(
+    value: Any,
+    direction: int,
+) -> Any:
+    # like in MongoDB nulls and missing fields go before any value
+    key = (0, 0) if value is None else (1, value)
+    return key if direction > 0 else _Descending(key)
+
+
+def _matches_condition(
+    value: Any,
+    condition: Any,
+) -> bool:
+    if not isinstance(condition, dict):
+        return value == condition
+    for operator, bound in condition.items():
+        if operator == "$ne":
+            if value == bound:
+                return False
+        elif operator == "$exists":
+            if (value is not None) != bound:
+                return False
+        elif value is None or bound is None or not _COMPARISONS[operator](value, bound):
+            return False
+    return True
+
+
+def _matches(
+    document: dict[str, Any],
+    query: Optional[dict[str, Any]],
+) -> bool:
+    for field, condition in (query or {}).items():
+        if field == "$and":
+            if not all(_matches(document, sub_query) for sub_query in condition):
+                return False
+        elif field == "$or":
+            if not any(_matches(document, sub_query) for sub_query in condition):
+                return False
+        elif not _matches_condition(_get_field(document, field), condition):
+            return False
+    return True
+
+
+def _condition_bound(
+    condition: Any,
+    direction: int,
+) -> Optional[tuple[Any, bool]]:
+    if not isinstance(condition, dict):
+        return _order_key(condition, direction), False
+    bounds = []
+    for operator, bound in condition.items():
+        if operator == "$ne" and bound is None:
+            bounds.append((_order_key(None, direction), True))
+        elif operator in (("$gt", "$gte") if direction > 0 else ("$lt", "$lte")) and bound is not None:
+            bounds.append((_order_key(bound, direction), not operator.endswith("e")))
+    return max(bounds) if bounds else None
+
+
+def _lower_bound(
+    query: Optional[dict[str, Any]],
+    sort: list[tuple[str, int]],
+) -> Optional[tuple[Any, ...]]:
+    # the first key in sort order a query can match, like bounds of a compound index scan
+    bounds = []
+    prefix: list[Any] = []
+    for field, direction in sort:
+        if field not in (query or {}) or not (bound := _condition_bound(query[field], direction)):  # type: ignore
+            break
+        key, is_exclusive = bound
+        prefix.append(key)
+        if is_exclusive:
+            prefix.append(_AFTER)
+        if is_exclusive or isinstance(query[field], dict):  # type: ignore
+            break
+    if prefix:
+        bounds.append(tuple(prefix))
+    for sub_query in (query or {}).get("$and", ()):
+        if bound := _lower_bound(sub_query, sort):
+            bounds.append(bound)
+    if "$or" in (query or {}):
+        branches = [_lower_bound(sub_query, sort) for sub_query in query["$or"]]  # type: ignore
+        if all(branches):
+            bounds.append(min(branches))  # type: ignore
+    return max(bounds) if bounds else None
+
+
+class _FakeCursor:
+    def __init__(
+        self,
+        collection: "_FakeCollection",
+        query: Optional[dict[str, Any]],
+        sort: list[tuple[str, int]],
+    ) -> None:
+        self.collection = collection
+        self.query = query
+        self.sort = sort
+        self._skip = 0
+        self._limit = 0
+
+    def skip(
+        self,
+        number: int,
+    ) -> "_FakeCursor":
+        self._skip = number
+        return self
+
+    def limit(
+        self,
+        number: int,
+    ) -> "_FakeCursor":
+        self._limit = number
+        return self
+
+    def _walk(self) -> Iterator[dict[str, Any]]:
+        keys, documents = self.collection.get_index(self.sort)
+        start = 0
+        if bound := _lower_bound(self.query, self.sort):
+            start = bisect_left(keys, bound)
+        for document in documents[start:]:
+            self.collection.examined += 1
+            if _matches(document, self.query):
+                yield document
+
+    async def __aiter__(self) -> AsyncIterator[dict[str, Any]]:
+        returned = 0
+        for number, document in enumerate(self._walk()):
+            if number < self._skip:
+                continue
+            yield document
+            returned += 1
+            if returned == self._limit:
+                return
+
+
+class _FakeCollection:
+    def __init__(
+        self,
+        documents: list[dict[str, Any]],
+    ) -> None:
+        self.documents = documents
+        self.examined = 0
+        self._indexes: dict[tuple[tuple[str, int], ...], tuple[list[Any], list[dict[str, Any]]]] = {}
+
+    def get_index(
+        self,
+        sort: list[tuple[str, int]],
+    ) -> tuple[list[Any], list[dict[str, Any]]]:
+        # keys of documents in sort order and the documents
+        if (index := self._indexes.get(tuple(sort))) is None:
+            keyed = sorted(
+                (
+                    (tuple(_order_key(_get_field(document, field), direction) for field, direction in sort), document)
+                    for document in self.documents
+                ),
+                key=lambda item: item[0],
+            )
+            index = self._indexes[tuple(sort)] = ([key for key, _ in keyed], [document for _, document in keyed])
+        return index
+
+    def find(
+        self,
+        query: Optional[dict[str, Any]],
+        sort: Optional[list[tuple[str, int]]] = None,
+        projection: Optional[dict[str, int]] = None,  # noqa, pylint: disable=unused-argument
+    ) -> _FakeCursor:
+        return _FakeCursor(self, query, sort or [("_id", 1)])
+
+
+def _make_documents(
+    number: int,
+    seed: int = 0,
+) -> list[dict[str, Any]]:
+    random = Random(seed)
+    documents = []
+    for document_id in range(number):
+        document: dict[str, Any] = {"_id": document_id, "group": random.randrange(3)}
+        score = random.choice((None, "missing", random.randrange(10)))
+        if score != "missing":
+            document["score"] = score
+        documents.append(document)
+    return documents
+
+
+async def _read_all(
+    collection: _FakeCollection,
+    query: Optional[dict[str, Any]],
+    sort: list[tuple[str, int]],
+    per_page: int,
+) -> list[dict[str, Any]]:
+    return [
+        document
+        async for document in mongodb_stream_find(collection, query, batch_size=per_page, sort=sort)  # type: ignore
+    ]
+
+
+def test_pages_cover_documents_with_null_and_missing_fields() -> None:
+    documents = _make_documents(500)
+    collection = _FakeCollection(documents)
+    for sort in ([("score", 1)], [("score", -1)], [("score", -1), ("_id", -1)], [("group", 1), ("score", -1)]):
+        expected = collection.get_index(_keyset_sort(sort))[1]
+        for per_page in (1, 7, 100):
+            assert run(_read_all(collection, None, sort, per_page)) == expected, (sort, per_page)
+
+
+def test_pages_respect_the_query() -> None:
+    collection = _FakeCollection(_make_documents(500))
+    query = {"group": 1}
+    found = run(_read_all(collection, query, [("score", -1)], per_page=9))
+    expected = [
+        document for document in collection.get_index(_keyset_sort([("score", -1)]))[1] if document["group"] == 1
+    ]
+    assert found == expected
+
+
+def test_last_page_has_no_cursor() -> None:
+    collection = _FakeCollection(_make_documents(10))
+    page = run(mongodb_keyset_find(collection, None, per_page=10, sort=[("score", 1)]))  # type: ignore
+    assert len(page.documents) == 10
+    assert page.next_cursor is None
+
+
+def test_deep_pages_are_cheaper_than_skip() -> None:
+    collection = _FakeCollection(_make_documents(50_000))
+    sort = [("score", 1), ("_id", 1)]
+    per_page = 20
+    page_number = 2_000
+
+    async def _keyset_page() -> tuple[list[dict[str, Any]], float, int]:
+        cursor = None
+        for _ in range(page_number):
+            page = await mongodb_keyset_find(collection, None, per_page, cursor=cursor, sort=sort)  # type: ignore
+            cursor = page.next_cursor
+        collection.examined = 0
+        started_at = perf_counter()
+        page = await mongodb_keyset_find(collection, None, per_page, cursor=cursor, sort=sort)  # type: ignore
+        return page.documents, perf_counter() - started_at, collection.examined
+
+    async def _skip_page() -> tuple[list[dict[str, Any]], float, int]:
+        collection.examined = 0
+        started_at = perf_counter()
+        documents = await mongodb_paginated_find(collection, None, page_number, per_page, sort=sort)  # type: ignore
+        return documents, perf_counter() - started_at, collection.examined
+
+    keyset_documents, keyset_seconds, keyset_examined = run(_keyset_page())
+    skip_documents, skip_seconds, skip_examined = run(_skip_page())
+    assert keyset_documents == skip_documents
+    assert keyset_examined <= per_page + 1
+    assert skip_examined >= page_number * per_page
+    assert keyset_seconds < skip_seconds
@@ -0,0 +1,32 @@
+import tracemalloc
+from asyncio import run
+from math import inf, nan
+from pathlib import Path
+
+from chatushka.bot.matchers.profiling import _MAX_DURATION, _parse_duration
+from chatushka.core.profiling import RuntimeProfiler
+
+
+def test_duration_is_clamped() -> None:
+    assert _parse_duration(["5"], 10) == 5
+    assert _parse_duration(["1000"], 10) == _MAX_DURATION
+    assert _parse_duration([str(inf)], 10) == _MAX_DURATION
+    for args in ([], ["soon"], ["-5"], ["0"], [str(nan)]):
+        assert _parse_duration(args, 10) == 10
+
+
+def test_profile_is_written(
+    tmp_path: Path,
+) -> None:
+    profiler = RuntimeProfiler(tmp_path, interval=0.001)
+    report = run(profiler.capture(0.05))
+    assert not profiler.is_running
+    assert not tracemalloc.is_tracing()
+    assert report.duration >= 0.05
+    assert [path.name.split("-", 1)[1] for path in report.files] == [
+        "cpu.collapsed",
+        "blocked.collapsed",
+        "memory.collapsed",
+        "report.txt",
+    ]
+    assert all(path.exists() for path in report.files)
@@ -0,0 +1,81 @@
+from asyncio import run
+from typing import Any
+
+from chatushka.core.bot import ChatushkaBot
+from chatushka.core.matchers.commands import CommandsMatcher
+from chatushka.core.matchers.routing import RoutingTable
+from chatushka.core.models import EventTypes
+from chatushka.core.transports.models import Message, Update, UpdateKinds
+from chatushka.core.transports.telegram_bot_api import TelegramBotApi
+
+_TOKEN = "42:token"
+
+
+def _make_update(
+    **fields: Any,
+) -> Update:
+    return Update(
+        update_id=1,
+        message={
+            "message_id": 7,
+            "from": {"id": 42, "is_bot": False, "first_name": "Test"},
+            "chat": {"id": -100500, "type": "supergroup"},
+            **fields,
+        },
+    )
+
+
+def _make_bot(
+    handled: list[tuple[str, int]],
+) -> ChatushkaBot:
+    bot = ChatushkaBot(_TOKEN, api=TelegramBotApi(_TOKEN, base_url="http://127.0.0.1:9"))
+
+    def _on_message(message: Message) -> None:
+        handled.append(("message", message.message_id))
+
+    def _on_command(message: Message) -> None:
+        handled.append(("command", message.message_id))
+
+    commands = CommandsMatcher(prefixes=("/",))
+    commands.add_handler("ping", _on_command)
+    bot.add_matcher(commands)
+    bot.add_handler(EventTypes.MESSAGE, _on_message, include_in_help=False)
+    # the table is built on serve, after every matcher is added
+    bot.routing = RoutingTable(bot)
+    return bot
+
+
+def test_every_message_kind_reaches_message_handlers() -> None:
+    updates = {
+        "text": _make_update(text="/ping"),
+        "photo": _make_update(photo=[{"file_id": "id", "file_unique_id": "unique", "width": 1, "height": 1}]),
+        "sticker": _make_update(sticker={"file_id": "id", "file_unique_id": "unique"}),
+        "caption": _make_update(caption="/ping", photo=[]),
+        "new chat members": _make_update(new_chat_members=[{"id": 43, "is_bot": False, "first_name": "New"}]),
+    }
+
+    async def _test() -> dict[str, list[tuple[str, int]]]:
+        results = {}
+        for name, update in updates.items():
+            handled: list[tuple[str, int]] = []
+            bot = _make_bot(handled)
+            await bot.routing.dispatch(bot.api, update)
+            await bot.api.shutdown()
+            results[name] = handled
+        return results
+
+    assert run(_test()) == {
+        "text": [("message", 7), ("command", 7)],
+        "photo": [("message", 7)],
+        "sticker": [("message", 7)],
+        "caption": [("message", 7)],
+        "new chat members": [("message", 7)],
+    }
+
+
+def test_generic_message_kind_goes_last() -> None:
+    assert _make_update(text="text").kinds == (UpdateKinds.MESSAGE_TEXT, UpdateKinds.MESSAGE)
+    assert _make_update(caption="caption").kinds == (UpdateKinds.MESSAGE,)
+    bot = _make_bot([])
+    assert "message" in bot.allowed_updates
+    assert UpdateKinds.MESSAGE in bot.routing.update_kinds
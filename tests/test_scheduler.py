@@ -0,0 +1,50 @@
+from typing import Any, Optional
+
+from chatushka.core.services.scheduler import _get_orphans_query
+
+_OWNERS = [None, *range(10)]
+
+
+def _is_claimed(
+    owner: Optional[int],
+    query: Optional[dict[str, Any]],
+) -> bool:
+    if query is None:
+        return False
+    if "$or" in query:
+        return any(_is_claimed(owner, sub_query) for sub_query in query["$or"])
+    condition = query["owner"]
+    if condition is None:
+        return owner is None
+    if "$ne" in condition:
+        return owner != condition["$ne"]
+    divisor, remainder = condition["$mod"]
+    return owner is not None and owner >= condition["$gte"] and owner % divisor == remainder
+
+
+def test_jobs_of_gone_workers_are_claimed_once() -> None:
+    workers = 3
+    claims = {owner: [] for owner in _OWNERS}  # type: ignore
+    for worker_index in (None, *range(workers)):
+        for owner in _OWNERS:
+            if _is_claimed(owner, _get_orphans_query(worker_index, workers)):
+                claims[owner].append(worker_index)
+    # the leader of workers runs no scheduler, its jobs go to the first worker
+    assert claims == {
+        None: [0],
+        0: [],
+        1: [],
+        2: [],
+        3: [0],
+        4: [1],
+        5: [2],
+        6: [0],
+        7: [1],
+        8: [2],
+        9: [0],
+    }
+
+
+def test_single_process_claims_jobs_of_all_workers() -> None:
+    query = _get_orphans_query(None, 0)
+    assert [owner for owner in _OWNERS if _is_claimed(owner, query)] == list(range(10))
@@ -0,0 +1,94 @@
+from asyncio import run
+from collections import OrderedDict
+from typing import Any
+
+from chatushka.bot.internal.stats import ChatActivity, ChatStatsService
+from chatushka.bot.matchers.stats import activity_matcher
+from chatushka.core.transports.models import Update
+
+_CHAT = {"id": -100500, "type": "supergroup", "title": "Chat"}
+_USER = {"id": 42, "is_bot": False, "first_name": "Test"}
+
+
+def _match(
+    update: dict[str, Any],
+) -> None:
+    run(activity_matcher.match(None, Update(**update), should_call_matched=True))  # type: ignore
+
+
+def test_message_is_recorded() -> None:
+    messages = ChatStatsService().get(_CHAT["id"]).messages
+    _match({"update_id": 1, "message": {"message_id": 1, "from": _USER, "chat": _CHAT, "text": "/stats"}})
+    activity = ChatStatsService().get(_CHAT["id"])
+    assert activity.messages == messages + 1
+    assert ("stats", 1) in activity.commands.most_common()
+
+
+def test_member_updates_are_skipped() -> None:
+    member = {"status": "member", "user": _USER}
+    messages = ChatStatsService().get(_CHAT["id"]).messages
+    for field in ("my_chat_member", "chat_member"):
+        _match(
+            {
+                "update_id": 2,
+                field: {
+                    "chat": _CHAT,
+                    "from": _USER,
+                    "date": 0,
+                    "old_chat_member": member,
+                    "new_chat_member": member | {"status": "administrator"},
+                },
+            }
+        )
+    assert ChatStatsService().get(_CHAT["id"]).messages == messages
+
+
+def test_user_counters_are_bounded() -> None:
+    activity = ChatActivity(top_size=2, max_users=8)
+    for _ in range(5):
+        activity.record(7, "user 7", "2024-01-01")
+    for user_id in range(100):
+        activity.record(user_id, f"user {user_id}", "2024-01-01")
+    assert len(activity.user_messages.counts) <= 8
+    assert len(activity.names) <= 8
+    assert activity.user_messages.most_common()[0] == (7, 6)
+    # an evicted user messaging again is counted and not removed in the same update
+    activity.record(0, "user 0", "2024-01-01")
+    evicted = {user_id for user_id in range(100) if user_id not in activity.user_messages.counts}
+    assert evicted and 0 not in evicted
+    changes = activity.pop_changes()
+    assert changes is not None
+    assert set(changes["$unset"]) == {f"{field}.{user_id}" for user_id in evicted for field in ("users", "names")}
+    assert not {f"users.{user_id}" for user_id in evicted} & set(changes["$inc"])
+    assert changes["$inc"]["users.7"] == 6
+
+
+def test_old_days_and_commands_are_pruned() -> None:
+    activity = ChatActivity(days=2, max_commands=2)
+    activity.merge_document(
+        {
+            "days": {"2024-01-01": {"messages": 1}, "2024-01-02": {"messages": 2}, "2024-01-03": {"messages": 3}},
+            "commands": {"first": 3, "second": 2, "third": 1},
+        }
+    )
+    assert list(activity.days) == ["2024-01-02", "2024-01-03"]
+    assert activity.commands.counts == {"first": 3, "second": 2}
+    activity.record(1, "user", "2024-01-04", "third")
+    changes = activity.pop_changes()
+    assert changes is not None
+    assert set(changes["$unset"]) == {"days.2024-01-01", "days.2024-01-02", "commands.third"}
+    assert changes["$inc"] == {"messages": 1, "days.2024-01-04.messages": 1, "users.1": 1}
+
+
+def test_chats_are_evicted_least_recently_used_first() -> None:
+    service = ChatStatsService()
+    chats, max_chats = service.chats, service.max_chats
+    service.chats, service.max_chats = OrderedDict(), 3
+    try:
+        for chat_id in (1, 2, 3):
+            service.get(chat_id)
+        service.get(1)
+        service.get(4)
+        assert list(service.chats) == [3, 1, 4]
+    finally:
+        service.chats, service.max_chats = chats, max_chats
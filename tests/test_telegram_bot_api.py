@@ -0,0 +1,136 @@
+from asyncio import ensure_future, gather, run, sleep
+from time import monotonic
+from typing import Awaitable, Callable
+
+from benchmarks.fake_api import FakeBotApiServer
+from pytest import raises
+
+from chatushka.core.transports.exceptions import TelegramRetryAfterError
+from chatushka.core.transports.rate_limiter import OutboundRateLimiter, Priorities
+from chatushka.core.transports.telegram_bot_api import TelegramBotApi
+
+_CHAT_ID = -100500
+
+
+def _run_with_api(
+    test: Callable[[FakeBotApiServer, TelegramBotApi], Awaitable[None]],
+    max_retries: int = 3,
+) -> None:
+    async def _run() -> None:
+        server = FakeBotApiServer(retry_after=0.2)
+        await server.start()
+        api = TelegramBotApi(
+            server.token,
+            base_url=server.url,
+            max_retries=max_retries,
+            rate_limiter=OutboundRateLimiter(global_rate=1000, global_burst=1000, chat_rate=1000, chat_burst=1000),
+        )
+        try:
+            await test(server, api)
+        finally:
+            await api.shutdown()
+            await server.close()
+
+    run(_run())
+
+
+def test_call_is_retried_after_retry_after() -> None:
+    async def _test(
+        server: FakeBotApiServer,
+        api: TelegramBotApi,
+    ) -> None:
+        server.retry_after_replies["sendmessage"] = 2
+        started_at = monotonic()
+        message = await api.send_message(_CHAT_ID, "text")
+        assert message.text == "text"
+        assert server.requests["sendmessage"] == 3
+        assert monotonic() - started_at >= 2 * server.retry_after
+
+    _run_with_api(_test)
+
+
+def test_unprioritized_call_is_retried_after_retry_after() -> None:
+    async def _test(
+        server: FakeBotApiServer,
+        api: TelegramBotApi,
+    ) -> None:
+        server.retry_after_replies["getchatadministrators"] = 1
+        started_at = monotonic()
+        administrators = await api._call_api("getChatAdministrators", chat_id=_CHAT_ID)
+        assert len(administrators) == 2
+        assert server.requests["getchatadministrators"] == 2
+        assert monotonic() - started_at >= server.retry_after
+
+    _run_with_api(_test)
+
+
+def test_call_gives_up_after_max_retries() -> None:
+    async def _test(
+        server: FakeBotApiServer,
+        api: TelegramBotApi,
+    ) -> None:
+        server.retry_after_replies["sendmessage"] = 10
+        with raises(TelegramRetryAfterError) as err:
+            await api.send_message(_CHAT_ID, "text")
+        assert err.value.retry_after == server.retry_after
+        assert server.requests["sendmessage"] == 3
+
+    _run_with_api(_test, max_retries=2)
+
+
+def test_moderation_is_served_first() -> None:
+    async def _test() -> None:
+        limiter = OutboundRateLimiter(global_rate=100, global_burst=1)
+        served: list[tuple[Priorities, int]] = []
+
+        async def _acquire(
+            priority: Priorities,
+            number: int,
+        ) -> None:
+            await limiter.acquire(_CHAT_ID + number, priority)
+            served.append((priority, number))
+
+        # a flood wait holds every waiter in the queue until all of them are enqueued
+        limiter.block(None, 0.1)
+        tasks = []
+        for number, priority in enumerate((Priorities.LOW, Priorities.DEFAULT, Priorities.MODERATION) * 2):
+            tasks.append(ensure_future(_acquire(priority, number)))
+            await sleep(0)
+        await gather(*tasks)
+        await limiter.close()
+        assert served == [
+            (Priorities.MODERATION, 2),
+            (Priorities.MODERATION, 5),
+            (Priorities.DEFAULT, 1),
+            (Priorities.DEFAULT, 4),
+            (Priorities.LOW, 0),
+            (Priorities.LOW, 3),
+        ]
+
+    run(_test())
+
+
+def test_moderation_api_calls_overtake_queued_messages() -> None:
+    async def _test(
+        server: FakeBotApiServer,
+        api: TelegramBotApi,
+    ) -> None:
+        served: list[str] = []
+
+        async def _call(
+            method: str,
+            priority: Priorities,
+        ) -> None:
+            await api._call_api(method, priority=priority, chat_id=_CHAT_ID, message_id=1, text="text")
+            served.append(method)
+
+        # the first reply blocks the chat, everything sent meanwhile waits for the same slot
+        server.retry_after_replies["sendmessage"] = 1
+        tasks = [ensure_future(_call("sendMessage", Priorities.LOW))]
+        await sleep(0.05)
+        tasks.append(ensure_future(_call("sendMessage", Priorities.DEFAULT)))
+        tasks.append(ensure_future(_call("pinChatMessage", Priorities.MODERATION)))
+        await gather(*tasks)
+        assert served[0] == "pinChatMessage"
+
+    _run_with_api(_test)
@@ -0,0 +1,84 @@
+from asyncio import run
+from http import HTTPStatus
+from json import dumps
+from typing import Optional
+
+from httpx import AsyncClient
+
+from chatushka.core.transports.models import Update
+from chatushka.core.transports.webhook import SECRET_TOKEN_HEADER, WebhookReceiver
+
+_SECRET = "secret"
+_PATH = "/bot"
+_UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 1,
+        "from": {"id": 42, "is_bot": False, "first_name": "Test"},
+        "chat": {"id": -100500, "type": "supergroup"},
+        "text": "/ping",
+    },
+}
+
+
+def _request(
+    method: str = "POST",
+    path: str = _PATH,
+    secret: Optional[str] = _SECRET,
+    body: str = dumps(_UPDATE),
+    error: Optional[Exception] = None,
+) -> tuple[int, list[Update]]:
+    async def _run() -> tuple[int, list[Update]]:
+        received: list[Update] = []
+
+        async def _callback(
+            update: Update,
+        ) -> None:
+            if error:
+                raise error
+            received.append(update)
+
+        receiver = WebhookReceiver(_callback, secret_token=_SECRET, port=0, path=_PATH)
+        await receiver.start()
+        host, port = receiver.sockets_names[0]
+        headers = {SECRET_TOKEN_HEADER: secret} if secret is not None else {}
+        try:
+            async with AsyncClient() as client:
+                response = await client.request(method, f"http://{host}:{port}{path}", headers=headers, content=body)
+        finally:
+            await receiver.close()
+        return response.status_code, received
+
+    return run(_run())
+
+
+def test_update_is_accepted() -> None:
+    status, received = _request()
+    assert status == HTTPStatus.OK
+    assert [update.update_id for update in received] == [1]
+    assert received[0].message.text == "/ping"  # type: ignore
+
+
+def test_missing_secret_is_rejected() -> None:
+    assert _request(secret=None) == (HTTPStatus.UNAUTHORIZED, [])
+
+
+def test_wrong_secret_is_rejected() -> None:
+    assert _request(secret="wrong") == (HTTPStatus.UNAUTHORIZED, [])
+
+
+def test_wrong_path_is_not_found() -> None:
+    assert _request(path="/other") == (HTTPStatus.NOT_FOUND, [])
+
+
+def test_get_is_not_allowed() -> None:
+    assert _request(method="GET", body="") == (HTTPStatus.METHOD_NOT_ALLOWED, [])
+
+
+def test_bad_body_is_rejected() -> None:
+    assert _request(body="not json") == (HTTPStatus.BAD_REQUEST, [])
+    assert _request(body="[]") == (HTTPStatus.BAD_REQUEST, [])
+
+
+def test_failed_update_is_not_acknowledged() -> None:
+    assert _request(error=RuntimeError("Dispatcher is closed")) == (HTTPStatus.SERVICE_UNAVAILABLE, [])